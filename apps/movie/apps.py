@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class MovieConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.movie'
+
+    def ready(self):
+        from .response_cache import check_shared_cache
+
+        check_shared_cache()
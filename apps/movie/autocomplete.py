@@ -0,0 +1,291 @@
+import heapq
+import re
+import sys
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+from django.conf import settings
+from django.db import connection, transaction
+from .response_cache import bump_version, get_version
+
+NON_WORD_PATTERN = re.compile(r"[\W_]+", re.UNICODE)
+
+# Bumped by writes that add, rename or remove titles. Rating writes leave it
+# alone, the weights they change are picked up by the scheduled rebuild.
+TITLE_VERSION_KEY = "autocomplete:title-version"
+
+# Slot cost of one entry across the parallel lists, the id lookup dict and
+# the weight heap with its tuples
+ENTRY_OVERHEAD = 5 * 8 + 104 + 64 + 56
+
+
+def normalize_title(title):
+    title = unicodedata.normalize("NFKD", title or "")
+    title = "".join(char for char in title if not unicodedata.combining(char))
+    return NON_WORD_PATTERN.sub(" ", title.lower()).strip()
+
+
+class TitleIndex:
+    """
+    Prefix index over normalized movie names kept as parallel sorted arrays.
+
+    A prefix lookup is two bisects plus a top-k pass over the matching slice.
+    Slices wider than ``scan_limit`` (one or two letter prefixes) have their
+    top-k memoized until the next write. Once ``memory_budget`` bytes are
+    used, only titles outranking the least rated entry are admitted; a
+    min-heap of weights finds that entry, its superseded items are skipped
+    when they surface. ``version`` is the catalog version it was built from.
+    """
+
+    def __init__(self, memory_budget, scan_limit=2048, version=None):
+        self.memory_budget = memory_budget
+        self.scan_limit = scan_limit
+        self.version = version
+        self.keys = []
+        self.weights = []
+        self.ids = []
+        self.names = []
+        self.entry_by_id = {}
+        self.by_weight = []
+        self.memory_used = 0
+        self.built_at = time.monotonic()
+        self._top_cache = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.keys)
+
+    @staticmethod
+    def entry_size(key, movie_id, name):
+        strings = sys.getsizeof(key) + sys.getsizeof(movie_id) + sys.getsizeof(name)
+        return strings + ENTRY_OVERHEAD
+
+    def _position(self, movie_id):
+        key = self.entry_by_id[movie_id][0]
+        position = bisect_left(self.keys, key)
+        while self.ids[position] != movie_id:
+            position += 1
+        return position
+
+    def _remove(self, movie_id):
+        position = self._position(movie_id)
+        key, name = self.keys[position], self.names[position]
+        for values in (self.keys, self.weights, self.ids, self.names):
+            del values[position]
+        del self.entry_by_id[movie_id]
+        self.memory_used -= self.entry_size(key, movie_id, name)
+
+    def _least_rated(self):
+        # Heap items of removed or re-added entries no longer match theirs
+        while self.by_weight:
+            weight, movie_id, key = self.by_weight[0]
+            if self.entry_by_id.get(movie_id) == (key, weight):
+                return movie_id, weight
+            heapq.heappop(self.by_weight)
+        return None, None
+
+    def add(self, movie_id, name, weight=0):
+        """Adds or renames a movie, returns False when the budget keeps it out."""
+        movie_id = str(movie_id)
+        key = normalize_title(name)
+        size = self.entry_size(key, movie_id, name)
+        if size > self.memory_budget:
+            return False
+        with self._lock:
+            self._top_cache.clear()
+            if movie_id in self.entry_by_id:
+                self._remove(movie_id)
+            while self.memory_used + size > self.memory_budget:
+                least_rated, least_weight = self._least_rated()
+                if weight <= least_weight:
+                    return False
+                self._remove(least_rated)
+
+            position = bisect_left(self.keys, key)
+            self.keys.insert(position, key)
+            self.weights.insert(position, weight)
+            self.ids.insert(position, movie_id)
+            self.names.insert(position, name)
+            self.entry_by_id[movie_id] = (key, weight)
+            self.memory_used += size
+            heapq.heappush(self.by_weight, (weight, movie_id, key))
+            if len(self.by_weight) > 2 * len(self.keys):
+                self._compact()
+        return True
+
+    def _compact(self):
+        self.by_weight = [
+            (weight, movie_id, key) for movie_id, (key, weight) in self.entry_by_id.items()
+        ]
+        heapq.heapify(self.by_weight)
+
+    def discard(self, movie_id):
+        with self._lock:
+            if str(movie_id) in self.entry_by_id:
+                self._remove(str(movie_id))
+                self._top_cache.clear()
+
+    def load(self, rows):
+        """
+        Bulk loads ``(movie_id, name, weight)`` rows ordered by descending
+        weight, stopping once the memory budget is spent.
+        """
+        entries = []
+        memory_used = 0
+        for movie_id, name, weight in rows:
+            movie_id = str(movie_id)
+            key = normalize_title(name)
+            size = self.entry_size(key, movie_id, name)
+            if memory_used + size > self.memory_budget:
+                break
+            memory_used += size
+            entries.append((key, weight, movie_id, name))
+        entries.sort(key=lambda entry: entry[0])
+
+        with self._lock:
+            self.keys = [entry[0] for entry in entries]
+            self.weights = [entry[1] for entry in entries]
+            self.ids = [entry[2] for entry in entries]
+            self.names = [entry[3] for entry in entries]
+            self.entry_by_id = {entry[2]: (entry[0], entry[1]) for entry in entries}
+            self._compact()
+            self.memory_used = memory_used
+            self.built_at = time.monotonic()
+            self._top_cache.clear()
+
+    def lookup(self, prefix, limit=10):
+        prefix = normalize_title(prefix)
+        if not prefix:
+            return []
+        with self._lock:
+            cached = self._top_cache.get((prefix, limit))
+            if cached is not None:
+                return cached
+
+            start = bisect_left(self.keys, prefix)
+            end = bisect_left(self.keys, prefix + "\U0010ffff", start)
+            positions = heapq.nlargest(
+                limit, range(start, end), key=self.weights.__getitem__
+            )
+            results = [
+                {
+                    "id": self.ids[position],
+                    "name": self.names[position],
+                    "total_rating": self.weights[position],
+                }
+                for position in positions
+            ]
+            if end - start > self.scan_limit:
+                self._top_cache[(prefix, limit)] = results
+        return results
+
+
+_title_index = None
+_title_index_lock = threading.Lock()
+_rebuild_thread = None
+
+
+def build_title_index():
+    from .models import Movie
+
+    # Read before the rows, so writes during the build trigger another one
+    version = get_version(TITLE_VERSION_KEY)
+    index = TitleIndex(settings.AUTOCOMPLETE_MEMORY_BUDGET_MB * 1024 * 1024, version=version)
+    rows = (
+        Movie.objects.filter(is_active=True)
+        .order_by("-total_rating", "-id")
+        .values_list("id", "name", "total_rating")
+        .iterator(chunk_size=10000)
+    )
+    index.load(rows)
+    return index
+
+
+def _swap_title_index():
+    global _title_index
+    index = build_title_index()
+    with _title_index_lock:
+        _title_index = index
+
+
+def _rebuild_title_index():
+    try:
+        _swap_title_index()
+    finally:
+        connection.close()
+
+
+def refresh_title_index(background=True):
+    """
+    Rebuilds this worker's title index, in a thread unless ``background`` is
+    false, while the current one keeps serving. A rebuild already running in
+    the background is not started twice.
+    """
+    global _rebuild_thread
+    if not background:
+        _swap_title_index()
+        return
+    with _title_index_lock:
+        # A thread of the process this worker was forked from is not alive here
+        if _rebuild_thread is not None and _rebuild_thread.is_alive():
+            return
+        _rebuild_thread = threading.Thread(target=_rebuild_title_index, daemon=True)
+        _rebuild_thread.start()
+
+
+def get_title_index():
+    """
+    Returns this worker's title index, never building it in the request.
+    Title writes in any worker bump TITLE_VERSION_KEY in the shared cache;
+    once it differs from the index's, and the index is
+    AUTOCOMPLETE_REFRESH_SECONDS old, a background rebuild starts. Rating
+    weights are only refreshed by the rebuild every
+    AUTOCOMPLETE_REBUILD_SECONDS. Until the first build is done, which the
+    WSGI and ASGI entry points start at boot, lookups find nothing.
+    """
+    index = _title_index
+    if index is None:
+        refresh_title_index()
+        return TitleIndex(0)
+    age = time.monotonic() - index.built_at
+    if age >= settings.AUTOCOMPLETE_REBUILD_SECONDS or (
+        age >= settings.AUTOCOMPLETE_REFRESH_SECONDS
+        and index.version != get_version(TITLE_VERSION_KEY)
+    ):
+        refresh_title_index()
+    return index
+
+
+def reset_title_index():
+    global _title_index, _rebuild_thread
+    with _title_index_lock:
+        _title_index = None
+        _rebuild_thread = None
+
+
+def invalidate_titles():
+    # Bumped again on commit, so a rebuild reading the old rows in between
+    # is not taken for current
+    bump_version(TITLE_VERSION_KEY)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: bump_version(TITLE_VERSION_KEY))
+
+
+def index_title(movie):
+    """
+    Shows a created, renamed or deactivated movie in this worker's index
+    right away and has the other workers rebuild theirs.
+    """
+    if _title_index is not None:
+        if movie.is_active:
+            _title_index.add(movie.id, movie.name, movie.total_rating)
+        else:
+            _title_index.discard(movie.id)
+    invalidate_titles()
+
+
+def forget_title(movie_id):
+    if _title_index is not None:
+        _title_index.discard(movie_id)
+    invalidate_titles()
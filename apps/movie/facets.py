@@ -0,0 +1,65 @@
+import hashlib
+import json
+import uuid
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, IntegerField, Value
+from django.db.models.functions import Cast, ExtractYear, Floor, Least
+
+VERSION_KEY = "movie-facets:version"
+
+# Facet name -> expression grouped on. Rating buckets are whole stars, with a
+# perfect 5.00 counted in the 4 bucket.
+FACETS = {
+    "genre": F("genre"),
+    "language": F("language"),
+    "rating": Cast(Least(Floor("avg_rating"), Value(4)), IntegerField()),
+    "decade": Cast(Floor(ExtractYear("released_at") / 10.0) * 10, IntegerField()),
+}
+
+
+def get_facet_version():
+    return cache.get_or_set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def invalidate_facets():
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def get_signature(params):
+    encoded = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode()).hexdigest()
+
+
+def count_facet(queryset, facet):
+    rows = (
+        queryset.order_by()
+        .annotate(facet_value=FACETS[facet])
+        .values("facet_value")
+        .annotate(count=Count("id"))
+        .order_by("-count", "facet_value")
+    )
+    return [{"value": row["facet_value"], "count": row["count"]} for row in rows]
+
+
+def get_facet_counts(queryset, facets, params):
+    """
+    Returns ``{facet: [{"value", "count"}, ...]}`` for the movies in
+    ``queryset``. ``params`` identify the filter set; counts are cached per
+    signature until a movie is written or MOVIE_FACET_CACHE_SECONDS pass,
+    which also bounds staleness of rating buckets moved by new ratings.
+    """
+    prefix = f"movie-facets:{get_facet_version()}:{get_signature(params)}"
+    keys = {facet: f"{prefix}:{facet}" for facet in facets}
+    cached = cache.get_many(keys.values())
+
+    counts = {}
+    missing = {}
+    for facet, key in keys.items():
+        if key in cached:
+            counts[facet] = cached[key]
+        else:
+            counts[facet] = missing[key] = count_facet(queryset, facet)
+    if missing:
+        cache.set_many(missing, settings.MOVIE_FACET_CACHE_SECONDS)
+    return counts
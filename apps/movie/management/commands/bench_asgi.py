@@ -0,0 +1,161 @@
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.movie.models import Movie
+from apps.user.models import User
+
+ENDPOINTS = {
+    "movies_list": ([], {"cursor": ""}),
+    "my_movies": ([], {}),
+    "retrieve_movie": (["movie"], {}),
+    "rated_movie_list": ([], {}),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve the project with gunicorn sync workers (WSGI) and with uvicorn "
+        "workers (ASGI), fire concurrent read requests at each and compare "
+        "throughput and latency of the sync views against their async versions. "
+        "The response cache is disabled in the servers so every request reads "
+        "the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--endpoint", choices=ENDPOINTS, default="movies_list")
+        parser.add_argument("--workers", type=int, default=2)
+        parser.add_argument("--concurrency", type=int, default=64)
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--port", type=int, default=9530)
+        parser.add_argument("--user", help="Username to authenticate as, defaults to the first user")
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by("created_at")
+        user = (users.filter(username=options["user"]) if options["user"] else users).first()
+        movie = Movie.objects.order_by("-total_rating").first()
+        if not user or not movie:
+            raise CommandError("Needs at least one movie and one user")
+        token = str(RefreshToken.for_user(user).access_token)
+
+        endpoint = options["endpoint"]
+        args, params = ENDPOINTS[endpoint]
+        args = [movie.pk if arg == "movie" else arg for arg in args]
+        query = "&".join(f"{name}={value}" for name, value in params.items())
+        sync_path = reverse(endpoint, args=args) + (f"?{query}" if query else "")
+        async_path = reverse(f"{endpoint}_async", args=args) + (f"?{query}" if query else "")
+
+        runs = [
+            ("wsgi", "sync", sync_path),
+            ("asgi", "sync", sync_path),
+            ("asgi", "async", async_path),
+        ]
+        for server, view, path in runs:
+            with self.serve(server, options) as port:
+                # Warming up worker imports and database connections first
+                self.load(port, path, token, options["concurrency"] * 4, options["concurrency"])
+                elapsed, latencies, errors = self.load(
+                    port, path, token, options["requests"], options["concurrency"]
+                )
+            latencies.sort()
+            self.stdout.write(
+                f"{server} {view:<5} {endpoint}  "
+                f"{len(latencies) / elapsed:8.1f} req/s  "
+                f"p50: {self.percentile(latencies, 50):7.2f} ms  "
+                f"p99: {self.percentile(latencies, 99):7.2f} ms  "
+                f"errors: {errors}"
+            )
+
+    def serve(self, server, options):
+        port = options["port"]
+        workers = str(options["workers"])
+        if server == "wsgi":
+            command = [
+                sys.executable, "-m", "gunicorn", "core.wsgi:application",
+                "--workers", workers, "--bind", f"127.0.0.1:{port}",
+            ]
+        else:
+            command = [
+                sys.executable, "-m", "uvicorn", "core.asgi:application",
+                "--workers", workers, "--port", str(port), "--no-access-log",
+            ]
+        env = {**os.environ, "MOVIE_RESPONSE_CACHE_SECONDS": "0"}
+        return Server(command, port, env)
+
+    def load(self, port, path, token, requests, concurrency):
+        headers = {"Authorization": f"Bearer {token}"}
+        remaining = requests
+        lock = threading.Lock()
+        latencies = []
+        errors = 0
+
+        def worker():
+            nonlocal remaining, errors
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            while True:
+                with lock:
+                    if remaining <= 0:
+                        break
+                    remaining -= 1
+                started = time.perf_counter()
+                try:
+                    connection.request("GET", path, headers=headers)
+                    response = connection.getresponse()
+                    response.read()
+                    ok = response.status == 200
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    ok = False
+                elapsed = time.perf_counter() - started
+                with lock:
+                    if ok:
+                        latencies.append(elapsed * 1000)
+                    else:
+                        errors += 1
+            connection.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for _ in range(concurrency):
+                executor.submit(worker)
+        return time.perf_counter() - started, latencies, errors
+
+    @staticmethod
+    def percentile(values, percent):
+        if not values:
+            return float("nan")
+        return values[min(len(values) - 1, len(values) * percent // 100)]
+
+
+class Server:
+    def __init__(self, command, port, env):
+        self.command = command
+        self.port = port
+        self.env = env
+
+    def __enter__(self):
+        self.process = subprocess.Popen(
+            self.command, env=self.env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise CommandError(f"{' '.join(self.command)} exited with {self.process.returncode}")
+            try:
+                socket.create_connection(("127.0.0.1", self.port), timeout=1).close()
+                return self.port
+            except OSError:
+                time.sleep(0.1)
+        self.process.kill()
+        raise CommandError(f"{' '.join(self.command)} did not start listening")
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        self.process.wait(timeout=30)
@@ -0,0 +1,60 @@
+import random
+import string
+import time
+from django.core.management.base import BaseCommand
+from apps.movie.autocomplete import TitleIndex
+
+
+
+class Command(BaseCommand):
+    help = "Benchmark title autocomplete lookups against a synthetic in-memory index"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--titles", type=int, default=1_000_000)
+        parser.add_argument("--queries", type=int, default=20_000)
+        parser.add_argument("--memory-budget-mb", type=int, default=512)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        words = [
+            "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9)))
+            for _ in range(5000)
+        ]
+        titles = [
+            " ".join(rng.choice(words) for _ in range(rng.randint(1, 4))).title()
+            for _ in range(options["titles"])
+        ]
+        # Zipf-like popularity so a few titles dominate the weights, loaded
+        # most rated first like build_title_index does
+        rows = [(i, title, 10_000 // (i + 1)) for i, title in enumerate(titles)]
+
+        index = TitleIndex(options["memory_budget_mb"] * 1024 * 1024)
+        started = time.perf_counter()
+        index.load(rows)
+        build_seconds = time.perf_counter() - started
+
+        # Typed prefixes of one to six characters of real titles
+        prefixes = []
+        for _ in range(options["queries"]):
+            title = rng.choice(titles)
+            prefixes.append(title[: rng.randint(1, min(6, len(title)))])
+
+        latencies = []
+        for prefix in prefixes:
+            started = time.perf_counter()
+            index.lookup(prefix)
+            latencies.append(time.perf_counter() - started)
+        latencies.sort()
+
+        def percentile(value):
+            return latencies[min(len(latencies) - 1, int(len(latencies) * value))] * 1000
+
+        self.stdout.write(
+            f"titles indexed: {len(index)}/{len(titles)}  "
+            f"memory: {index.memory_used / 1024 / 1024:.1f} MB  build: {build_seconds:.2f}s"
+        )
+        self.stdout.write(
+            f"lookups: {len(latencies)}  p50: {percentile(0.50):.3f} ms  "
+            f"p99: {percentile(0.99):.3f} ms  max: {latencies[-1] * 1000:.3f} ms"
+        )
@@ -0,0 +1,81 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from apps.movie.models import Movie
+from apps.movie.response_cache import invalidate_movies
+from apps.user.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire bursts of identical concurrent retrieve_movie requests right after "
+        "the movie's cached response is retired, and count the database queries "
+        "they run with and without request coalescing"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=32)
+        parser.add_argument("--rounds", type=int, default=10)
+        parser.add_argument("--movie", help="Movie id, defaults to the most rated movie")
+
+    def handle(self, *args, **options):
+        movies = Movie.objects.order_by("-total_rating")
+        movie = (movies.filter(pk=options["movie"]) if options["movie"] else movies).first()
+        user = User.objects.first()
+        if not movie or not user:
+            raise CommandError("Needs at least one movie and one user")
+
+        for coalescing in [False, True]:
+            with override_settings(MOVIE_RESPONSE_COALESCING=coalescing):
+                queries, latencies = self.run_rounds(movie, user, options)
+            latencies.sort()
+            self.stdout.write(
+                f"coalescing {'on ' if coalescing else 'off'}  "
+                f"queries per burst: {queries / options['rounds']:.1f}  "
+                f"p50: {latencies[len(latencies) // 2] * 1000:.2f} ms  "
+                f"max: {latencies[-1] * 1000:.2f} ms"
+            )
+
+    def run_rounds(self, movie, user, options):
+        url = reverse("retrieve_movie", args=[movie.pk])
+        threads = options["threads"]
+        barrier = threading.Barrier(threads)
+        lock = threading.Lock()
+        queries = 0
+        latencies = []
+
+        def count_query(execute, sql, params, many, context):
+            nonlocal queries
+            with lock:
+                queries += 1
+            return execute(sql, params, many, context)
+
+        def fire(client):
+            barrier.wait()
+            started = time.perf_counter()
+            with connection.execute_wrapper(count_query):
+                response = client.get(url)
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+            return response.status_code
+
+        clients = []
+        for _ in range(threads):
+            client = APIClient()
+            client.force_authenticate(user)
+            clients.append(client)
+
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            for _ in range(options["rounds"]):
+                # Retire the cached response so the burst lands on a miss
+                invalidate_movies([movie.pk])
+                statuses = list(executor.map(fire, clients))
+                if set(statuses) != {200}:
+                    raise CommandError(f"Unexpected responses: {sorted(set(statuses))}")
+        return queries, latencies
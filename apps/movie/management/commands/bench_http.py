@@ -0,0 +1,315 @@
+import http.client
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.movie.models import Movie
+from apps.user.models import User
+from .bench_asgi import Server
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / "benchmarks" / "http_baseline.json"
+
+# Allowed regression of each metric as a fraction of its baseline value
+DEFAULT_THRESHOLDS = {"rps": 0.2, "p50_ms": 0.3, "p95_ms": 0.4, "p99_ms": 0.5, "queries": 0.1}
+HIGHER_IS_BETTER = {"rps"}
+
+# Endpoints of each workload with their share of its requests
+WORKLOADS = {
+    "read_mix": {"movies_list": 5, "retrieve_movie": 4, "my_movies": 1},
+    "rating_burst": {"submit_rating": 1},
+    "login_burst": {"login": 1},
+}
+# Fraction of --requests a workload sends, password hashing makes logins slow
+WORKLOAD_SCALE = {"login_burst": 0.1}
+ORDERINGS = ["-created_at", "-avg_rating", "-total_rating", "released_at"]
+
+
+def percentile(values, percent):
+    if not values:
+        return None
+    return values[min(len(values) - 1, len(values) * percent // 100)]
+
+
+def summarize(samples, elapsed):
+    """Reduces ``(latency_ms, ok, queries)`` samples to the tracked metrics."""
+    latencies = sorted(latency for latency, ok, _ in samples if ok)
+    queries = [count for _, ok, count in samples if ok and count is not None]
+    return {
+        "requests": len(samples),
+        "errors": len(samples) - len(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) or 0, 2),
+        "p95_ms": round(percentile(latencies, 95) or 0, 2),
+        "p99_ms": round(percentile(latencies, 99) or 0, 2),
+        "queries": round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+def find_regressions(baseline, results, thresholds):
+    """
+    Compares ``{target: {workload: {endpoint: metrics}}}`` results with the
+    baseline and returns a line per metric worse than its threshold allows.
+    Targets, workloads and endpoints missing from either side are skipped.
+    """
+    regressions = []
+    for target, workloads in results.items():
+        for workload, endpoints in workloads.items():
+            for endpoint, metrics in endpoints.items():
+                base = baseline.get(target, {}).get(workload, {}).get(endpoint)
+                if not base:
+                    continue
+                if metrics["errors"] > base.get("errors", 0):
+                    regressions.append(
+                        f"{target} {workload} {endpoint} errors: {metrics['errors']} (baseline {base.get('errors', 0)})"
+                    )
+                for metric, threshold in thresholds.items():
+                    if metrics.get(metric) is None or base.get(metric) is None:
+                        continue
+                    if metric in HIGHER_IS_BETTER:
+                        limit = base[metric] * (1 - threshold)
+                        regressed = metrics[metric] < limit
+                    else:
+                        limit = base[metric] * (1 + threshold)
+                        regressed = metrics[metric] > limit
+                    if regressed:
+                        regressions.append(
+                            f"{target} {workload} {endpoint} {metric}: {metrics[metric]} "
+                            f"(baseline {base[metric]}, limit {limit:.2f})"
+                        )
+    return regressions
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive concurrent workloads (read_mix, rating_burst, login_burst) against a "
+        "seeded database, see seed_scale, through the Django test client and through "
+        "gunicorn (wsgi) or uvicorn (asgi) on localhost. Records throughput, "
+        "p50/p95/p99 latency and, with the test client, queries per request for every "
+        "endpoint, and fails when a metric regresses past its threshold against the "
+        "JSON baseline. rating_burst writes ratings."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--targets", default="client,wsgi", help="Comma separated: client, wsgi, asgi")
+        parser.add_argument("--workloads", default=",".join(WORKLOADS), help="Comma separated workloads")
+        parser.add_argument("--requests", type=int, default=1000, help="Requests per workload")
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--users", type=int, default=50, help="Seeded users the requests come from")
+        parser.add_argument("--prefix", default="seed", help="Username prefix given to seed_scale")
+        parser.add_argument("--password", default="password", help="Password given to seed_scale")
+        parser.add_argument("--workers", type=int, default=2, help="Server worker processes")
+        parser.add_argument("--port", type=int, default=9540)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+        parser.add_argument("--save", action="store_true", help="Write the results as the new baseline")
+        parser.add_argument("--threshold", type=float, help="Overrides every metric's threshold")
+
+    def handle(self, *args, **options):
+        targets = [target for target in options["targets"].split(",") if target]
+        workloads = [workload for workload in options["workloads"].split(",") if workload]
+        unknown = [name for name in targets if name not in ["client", "wsgi", "asgi"]]
+        unknown += [name for name in workloads if name not in WORKLOADS]
+        if unknown:
+            raise CommandError(f"Unknown targets or workloads: {', '.join(unknown)}")
+
+        users = list(
+            User.objects.filter(username__startswith=f"{options['prefix']}_", is_active=True)
+            .order_by("username")[: options["users"]]
+        )
+        movies = list(Movie.objects.order_by("-total_rating", "id").values_list("id", flat=True)[:200])
+        if not users or not movies:
+            raise CommandError(f"Needs users prefixed {options['prefix']}_ and movies, run seed_scale first")
+        self.users = [(user, f"Bearer {RefreshToken.for_user(user).access_token}") for user in users]
+        self.movies = movies
+        self.options = options
+
+        results = {}
+        for target in targets:
+            results[target] = {}
+            for workload in workloads:
+                results[target][workload] = self.run_workload(target, workload)
+                for endpoint, metrics in results[target][workload].items():
+                    self.stdout.write(
+                        f"{target:<6} {workload:<12} {endpoint:<15} "
+                        f"{metrics['rps']:8.1f} req/s  p50: {metrics['p50_ms']:7.2f} ms  "
+                        f"p95: {metrics['p95_ms']:7.2f} ms  p99: {metrics['p99_ms']:7.2f} ms  "
+                        f"queries: {metrics['queries'] if metrics['queries'] is not None else '-'}  "
+                        f"errors: {metrics['errors']}"
+                    )
+
+        path = Path(options["baseline"])
+        stored = json.loads(path.read_text()) if path.exists() else {}
+        if options["save"]:
+            merged = stored.get("results", {})
+            for target, target_results in results.items():
+                merged.setdefault(target, {}).update(target_results)
+            stored.update(
+                {
+                    "environment": self.get_environment(),
+                    "thresholds": stored.get("thresholds", DEFAULT_THRESHOLDS),
+                    "results": merged,
+                }
+            )
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(stored, indent=2, sort_keys=True) + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Saved the baseline to {path}"))
+            return
+        if not stored:
+            self.stdout.write(self.style.WARNING(f"No baseline at {path}, run with --save to record one"))
+            return
+
+        thresholds = stored.get("thresholds", DEFAULT_THRESHOLDS)
+        if options["threshold"] is not None:
+            thresholds = {metric: options["threshold"] for metric in thresholds}
+        regressions = find_regressions(stored.get("results", {}), results, thresholds)
+        if regressions:
+            raise CommandError(f"{len(regressions)} metric(s) regressed:\n" + "\n".join(regressions))
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
+
+    def get_environment(self):
+        return {
+            "cpus": os.cpu_count(),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "concurrency": self.options["concurrency"],
+            "requests": self.options["requests"],
+            "workers": self.options["workers"],
+        }
+
+    def build_requests(self, workload, count, rng):
+        """Returns ``(endpoint, method, path, body, authorization)`` per request."""
+        endpoints = list(WORKLOADS[workload])
+        weights = list(WORKLOADS[workload].values())
+        requests = []
+        for endpoint in rng.choices(endpoints, weights=weights, k=count):
+            user, authorization = rng.choice(self.users)
+            # Popular movies are read and rated more often
+            movie = self.movies[min(int(rng.paretovariate(1.2)) - 1, len(self.movies) - 1)]
+            if endpoint == "movies_list":
+                path = f"{reverse('movies_list')}?cursor=&ordering={rng.choice(ORDERINGS)}"
+                requests.append((endpoint, "GET", path, None, authorization))
+            elif endpoint == "retrieve_movie":
+                requests.append((endpoint, "GET", reverse("retrieve_movie", args=[movie]), None, authorization))
+            elif endpoint == "my_movies":
+                requests.append((endpoint, "GET", reverse("my_movies"), None, authorization))
+            elif endpoint == "submit_rating":
+                body = {"movie": str(movie), "rating": rng.randint(1, 5)}
+                requests.append((endpoint, "POST", reverse("submit_rating"), body, authorization))
+            elif endpoint == "login":
+                body = {"username_or_email": user.username, "password": self.options["password"]}
+                requests.append((endpoint, "POST", reverse("login"), body, None))
+        return requests
+
+    def run_workload(self, target, workload):
+        rng = random.Random(f"{self.options['seed']}:{workload}")
+        concurrency = self.options["concurrency"]
+        warmup = self.build_requests(workload, concurrency * 2, rng)
+        count = max(1, int(self.options["requests"] * WORKLOAD_SCALE.get(workload, 1)))
+        requests = self.build_requests(workload, count, rng)
+        if target == "client":
+            self.drive(ClientSender, warmup, concurrency)
+            return self.drive(ClientSender, requests, concurrency)
+
+        with self.serve(target) as port:
+            self.drive(lambda: HTTPSender(port), warmup, concurrency)
+            return self.drive(lambda: HTTPSender(port), requests, concurrency)
+
+    def serve(self, target):
+        port = self.options["port"]
+        workers = str(self.options["workers"])
+        if target == "wsgi":
+            command = [
+                sys.executable, "-m", "gunicorn", "core.wsgi:application",
+                "--workers", workers, "--bind", f"127.0.0.1:{port}",
+            ]
+        else:
+            command = [
+                sys.executable, "-m", "uvicorn", "core.asgi:application",
+                "--workers", workers, "--port", str(port), "--no-access-log",
+            ]
+        return Server(command, port, dict(os.environ))
+
+    def drive(self, sender_factory, requests, concurrency):
+        pending = iter(requests)
+        lock = threading.Lock()
+        samples = {}
+
+        def worker():
+            sender = sender_factory()
+            while True:
+                with lock:
+                    request = next(pending, None)
+                if request is None:
+                    break
+                endpoint, method, path, body, authorization = request
+                started = time.perf_counter()
+                ok, queries = sender.send(method, path, body, authorization)
+                latency = (time.perf_counter() - started) * 1000
+                with lock:
+                    samples.setdefault(endpoint, []).append((latency, ok, queries))
+            sender.close()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for future in [executor.submit(worker) for _ in range(concurrency)]:
+                future.result()
+        elapsed = time.perf_counter() - started
+        return {endpoint: summarize(endpoint_samples, elapsed) for endpoint, endpoint_samples in samples.items()}
+
+
+class ClientSender:
+    # In-process requests, each thread on its own database connection
+    def __init__(self):
+        self.client = APIClient()
+        self.queries = 0
+
+    def count_query(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def send(self, method, path, body, authorization):
+        headers = {"HTTP_AUTHORIZATION": authorization} if authorization else {}
+        self.queries = 0
+        with connection.execute_wrapper(self.count_query):
+            if method == "GET":
+                response = self.client.get(path, **headers)
+            else:
+                response = self.client.post(path, body, format="json", **headers)
+        return response.status_code < 400, self.queries
+
+    def close(self):
+        connection.close()
+
+
+class HTTPSender:
+    def __init__(self, port):
+        self.port = port
+        self.connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+
+    def send(self, method, path, body, authorization):
+        headers = {"Authorization": authorization} if authorization else {}
+        if body is not None:
+            body = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            response.read()
+            return response.status < 400, None
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            return False, None
+
+    def close(self):
+        self.connection.close()
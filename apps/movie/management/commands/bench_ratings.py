@@ -0,0 +1,95 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from apps.movie.models import Movie
+from apps.user.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire submit_rating at one movie from parallel threads, writing the "
+        "aggregates straight to the movie row and through counter shards, and "
+        "report the throughput of both. Each run rates a movie of its own, "
+        "deleted afterwards, and checks its aggregates come out exact."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--ratings", type=int, default=400, help="One per user")
+        parser.add_argument("--shards", type=int, default=8)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        if connection.vendor == "sqlite":
+            # SQLite takes one writer at a time, the threads would only queue
+            self.stderr.write("SQLite serializes writers, run this on PostgreSQL to compare")
+        raters = list(User.objects.filter(is_active=True).order_by("pk")[: options["ratings"]])
+        if len(raters) < options["ratings"]:
+            raise CommandError(
+                f"Needs {options['ratings']} active users, seed_scale can generate them"
+            )
+
+        for shards in [0, options["shards"]]:
+            with override_settings(MOVIE_RATING_SHARDS=shards):
+                movie = Movie.objects.create(
+                    name=f"Rating benchmark {shards}",
+                    description="Created by bench_ratings",
+                    released_at="2000-01-01",
+                    duration=90,
+                    genre="Drama",
+                    language="English",
+                    created_by=raters[0],
+                )
+                try:
+                    rating_sum, elapsed = self.submit_ratings(movie, raters, options)
+                    Movie.fold_rating_shards(movie_ids=[movie.pk])
+                    movie.refresh_from_db()
+                    if (movie.rating_sum, movie.total_rating) != (rating_sum, len(raters)):
+                        raise CommandError(
+                            f"Aggregates drifted with {shards} shard(s): "
+                            f"{movie.rating_sum}/{movie.total_rating}, "
+                            f"expected {rating_sum}/{len(raters)}"
+                        )
+                finally:
+                    movie.delete()
+            self.stdout.write(
+                f"{'single row' if not shards else f'{shards} shards':>10}  "
+                f"{len(raters) / elapsed:.0f} ratings/s over {options['threads']} threads"
+            )
+
+    def submit_ratings(self, movie, raters, options):
+        rng = random.Random(options["seed"])
+        jobs = [(rater, rng.randint(1, 5)) for rater in raters]
+        threads = options["threads"]
+        url = reverse("submit_rating")
+
+        def worker(chunk):
+            client = APIClient()
+            statuses = []
+            try:
+                for rater, value in chunk:
+                    client.force_authenticate(rater)
+                    response = client.post(
+                        url, {"movie": str(movie.pk), "rating": value}, format="json"
+                    )
+                    statuses.append(response.status_code)
+            finally:
+                connection.close()
+            return statuses
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            statuses = [
+                status
+                for chunk in executor.map(worker, [jobs[i::threads] for i in range(threads)])
+                for status in chunk
+            ]
+        elapsed = time.perf_counter() - started
+        if set(statuses) != {201}:
+            raise CommandError(f"Unexpected responses: {sorted(set(statuses))}")
+        return sum(value for _, value in jobs), elapsed
@@ -0,0 +1,67 @@
+import datetime
+import time
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from external.renderers import FastJSONRenderer, MessagePackRenderer
+from apps.movie.models import Movie
+from apps.user.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare render time and payload size of movies_list pages across the "
+        "stock JSON, fast JSON and MessagePack renderers. Rows are created in a "
+        "transaction that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=500)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = User.objects.create(
+                username="bench-renderers",
+                email="bench-renderers@example.com",
+                first_name="Bench",
+                last_name="Renderers",
+            )
+            Movie.objects.bulk_create(
+                Movie(
+                    name=f"Benchmark Movie {i}",
+                    description="A movie created to benchmark response rendering " * 3,
+                    released_at=datetime.date(2000, 1, 1) + datetime.timedelta(days=i),
+                    duration=90 + i % 60,
+                    genre="Drama",
+                    language="English",
+                    created_by=user,
+                )
+                for i in range(100)
+            )
+            client = APIClient()
+            client.force_authenticate(user)
+            pages = {}
+            for page_size in [30, 100]:
+                cache.clear()
+                response = client.get(reverse("movies_list"), {"page_size": page_size})
+                pages[page_size] = response.data
+            transaction.set_rollback(True)
+
+        renderers = {
+            "json": JSONRenderer(),
+            "fast json": FastJSONRenderer(),
+            "msgpack": MessagePackRenderer(),
+        }
+        for page_size, data in pages.items():
+            for name, renderer in renderers.items():
+                started = time.perf_counter()
+                for _ in range(options["repeat"]):
+                    body = renderer.render(data)
+                elapsed = (time.perf_counter() - started) / options["repeat"]
+                self.stdout.write(
+                    f"{page_size:>3} rows  {name:<9}  render: {elapsed * 1000:.3f} ms  "
+                    f"size: {len(body)} bytes"
+                )
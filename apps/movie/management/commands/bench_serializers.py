@@ -0,0 +1,94 @@
+import datetime
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from external.projection import project
+from apps.movie.models import Movie, Rating, ReportedMovie
+from apps.movie.serializers.serializers_v1 import (
+    MovieListSerializer,
+    RatedMovieListSerializer,
+    ReportedMovieListSerializer,
+)
+from apps.user.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare ModelSerializer output against the values() projection for list "
+        "pages of 30 and 100 rows. Rows are created in a transaction that is "
+        "rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=200)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.create_rows(100)
+            for serializer_class in [
+                MovieListSerializer,
+                RatedMovieListSerializer,
+                ReportedMovieListSerializer,
+            ]:
+                for rows in [30, 100]:
+                    self.compare(serializer_class, rows, options["repeat"])
+            transaction.set_rollback(True)
+
+    def create_rows(self, count):
+        user = User.objects.create(
+            username="bench-serializers",
+            email="bench-serializers@example.com",
+            first_name="Bench",
+            last_name="Serializers",
+        )
+        movies = Movie.objects.bulk_create(
+            Movie(
+                name=f"Benchmark Movie {i}",
+                description="A movie created to benchmark list serialization",
+                released_at=datetime.date(2000, 1, 1) + datetime.timedelta(days=i),
+                duration=90 + i % 60,
+                genre="Drama",
+                language="English",
+                created_by=user,
+            )
+            for i in range(count)
+        )
+        Rating.objects.bulk_create(
+            Rating(user=user, movie=movie, rating=1 + i % 5) for i, movie in enumerate(movies)
+        )
+        ReportedMovie.objects.bulk_create(
+            ReportedMovie(movie=movie, reported_by=user, reason="Benchmark")
+            for movie in movies
+        )
+
+    def compare(self, serializer_class, rows, repeat):
+        queryset = serializer_class.Meta.model.objects.order_by("-created_at", "-id")
+        instances = list(queryset[:rows])
+        values = list(project(queryset, serializer_class)[:rows])
+
+        # Serialization alone, then with the page fetch included
+        timings = {
+            "instances": self.time(lambda: serializer_class(instances, many=True).data, repeat),
+            "values": self.time(lambda: serializer_class(values, many=True).data, repeat),
+            "instances+fetch": self.time(
+                lambda: serializer_class(list(queryset[:rows]), many=True).data, repeat
+            ),
+            "values+fetch": self.time(
+                lambda: serializer_class(
+                    list(project(queryset, serializer_class)[:rows]), many=True
+                ).data,
+                repeat,
+            ),
+        }
+        self.stdout.write(
+            f"{serializer_class.__name__:<28} {rows:>3} rows  "
+            + "  ".join(f"{name}: {seconds * 1000:.3f} ms" for name, seconds in timings.items())
+            + f"  speedup: {timings['instances'] / timings['values']:.1f}x"
+        )
+
+    @staticmethod
+    def time(run, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            run()
+        return (time.perf_counter() - started) / repeat
@@ -0,0 +1,96 @@
+from functools import reduce
+from operator import or_
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from apps.movie.models import Movie, Rating
+
+
+class Command(BaseCommand):
+    help = (
+        "Collapse duplicate ratings of the same movie by the same user, keeping the "
+        "most recently updated one. Run before applying the unique rating migration "
+        "on large tables."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of duplicated (user, movie) pairs collapsed per transaction",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        collapsed_pairs = 0
+        deleted_ratings = 0
+        last_pair = None
+        while True:
+            # Continuing after the last pair, so each batch only groups the
+            # ratings it has not walked past yet
+            remaining = Rating.objects.all()
+            if last_pair is not None:
+                remaining = remaining.filter(
+                    Q(user=last_pair["user"], movie__gt=last_pair["movie"])
+                    | Q(user__gt=last_pair["user"])
+                )
+            pairs = list(
+                remaining.order_by("user_id", "movie_id")
+                .values("user", "movie")
+                .annotate(copies=Count("id"))
+                .filter(copies__gt=1)[:batch_size]
+            )
+            if not pairs:
+                break
+            last_pair = pairs[-1]
+
+            with transaction.atomic():
+                duplicated = reduce(
+                    or_, [Q(user=pair["user"], movie=pair["movie"]) for pair in pairs]
+                )
+                ratings = (
+                    Rating.objects.select_for_update()
+                    .filter(duplicated)
+                    .order_by("user_id", "movie_id", "-updated_at", "-created_at", "-id")
+                    .values_list("id", "user", "movie")
+                )
+                kept = set()
+                stale_ids = []
+                for rating_id, user_id, movie_id in ratings:
+                    if (user_id, movie_id) in kept:
+                        stale_ids.append(rating_id)
+                    else:
+                        kept.add((user_id, movie_id))
+
+                # Aggregates of duplicated movies are already suspect, deltas
+                # could take them below zero, so the rows go without and the
+                # movies are recounted
+                deleted = self.delete_ratings(stale_ids)
+                Movie.reconcile_rating_aggregates(
+                    queryset=Movie.objects.filter(pk__in={pair["movie"] for pair in pairs})
+                )
+
+            collapsed_pairs += len(pairs)
+            deleted_ratings += deleted
+            self.stdout.write(f"Collapsed {collapsed_pairs} pair(s) so far")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Removed {deleted_ratings} duplicate rating(s) across {collapsed_pairs} pair(s)"
+            )
+        )
+
+    @staticmethod
+    def delete_ratings(rating_ids):
+        if not rating_ids:
+            return 0
+        pk = Rating._meta.pk
+        placeholders = ", ".join(["%s"] * len(rating_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {connection.ops.quote_name(Rating._meta.db_table)} "
+                f"WHERE {connection.ops.quote_name(pk.column)} IN ({placeholders})",
+                [pk.get_db_prep_value(rating_id, connection) for rating_id in rating_ids],
+            )
+            return cursor.rowcount
@@ -0,0 +1,23 @@
+import time
+from django.core.management.base import BaseCommand
+from apps.movie.models import Movie
+
+
+class Command(BaseCommand):
+    help = "Fold pending rating shard deltas into the movie aggregates"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Keep folding every INTERVAL seconds instead of running once",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            folded = Movie.fold_rating_shards()
+            self.stdout.write(f"Folded rating shards for {folded} movie(s)")
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,137 @@
+import csv
+import itertools
+import time
+import orjson
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+from apps.movie import autocomplete, facets, response_cache, search
+from apps.movie.models import Movie
+from apps.movie.serializers.serializers_v1 import MovieImportSerializer
+from apps.user.models import User
+from external.bulk_copy import can_copy, copy_objects
+
+EXTRA_VALUES = "_extra"
+
+
+class Command(BaseCommand):
+    help = (
+        "Import movies from a CSV (with a header line) or JSONL file. Rows are read "
+        "lazily, validated with the rules of create-movie/ and inserted a chunk per "
+        "transaction with COPY on PostgreSQL or bulk_create elsewhere. Rejected rows "
+        "are written to an error file, and an interrupted import resumes with --offset."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--created-by", required=True, help="Username the movies are created by")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="Defaults to the file extension")
+        parser.add_argument("--chunk-size", type=int, default=5000)
+        parser.add_argument("--offset", type=int, default=0, help="Number of rows to skip")
+        parser.add_argument("--errors", help="Rejected rows file, defaults to <path>.errors.jsonl")
+        parser.add_argument("--method", choices=["auto", "copy", "bulk_create"], default="auto")
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(username=options["created_by"]).first()
+        if not user:
+            raise CommandError(f"User {options['created_by']} does not exist")
+        file_format = options["format"] or ("csv" if options["path"].endswith(".csv") else "jsonl")
+        method = options["method"]
+        if method == "auto":
+            method = "copy" if can_copy() else "bulk_create"
+        elif method == "copy" and not can_copy():
+            raise CommandError("COPY needs PostgreSQL")
+
+        offset = options["offset"]
+        errors_path = options["errors"] or f"{options['path']}.errors.jsonl"
+        imported = rejected = 0
+        started = time.perf_counter()
+        # Resuming keeps the rejections of the rows already processed
+        with open(options["path"], newline="", encoding="utf-8") as source, open(
+            errors_path, "ab" if offset else "wb"
+        ) as errors:
+            rows = self.read_rows(source, file_format)
+            rows = itertools.islice(enumerate(rows), offset, None)
+            while chunk := list(itertools.islice(rows, options["chunk_size"])):
+                movies, rejections = self.validate(chunk, user)
+                with transaction.atomic():
+                    self.insert(movies, method)
+                    # Each committed chunk is visible to reads right away,
+                    # even if a later one fails or the import is stopped
+                    if movies:
+                        transaction.on_commit(self.invalidate_caches)
+                errors.writelines(
+                    orjson.dumps(rejection) + b"\n"
+                    for rejection in rejections
+                )
+                errors.flush()
+                imported += len(movies)
+                rejected += len(rejections)
+                offset = chunk[-1][0] + 1
+                self.stdout.write(
+                    f"offset {offset}: {imported} imported, {rejected} rejected, "
+                    f"{(imported + rejected) / (time.perf_counter() - started):.0f} rows/s"
+                )
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {imported} movie(s) and rejected {rejected} in {elapsed:.1f}s "
+                f"({(imported + rejected) / elapsed if elapsed else 0:.0f} rows/s) with {method}. "
+                f"Rejected rows are in {errors_path}"
+            )
+        )
+
+    @staticmethod
+    def invalidate_caches():
+        facets.invalidate_facets()
+        response_cache.bump_version(response_cache.CATALOG_VERSION_KEY)
+        autocomplete.invalidate_titles()
+
+    @staticmethod
+    def read_rows(source, file_format):
+        if file_format == "csv":
+            # Values past the header go under one key instead of None, which
+            # the rejection log could not serialize
+            yield from csv.DictReader(source, restkey=EXTRA_VALUES)
+            return
+        for line in source:
+            if not line.strip():
+                continue
+            try:
+                yield orjson.loads(line)
+            except orjson.JSONDecodeError:
+                yield line
+
+    @staticmethod
+    def validate(chunk, user):
+        serializer = MovieImportSerializer()
+        movies = []
+        rejections = []
+        for offset, row in chunk:
+            if not isinstance(row, dict):
+                rejections.append({"offset": offset, "row": row, "errors": ["Not a JSON object"]})
+                continue
+            if EXTRA_VALUES in row:
+                rejections.append(
+                    {"offset": offset, "row": row, "errors": ["More values than header columns"]}
+                )
+                continue
+            try:
+                data = serializer.run_validation(row)
+            except ValidationError as exc:
+                rejections.append({"offset": offset, "row": row, "errors": exc.detail})
+                continue
+            movies.append(Movie(**data, created_by_id=user.id))
+        return movies, rejections
+
+    def insert(self, movies, method):
+        if not movies:
+            return
+        if method == "copy":
+            copy_objects(Movie, movies)
+        else:
+            Movie.objects.bulk_create(movies, batch_size=1000)
+        # PostgreSQL fills search_vector with a trigger, COPY included
+        if not search.uses_search_vector():
+            search.index_movies(movies)
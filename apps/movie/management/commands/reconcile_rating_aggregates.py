@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from apps.movie.models import Movie
+
+
+class Command(BaseCommand):
+    help = "Recompute movie rating aggregates from the Rating table to repair drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of movies recomputed per transaction",
+        )
+
+    def handle(self, *args, **options):
+        corrected = Movie.reconcile_rating_aggregates(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Reconciled rating aggregates, {corrected} movie(s) corrected")
+        )
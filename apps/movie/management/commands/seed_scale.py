@@ -0,0 +1,230 @@
+import datetime
+import heapq
+import itertools
+import math
+import random
+import time
+import uuid
+from bisect import bisect
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from apps.movie import autocomplete, facets, response_cache, search
+from apps.movie.models import Movie, Rating, ReportedMovie
+from apps.user.models import User
+from external.bulk_copy import can_copy, copy_objects
+from external.enum import AdminApproval
+
+GENRES = ["Drama", "Comedy", "Action", "Thriller", "Horror", "Romance", "Documentary", "Animation"]
+LANGUAGES = ["English", "Spanish", "French", "Hindi", "Japanese", "Korean", "German", "Bangla"]
+WORDS = [
+    "night", "river", "last", "silent", "city", "storm", "garden", "winter", "broken",
+    "golden", "shadow", "summer", "echo", "paper", "iron", "little", "wild", "hidden",
+    "glass", "empire", "letter", "ocean", "fire", "north", "stranger", "dream", "road",
+    "house", "secret", "morning", "blue", "memory",
+]
+REASONS = ["Wrong release date", "Duplicate entry", "Offensive content", "Spoilers in description"]
+
+
+def zipf_cum_weights(count, exponent):
+    # Cumulative weights of ranks 1..count under a Zipf-like law
+    return list(itertools.accumulate(1 / rank**exponent for rank in range(1, count + 1)))
+
+
+def spread(total, cum_weights, cap):
+    """
+    Splits ``total`` over the ranks in proportion to their weights, at most
+    ``cap`` each, with the largest remainder method so the shares add up.
+    """
+    weight_sum = cum_weights[-1]
+    exact = [
+        total * (weight - previous) / weight_sum
+        for previous, weight in zip([0, *cum_weights], cum_weights)
+    ]
+    shares = [min(cap, int(share)) for share in exact]
+    by_remainder = sorted(range(len(exact)), key=lambda rank: shares[rank] - exact[rank])
+    missing = min(total - sum(shares), sum(cap - share for share in shares))
+    while missing > 0:
+        for rank in by_remainder:
+            if missing and shares[rank] < cap:
+                shares[rank] += 1
+                missing -= 1
+    return shares
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate users, movies, ratings and reports at scale for load and query "
+        "testing. Users' activity and movies' popularity follow a Zipf-like skew. "
+        "Rows are bulk inserted, COPY on PostgreSQL, so no signals run; search terms, "
+        "rating aggregates and caches are brought up to date once at the end. The "
+        "same --seed generates the same data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--movies", type=int, default=10000)
+        parser.add_argument("--ratings", type=int, default=100000)
+        parser.add_argument("--reports", type=int, help="Defaults to one per 100 ratings")
+        parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of popularity")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=10000)
+        parser.add_argument("--password", default="password", help="Password of every seeded user")
+        parser.add_argument("--prefix", default="seed", help="Prefix of the seeded usernames")
+
+    def handle(self, *args, **options):
+        if min(options["users"], options["movies"]) < 1:
+            raise CommandError("Needs at least one user and one movie")
+        if User.objects.filter(username__startswith=f"{options['prefix']}_").exists():
+            raise CommandError(f"Users prefixed {options['prefix']}_ exist, pick another --prefix")
+
+        # Ids come from the generator too, so each prefix draws its own
+        self.rng = random.Random(f"{options['prefix']}:{options['seed']}")
+        self.batch_size = options["batch_size"]
+        self.use_copy = can_copy()
+        started = time.perf_counter()
+
+        user_ids = self.seed_users(options)
+        movie_ids = self.seed_movies(options, user_ids)
+        # Popularity ranks are shuffled so they do not follow creation order
+        self.rng.shuffle(user_ids)
+        self.rng.shuffle(movie_ids)
+        self.seed_ratings(options, user_ids, movie_ids)
+        self.seed_reports(options, user_ids, movie_ids)
+
+        phase = time.perf_counter()
+        Movie.reconcile_rating_aggregates(
+            queryset=Movie.objects.filter(created_by__username__startswith=f"{options['prefix']}_")
+        )
+        facets.invalidate_facets()
+        response_cache.bump_version(response_cache.CATALOG_VERSION_KEY)
+        autocomplete.invalidate_titles()
+        self.report("aggregates", len(movie_ids), phase)
+        self.stdout.write(
+            self.style.SUCCESS(f"Seeded in {time.perf_counter() - started:.1f}s with seed {options['seed']}")
+        )
+
+    def new_id(self):
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def random_date(self, start, days):
+        return start + datetime.timedelta(days=self.rng.randrange(days))
+
+    def insert(self, model, objects):
+        with transaction.atomic():
+            if self.use_copy:
+                copy_objects(model, objects)
+            else:
+                model.objects.bulk_create(objects, batch_size=1000)
+
+    def insert_batches(self, model, objects):
+        while batch := list(itertools.islice(objects, self.batch_size)):
+            self.insert(model, batch)
+            yield batch
+
+    def report(self, name, count, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"{name}: {count} in {elapsed:.1f}s ({count / elapsed if elapsed else 0:.0f} rows/s)")
+
+    def seed_users(self, options):
+        started = time.perf_counter()
+        # One hash for everyone, hashing per user would take longer than the inserts
+        password = make_password(options["password"])
+        prefix = options["prefix"]
+        users = (
+            User(
+                id=self.new_id(),
+                username=f"{prefix}_{number}",
+                email=f"{prefix}_{number}@example.com",
+                first_name=self.rng.choice(WORDS).title(),
+                last_name=self.rng.choice(WORDS).title(),
+                password=password,
+                birth_date=self.random_date(datetime.date(1950, 1, 1), 20000),
+            )
+            for number in range(options["users"])
+        )
+        user_ids = [user.id for batch in self.insert_batches(User, users) for user in batch]
+        self.report("users", len(user_ids), started)
+        return user_ids
+
+    def seed_movies(self, options, user_ids):
+        started = time.perf_counter()
+        genre_weights = zipf_cum_weights(len(GENRES), 0.8)
+        language_weights = zipf_cum_weights(len(LANGUAGES), 1.5)
+        movies = (
+            Movie(
+                id=self.new_id(),
+                name=" ".join(self.rng.sample(WORDS, self.rng.randint(1, 4))).title(),
+                description=" ".join(self.rng.choices(WORDS, k=self.rng.randint(8, 40))).capitalize(),
+                released_at=self.random_date(datetime.date(1950, 1, 1), 27000),
+                duration=self.rng.randint(70, 200),
+                genre=self.rng.choices(GENRES, cum_weights=genre_weights)[0],
+                language=self.rng.choices(LANGUAGES, cum_weights=language_weights)[0],
+                created_by_id=self.rng.choice(user_ids),
+            )
+            for _ in range(options["movies"])
+        )
+        movie_ids = []
+        for batch in self.insert_batches(Movie, movies):
+            # PostgreSQL fills search_vector with a trigger, COPY included
+            if not search.uses_search_vector():
+                search.index_movies(batch)
+            movie_ids.extend(movie.id for movie in batch)
+        self.report("movies", len(movie_ids), started)
+        return movie_ids
+
+    def rated_movies(self, count, movie_weights):
+        # ``count`` distinct movie positions picked by popularity
+        total = movie_weights[-1]
+        if count * 10 <= len(movie_weights):
+            picked = set()
+            while len(picked) < count:
+                picked.add(bisect(movie_weights, self.rng.random() * total))
+            return picked
+        # Redrawing would mostly hit taken movies, weighted sampling without
+        # replacement (Efraimidis-Spirakis) picks the heavy users' share directly
+        weights = [weight - previous for previous, weight in zip([0, *movie_weights], movie_weights)]
+        return heapq.nlargest(
+            count,
+            range(len(weights)),
+            key=lambda position: math.log(1 - self.rng.random()) / weights[position],
+        )
+
+    def seed_ratings(self, options, user_ids, movie_ids):
+        started = time.perf_counter()
+        movie_weights = zipf_cum_weights(len(movie_ids), options["skew"])
+        # Some movies are better liked than others
+        quality = [self.rng.uniform(1.5, 4.8) for _ in movie_ids]
+        shares = spread(options["ratings"], zipf_cum_weights(len(user_ids), options["skew"]), len(movie_ids))
+
+        def ratings():
+            for user_id, count in zip(user_ids, shares):
+                for position in sorted(self.rated_movies(count, movie_weights)):
+                    value = round(self.rng.gauss(quality[position], 1))
+                    yield Rating(
+                        id=self.new_id(),
+                        user_id=user_id,
+                        movie_id=movie_ids[position],
+                        rating=min(5, max(1, value)),
+                    )
+
+        count = sum(len(batch) for batch in self.insert_batches(Rating, ratings()))
+        self.report("ratings", count, started)
+
+    def seed_reports(self, options, user_ids, movie_ids):
+        started = time.perf_counter()
+        total = options["ratings"] // 100 if options["reports"] is None else options["reports"]
+        movie_weights = zipf_cum_weights(len(movie_ids), options["skew"])
+        user_weights = zipf_cum_weights(len(user_ids), options["skew"])
+        reports = (
+            ReportedMovie(
+                id=self.new_id(),
+                movie_id=self.rng.choices(movie_ids, cum_weights=movie_weights)[0],
+                reported_by_id=self.rng.choices(user_ids, cum_weights=user_weights)[0],
+                reason=self.rng.choice(REASONS),
+                admin_approval=self.rng.choice(AdminApproval.values()),
+            )
+            for _ in range(total)
+        )
+        count = sum(len(batch) for batch in self.insert_batches(ReportedMovie, reports))
+        self.report("reports", count, started)
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.2 on 2026-10-18 12:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0002_alter_movie_options_alter_rating_options_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['created_at', 'id'], name='movie_created_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['created_by', 'created_at', 'id'], name='movie_creator_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rating',
+            index=models.Index(fields=['created_at', 'id'], name='rating_created_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rating',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='rating_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reportedmovie',
+            index=models.Index(fields=['created_at', 'id'], name='report_created_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reportedmovie',
+            index=models.Index(fields=['reported_by', 'created_at', 'id'], name='report_reporter_created_idx'),
+        ),
+    ]
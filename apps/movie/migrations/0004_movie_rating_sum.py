@@ -0,0 +1,41 @@
+# Generated by Django 5.1.2 on 2026-10-18 12:07
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    Movie = apps.get_model('movie', 'Movie')
+    Rating = apps.get_model('movie', 'Rating')
+    totals = (
+        Rating.objects.order_by()
+        .values('movie')
+        .annotate(rating_sum=Sum('rating'), total_rating=Count('id'))
+    )
+    for row in totals.iterator():
+        avg_rating = (Decimal(row['rating_sum']) / row['total_rating']).quantize(
+            Decimal('0.01'), rounding=ROUND_HALF_UP
+        )
+        Movie.objects.filter(pk=row['movie']).update(
+            rating_sum=row['rating_sum'],
+            total_rating=row['total_rating'],
+            avg_rating=avg_rating,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0003_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='rating_sum',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.2 on 2026-10-18 12:09
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0004_movie_rating_sum'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovieRatingShard',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('shard', models.PositiveSmallIntegerField()),
+                ('rating_sum', models.BigIntegerField(default=0)),
+                ('total_rating', models.BigIntegerField(default=0)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rating_shards', to='movie.movie')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('movie', 'shard'), name='unique_movie_rating_shard')],
+            },
+        ),
+    ]
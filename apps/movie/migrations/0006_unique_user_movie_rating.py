@@ -0,0 +1,63 @@
+# Generated by Django 5.1.2 on 2026-10-18 12:12
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def collapse_duplicate_ratings(apps, schema_editor):
+    # Keeps the most recently updated rating of every (user, movie) pair. Large
+    # tables should run `manage.py collapse_duplicate_ratings` before migrating.
+    Movie = apps.get_model('movie', 'Movie')
+    Rating = apps.get_model('movie', 'Rating')
+    MovieRatingShard = apps.get_model('movie', 'MovieRatingShard')
+
+    duplicates = (
+        Rating.objects.order_by()
+        .values('user', 'movie')
+        .annotate(copies=Count('id'))
+        .filter(copies__gt=1)
+    )
+    affected_movies = set()
+    for pair in duplicates.iterator():
+        stale_ids = list(
+            Rating.objects.filter(user=pair['user'], movie=pair['movie'])
+            .order_by('-updated_at', '-created_at', '-id')
+            .values_list('id', flat=True)[1:]
+        )
+        Rating.objects.filter(id__in=stale_ids).delete()
+        affected_movies.add(pair['movie'])
+
+    for movie_id in affected_movies:
+        totals = Rating.objects.filter(movie=movie_id).aggregate(
+            rating_sum=Sum('rating'), total_rating=Count('id')
+        )
+        rating_sum = totals['rating_sum'] or 0
+        total_rating = totals['total_rating']
+        avg_rating = Decimal('0.00')
+        if total_rating:
+            avg_rating = (Decimal(rating_sum) / total_rating).quantize(
+                Decimal('0.01'), rounding=ROUND_HALF_UP
+            )
+        MovieRatingShard.objects.filter(movie=movie_id).update(rating_sum=0, total_rating=0)
+        Movie.objects.filter(pk=movie_id).update(
+            rating_sum=rating_sum, total_rating=total_rating, avg_rating=avg_rating
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0005_movieratingshard'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(collapse_duplicate_ratings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='rating',
+            constraint=models.UniqueConstraint(fields=('user', 'movie'), name='unique_user_movie_rating'),
+        ),
+    ]
@@ -0,0 +1,133 @@
+# Generated by Django 5.1.2 on 2026-10-18 12:14
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.deletion
+import re
+import uuid
+from collections import Counter
+from django.db import migrations, models
+
+# Frozen copies of apps.movie.search as of this migration, so later changes
+# there do not change what it does
+SEARCH_CONFIG = 'english'
+
+STOP_WORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is',
+    'it', 'of', 'on', 'or', 'that', 'the', 'to', 'was', 'with',
+}
+
+
+def tokenize(text):
+    return [
+        token
+        for token in re.findall(r'\w+', (text or '').lower())
+        if len(token) > 1 and token not in STOP_WORDS
+    ]
+
+
+def get_search_terms(name, description):
+    weights = Counter()
+    for token in tokenize(name):
+        weights[token[:50]] += 4
+    for token in tokenize(description):
+        weights[token[:50]] += 1
+    return weights
+
+
+class AddIndexOnPostgreSQL(migrations.AddIndex):
+    # GIN indexes only exist on PostgreSQL, other databases search through
+    # MovieSearchTerm. The index is part of the model state either way.
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('{config}', coalesce({row}.name, '')), 'A') ||
+    setweight(to_tsvector('{config}', coalesce({row}.description, '')), 'B')
+"""
+
+
+def install_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        # The trigger keeps the tsvector current for every write path,
+        # including bulk inserts that bypass Movie.save
+        schema_editor.execute(
+            """
+            CREATE FUNCTION movie_movie_search_vector_update() RETURNS trigger AS $$
+            BEGIN
+                NEW.search_vector := %s;
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+            """ % SEARCH_VECTOR_SQL.format(config=SEARCH_CONFIG, row='NEW')
+        )
+        schema_editor.execute(
+            """
+            CREATE TRIGGER movie_movie_search_vector_trigger
+            BEFORE INSERT OR UPDATE OF name, description ON movie_movie
+            FOR EACH ROW EXECUTE FUNCTION movie_movie_search_vector_update()
+            """
+        )
+        schema_editor.execute(
+            "UPDATE movie_movie SET search_vector = %s"
+            % SEARCH_VECTOR_SQL.format(config=SEARCH_CONFIG, row='movie_movie')
+        )
+        return
+
+    Movie = apps.get_model('movie', 'Movie')
+    MovieSearchTerm = apps.get_model('movie', 'MovieSearchTerm')
+    for movie in Movie.objects.only('id', 'name', 'description').iterator():
+        MovieSearchTerm.objects.bulk_create(
+            MovieSearchTerm(movie_id=movie.pk, term=term, weight=weight)
+            for term, weight in get_search_terms(movie.name, movie.description).items()
+        )
+
+
+def uninstall_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "DROP TRIGGER IF EXISTS movie_movie_search_vector_trigger ON movie_movie"
+        )
+        schema_editor.execute("DROP FUNCTION IF EXISTS movie_movie_search_vector_update()")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movie', '0006_unique_user_movie_rating'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='MovieSearchTerm',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('term', models.CharField(max_length=50)),
+                ('weight', models.PositiveIntegerField()),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='movie.movie')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'movie'], name='movie_search_term_idx')],
+            },
+        ),
+        migrations.RunPython(install_search_index, uninstall_search_index),
+        AddIndexOnPostgreSQL(
+            model_name='movie',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='movie_search_vector_idx'),
+        ),
+    ]
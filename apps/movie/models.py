@@ -1,10 +1,22 @@
+import random
+import uuid
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
 from typing import Iterable
 from abstract.base_model import BaseModel
-from django.db import models
-from django.db.models import Avg
+from django.conf import settings
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Count, F, FloatField, DecimalField, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
 from apps.user.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from external.enum import AdminApproval
+from . import autocomplete, facets, response_cache, search
 
 
 class Movie(BaseModel):
@@ -18,11 +30,203 @@ class Movie(BaseModel):
     )
     avg_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
     total_rating = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveBigIntegerField(default=0)
     language = models.CharField(max_length=50)
     updated_at = models.DateTimeField(auto_now=True)
+    # Maintained by a database trigger on PostgreSQL, see apps.movie.search
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    # Columns movies_list can be ordered by, each backed by (column, id),
+    # (genre, column, id) and (language, column, id) indexes
+    LIST_ORDERING_FIELDS = ["created_at", "avg_rating", "released_at", "total_rating"]
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="movie_created_at_id_idx"),
+            models.Index(
+                fields=["created_by", "created_at", "id"],
+                name="movie_creator_created_idx",
+            ),
+            models.Index(fields=["avg_rating", "id"], name="movie_avg_rating_id_idx"),
+            models.Index(fields=["released_at", "id"], name="movie_released_at_id_idx"),
+            models.Index(fields=["total_rating", "id"], name="movie_total_rating_id_idx"),
+            models.Index(
+                fields=["genre", "created_at", "id"], name="movie_genre_created_idx"
+            ),
+            models.Index(
+                fields=["genre", "avg_rating", "id"], name="movie_genre_avg_rating_idx"
+            ),
+            models.Index(
+                fields=["genre", "released_at", "id"], name="movie_genre_released_idx"
+            ),
+            models.Index(
+                fields=["genre", "total_rating", "id"], name="movie_genre_total_idx"
+            ),
+            models.Index(
+                fields=["language", "created_at", "id"], name="movie_lang_created_idx"
+            ),
+            models.Index(
+                fields=["language", "avg_rating", "id"], name="movie_lang_avg_rating_idx"
+            ),
+            models.Index(
+                fields=["language", "released_at", "id"], name="movie_lang_released_idx"
+            ),
+            models.Index(
+                fields=["language", "total_rating", "id"], name="movie_lang_total_idx"
+            ),
+            # Only created on PostgreSQL, see migration 0007
+            GinIndex(fields=["search_vector"], name="movie_search_vector_idx"),
+        ]
+
+    @staticmethod
+    def average_rating_expression(rating_sum, total_rating):
+        return Cast(
+            Coalesce(
+                Cast(rating_sum, FloatField()) / NullIf(total_rating, 0),
+                Value(0.0),
+            ),
+            DecimalField(max_digits=3, decimal_places=2),
+        )
+
+    @classmethod
+    def apply_rating_delta(cls, movie_id, rating_delta, count_delta):
+        # A single UPDATE keeps sum, count and average consistent without
+        # reading the movie's ratings back
+        rating_sum = F("rating_sum") + rating_delta
+        total_rating = F("total_rating") + count_delta
+        return cls.objects.filter(pk=movie_id).update(
+            rating_sum=rating_sum,
+            total_rating=total_rating,
+            avg_rating=cls.average_rating_expression(rating_sum, total_rating),
+            updated_at=timezone.now(),
+        )
+
+    @classmethod
+    def record_rating_delta(cls, movie_id, rating_delta, count_delta):
+        # Hot movies spread their writes over shard rows when sharding is on
+        if settings.MOVIE_RATING_SHARDS:
+            MovieRatingShard.add_delta(movie_id, rating_delta, count_delta)
+        else:
+            cls.apply_rating_delta(movie_id, rating_delta, count_delta)
+        response_cache.invalidate_movies([movie_id])
+
+    @classmethod
+    def fold_rating_shards(cls, movie_ids=None):
+        """
+        Moves pending shard deltas into the movie aggregates and returns the
+        number of movies updated. Shards locked by an in-flight writer are
+        skipped and picked up by the next fold.
+        """
+        with transaction.atomic():
+            shards = (
+                MovieRatingShard.objects.select_for_update(skip_locked=True)
+                .exclude(rating_sum=0, total_rating=0)
+                .order_by("pk")
+                .only("id", "movie_id", "rating_sum", "total_rating")
+            )
+            if movie_ids is not None:
+                shards = shards.filter(movie_id__in=movie_ids)
+
+            pending = defaultdict(lambda: [0, 0])
+            folded = []
+            for shard in shards:
+                pending[shard.movie_id][0] += shard.rating_sum
+                pending[shard.movie_id][1] += shard.total_rating
+                folded.append(shard.pk)
+
+            for movie_id, (rating_delta, count_delta) in pending.items():
+                cls.apply_rating_delta(movie_id, rating_delta, count_delta)
+            MovieRatingShard.objects.filter(pk__in=folded).update(
+                rating_sum=0, total_rating=0
+            )
+            response_cache.invalidate_movies(pending)
+        return len(pending)
+
+    @staticmethod
+    def calculate_average_rating(rating_sum, total_rating):
+        if not total_rating:
+            return Decimal("0.00")
+        return (Decimal(rating_sum) / total_rating).quantize(
+            Decimal("0.01"), rounding=ROUND_HALF_UP
+        )
+
+    @classmethod
+    def reconcile_rating_aggregates(cls, batch_size=1000, queryset=None):
+        """
+        Recomputes rating_sum, total_rating and avg_rating from the Rating
+        table in primary key batches and returns the number of corrected movies.
+        """
+        queryset = (cls.objects.all() if queryset is None else queryset).order_by("pk")
+        queryset = queryset.only("id", "rating_sum", "total_rating", "avg_rating")
+        corrected = 0
+        last_pk = None
+        while True:
+            with transaction.atomic():
+                batch = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+                # Locking the batch so concurrent deltas land after the recount
+                movies = list(batch.select_for_update()[:batch_size])
+                if not movies:
+                    break
+                last_pk = movies[-1].pk
+
+                # Pending shard deltas are already part of the recount
+                shards = MovieRatingShard.objects.filter(
+                    movie__in=[movie.pk for movie in movies]
+                ).order_by("pk")
+                list(shards.select_for_update().values_list("pk", flat=True))
+                shards.update(rating_sum=0, total_rating=0)
+
+                totals = {
+                    row["movie"]: row
+                    for row in Rating.objects.filter(movie__in=[movie.pk for movie in movies])
+                    .order_by()
+                    .values("movie")
+                    .annotate(rating_sum=Sum("rating"), total_rating=Count("id"))
+                }
+                drifted = []
+                for movie in movies:
+                    row = totals.get(movie.pk, {})
+                    rating_sum = row.get("rating_sum") or 0
+                    total_rating = row.get("total_rating") or 0
+                    avg_rating = cls.calculate_average_rating(rating_sum, total_rating)
+                    if (movie.rating_sum, movie.total_rating, movie.avg_rating) != (
+                        rating_sum,
+                        total_rating,
+                        avg_rating,
+                    ):
+                        movie.rating_sum = rating_sum
+                        movie.total_rating = total_rating
+                        movie.avg_rating = avg_rating
+                        movie.updated_at = timezone.now()
+                        drifted.append(movie)
+
+                cls.objects.bulk_update(
+                    drifted, ["rating_sum", "total_rating", "avg_rating", "updated_at"]
+                )
+                response_cache.invalidate_movies([movie.pk for movie in drifted])
+                corrected += len(drifted)
+        return corrected
+
+
+class RatingQuerySet(models.QuerySet):
+    def delete(self):
+        # One delta per movie rather than per rating. Ratings removed by a
+        # movie's cascade skip this, and with it the movie they belong to
+        with transaction.atomic(using=self.db):
+            deltas = list(
+                self.order_by()
+                .values_list("movie")
+                .annotate(rating_sum=Sum("rating"), total_rating=Count("id"))
+            )
+            deleted = super().delete()
+            # Sorted so concurrent deletes lock movie rows in the same order
+            for movie_id, rating_sum, total_rating in sorted(deltas):
+                Movie.record_rating_delta(movie_id, -rating_sum, -total_rating)
+        return deleted
+
+    delete.alters_data = True
+    delete.queryset_only = True
 
 
 class Rating(BaseModel):
@@ -32,21 +236,303 @@ class Rating(BaseModel):
         validators=[MinValueValidator(1), MaxValueValidator(5)]
     )
 
+    objects = RatingQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembering the stored values so save can apply a delta
+        instance._stored_aggregate = (
+            instance.__dict__.get("movie_id"),
+            instance.__dict__.get("rating"),
+        )
+        return instance
+
+    def get_stored_aggregate(self):
+        stored = getattr(self, "_stored_aggregate", (None, None))
+        if None in stored:
+            stored = (
+                type(self)
+                .objects.filter(pk=self.pk)
+                .values_list("movie_id", "rating")
+                .first()
+            )
+        return stored
+
     def save(self, *args, **kwargs):
-        # Saving the rating instance first
-        super().save(*args, **kwargs)
+        adding = self._state.adding
+        with transaction.atomic():
+            stored = None if adding else self.get_stored_aggregate()
+
+            # Saving the rating instance first
+            super().save(*args, **kwargs)
+
+            # Applying the change to the movie aggregates as a delta
+            if not stored:
+                Movie.record_rating_delta(self.movie_id, self.rating, 1)
+            elif stored[0] != self.movie_id:
+                Movie.record_rating_delta(stored[0], -stored[1], -1)
+                Movie.record_rating_delta(self.movie_id, self.rating, 1)
+            elif stored[1] != self.rating:
+                Movie.record_rating_delta(self.movie_id, self.rating - stored[1], 0)
+
+        self._stored_aggregate = (self.movie_id, self.rating)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            stored = self.get_stored_aggregate()
+            deleted = super().delete(*args, **kwargs)
+            if stored:
+                Movie.record_rating_delta(stored[0], -stored[1], -1)
+        return deleted
+
+    @classmethod
+    def upsert(cls, user_id, movie_id, rating):
+        """
+        Rates a movie or replaces the user's earlier rating of it and returns
+        ``(rating_id, created)``. On PostgreSQL this is a single
+        ``INSERT ... ON CONFLICT DO UPDATE`` that also returns the previous value.
+        """
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                rating_id, created, previous = cls._upsert_returning_previous(
+                    user_id, movie_id, rating
+                )
+            else:
+                stored = (
+                    cls.objects.select_for_update()
+                    .filter(user_id=user_id, movie_id=movie_id)
+                    .values_list("id", "rating")
+                    .first()
+                )
+                if stored:
+                    cls.objects.filter(pk=stored[0]).update(
+                        rating=rating, updated_at=timezone.now()
+                    )
+                    rating_id, created, previous = stored[0], False, stored[1]
+                else:
+                    instance = cls(user_id=user_id, movie_id=movie_id, rating=rating)
+                    cls.objects.bulk_create([instance])
+                    rating_id, created, previous = instance.id, True, None
+
+            if created:
+                Movie.record_rating_delta(movie_id, rating, 1)
+            elif previous is None:
+                # Lost a race with a concurrent first rating, recount instead
+                Movie.reconcile_rating_aggregates(
+                    queryset=Movie.objects.filter(pk=movie_id)
+                )
+            elif previous != rating:
+                Movie.record_rating_delta(movie_id, rating - previous, 0)
+        return rating_id, created
+
+    @classmethod
+    def _upsert_sql(cls, row_count):
+        # The RETURNING subquery reads the statement snapshot, i.e. the row as
+        # it was before the conflict update, and xmax = 0 marks a fresh insert
+        quote = connection.ops.quote_name
+        table = quote(cls._meta.db_table)
+        column = {field.name: quote(field.column) for field in cls._meta.concrete_fields}
+        values = ", ".join(["(%s, true, %s, %s, %s, %s, %s)"] * row_count)
+        return (
+            f"INSERT INTO {table} ({column['id']}, {column['is_active']}, "
+            f"{column['created_at']}, {column['updated_at']}, {column['user']}, "
+            f"{column['movie']}, {column['rating']}) "
+            f"VALUES {values} "
+            f"ON CONFLICT ({column['user']}, {column['movie']}) DO UPDATE SET "
+            f"{column['rating']} = EXCLUDED.{column['rating']}, "
+            f"{column['updated_at']} = EXCLUDED.{column['updated_at']} "
+            f"RETURNING {column['movie']}, {column['id']}, (xmax = 0), "
+            f"(SELECT previous.{column['rating']} FROM {table} previous "
+            f"WHERE previous.{column['id']} = {table}.{column['id']})"
+        )
 
-        # Calculating the average rating and total count for the movie
-        avg_rating = self.movie.ratings.aggregate(Avg("rating"))["rating__avg"]
-        total_ratings = self.movie.ratings.count()
+    @classmethod
+    def _upsert_returning_previous(cls, user_id, movie_id, rating):
+        now = timezone.now()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                cls._upsert_sql(1), [uuid.uuid4(), now, now, user_id, movie_id, rating]
+            )
+            return cursor.fetchone()[1:]
 
-        # Updating the movie's avg_rating and total_rating fields
-        self.movie.avg_rating = avg_rating or 0.00
-        self.movie.total_rating = total_ratings
-        self.movie.save(update_fields=["avg_rating", "total_rating"])
+    @classmethod
+    def _bulk_upsert_returning_previous(cls, user_id, ratings):
+        now = timezone.now()
+        params = []
+        # Sorted so concurrent batches lock rating rows in the same order
+        for movie_id in sorted(ratings):
+            params += [uuid.uuid4(), now, now, user_id, movie_id, ratings[movie_id]]
+        with connection.cursor() as cursor:
+            cursor.execute(cls._upsert_sql(len(ratings)), params)
+            return cursor.fetchall()
+
+    @classmethod
+    def _bulk_upsert_locked(cls, user_id, ratings):
+        now = timezone.now()
+        stored = {
+            movie_id: (rating_id, rating)
+            for movie_id, rating_id, rating in cls.objects.select_for_update()
+            .filter(user_id=user_id, movie_id__in=list(ratings))
+            .order_by("pk")
+            .values_list("movie_id", "id", "rating")
+        }
+        inserted = [
+            cls(user_id=user_id, movie_id=movie_id, rating=rating)
+            for movie_id, rating in ratings.items()
+            if movie_id not in stored
+        ]
+        updated = [
+            cls(id=stored[movie_id][0], rating=rating, updated_at=now)
+            for movie_id, rating in ratings.items()
+            if movie_id in stored and stored[movie_id][1] != rating
+        ]
+        cls.objects.bulk_create(
+            inserted,
+            update_conflicts=True,
+            unique_fields=["user", "movie"],
+            update_fields=["rating", "updated_at"],
+        )
+        cls.objects.bulk_update(updated, ["rating", "updated_at"])
+
+        # A concurrent first rating may have won an insert, the row then
+        # keeps its own id and the previous rating is unknown
+        ids = dict(
+            cls.objects.filter(
+                user_id=user_id, movie_id__in=[rating.movie_id for rating in inserted]
+            ).values_list("movie_id", "id")
+        )
+        rows = [
+            (movie_id, rating_id, False, rating)
+            for movie_id, (rating_id, rating) in stored.items()
+        ]
+        rows += [
+            (rating.movie_id, ids[rating.movie_id], ids[rating.movie_id] == rating.id, None)
+            for rating in inserted
+        ]
+        return rows
+
+    @classmethod
+    def bulk_upsert(cls, user_id, ratings):
+        """
+        Applies ``{movie_id: rating}`` for one user with one aggregate delta
+        per movie and returns ``{movie_id: (id, created)}``. On PostgreSQL the
+        ratings are written by a single ``INSERT ... ON CONFLICT DO UPDATE``
+        that also returns the previous values.
+        """
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                rows = cls._bulk_upsert_returning_previous(user_id, ratings)
+            else:
+                rows = cls._bulk_upsert_locked(user_id, ratings)
+
+            raced = []
+            # Sorted so concurrent batches lock movie rows in the same order
+            for movie_id, _, created, previous in sorted(rows):
+                if created:
+                    Movie.record_rating_delta(movie_id, ratings[movie_id], 1)
+                elif previous is None:
+                    raced.append(movie_id)
+                elif previous != ratings[movie_id]:
+                    Movie.record_rating_delta(movie_id, ratings[movie_id] - previous, 0)
+            if raced:
+                # Lost races with concurrent first ratings, recount instead
+                Movie.reconcile_rating_aggregates(queryset=Movie.objects.filter(pk__in=raced))
+
+        return {movie_id: (rating_id, created) for movie_id, rating_id, created, _ in rows}
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="rating_created_at_id_idx"),
+            models.Index(
+                fields=["user", "created_at", "id"], name="rating_user_created_idx"
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "movie"], name="unique_user_movie_rating"
+            )
+        ]
+
+
+@receiver(pre_delete, sender=User)
+def remove_user_ratings(sender, instance, **kwargs):
+    # Rating has no delete signals so cascades stay a single DELETE, the
+    # user's ratings are taken out of the movie aggregates here instead
+    Rating.objects.filter(user=instance).delete()
+
+
+@receiver(post_save, sender=Movie)
+def index_movie_for_search(sender, instance, created, update_fields=None, **kwargs):
+    if search.uses_search_vector():
+        return
+    if update_fields is None or {"name", "description"} & set(update_fields):
+        search.index_movies([instance])
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def invalidate_movie_caches(sender, instance, **kwargs):
+    facets.invalidate_facets()
+    response_cache.invalidate_movies([instance.pk])
+
+
+@receiver(post_delete, sender=Movie)
+def remove_movie_title(sender, instance, **kwargs):
+    autocomplete.forget_title(instance.pk)
+
+
+class MovieSearchTerm(BaseModel):
+    # Inverted index backing movie search where tsvector is unavailable
+    movie = models.ForeignKey(
+        Movie, on_delete=models.CASCADE, related_name="search_terms"
+    )
+    term = models.CharField(max_length=50)
+    weight = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["term", "movie"], name="movie_search_term_idx"),
+        ]
+
+
+class MovieRatingShard(BaseModel):
+    movie = models.ForeignKey(
+        Movie, on_delete=models.CASCADE, related_name="rating_shards"
+    )
+    shard = models.PositiveSmallIntegerField()
+    # Pending deltas, folded into the movie by Movie.fold_rating_shards
+    rating_sum = models.BigIntegerField(default=0)
+    total_rating = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["movie", "shard"], name="unique_movie_rating_shard"
+            )
+        ]
+
+    @classmethod
+    def add_delta(cls, movie_id, rating_delta, count_delta):
+        shard = random.randrange(settings.MOVIE_RATING_SHARDS)
+        values = {
+            "rating_sum": F("rating_sum") + rating_delta,
+            "total_rating": F("total_rating") + count_delta,
+        }
+        if cls.objects.filter(movie_id=movie_id, shard=shard).update(**values):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(
+                    movie_id=movie_id,
+                    shard=shard,
+                    rating_sum=rating_delta,
+                    total_rating=count_delta,
+                )
+        except IntegrityError:
+            # Another writer created the shard row first
+            cls.objects.filter(movie_id=movie_id, shard=shard).update(**values)
 
 
 class ReportedMovie(BaseModel):
@@ -62,3 +548,10 @@ class ReportedMovie(BaseModel):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="report_created_at_id_idx"),
+            models.Index(
+                fields=["reported_by", "created_at", "id"],
+                name="report_reporter_created_idx",
+            ),
+        ]
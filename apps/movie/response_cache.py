@@ -0,0 +1,309 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.http import HttpResponseNotModified
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe
+from rest_framework.response import Response
+from external.conditional import get_shared_params
+
+CATALOG_VERSION_KEY = "movie-response:catalog-version"
+
+VALIDATOR_HEADERS = ["ETag", "Last-Modified"]
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+class Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def check_shared_cache():
+    # A write in one worker only retires the responses of the others when
+    # they read the version counters from the same cache
+    if settings.WEB_CONCURRENCY > 1 and isinstance(caches["default"], LocMemCache):
+        raise ImproperlyConfigured(
+            f"WEB_CONCURRENCY is {settings.WEB_CONCURRENCY} but the default cache is "
+            "LocMemCache, which each worker keeps to itself. Set CACHE_BACKEND and "
+            "CACHE_LOCATION to a shared cache such as Redis or Memcached."
+        )
+
+
+def movie_version_key(movie_id):
+    return f"movie-response:movie-version:{movie_id}"
+
+
+def get_version(key):
+    # A fresh counter starts from the clock so it never reuses the version of
+    # an evicted counter whose responses are still cached
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def modified_key(key):
+    return f"{key}:modified"
+
+
+def get_version_state(key):
+    """
+    Returns ``(version, modified)`` of a counter, ``modified`` being the unix
+    time of its last bump. A counter without one is taken as modified now,
+    which is never earlier than the data it covers.
+    """
+    state = cache.get_many([key, modified_key(key)])
+    if key not in state or modified_key(key) not in state:
+        version = get_version(key)
+        cache.add(modified_key(key), time.time(), None)
+        return version, cache.get(modified_key(key))
+    return state[key], state[modified_key(key)]
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+    # Set after the counter, so a reader may pair the new version with the
+    # old time, which costs a full response, but never the old version with
+    # the new time
+    cache.set(modified_key(key), time.time(), None)
+
+
+def _bump_movie_versions(movie_ids):
+    for movie_id in movie_ids:
+        bump_version(movie_version_key(movie_id))
+    bump_version(CATALOG_VERSION_KEY)
+
+
+def invalidate_movies(movie_ids):
+    """
+    Bumps the version of every given movie and of the catalog. Inside a
+    transaction the versions are bumped again on commit, so a response built
+    from the old rows in between is not kept under the new version.
+    """
+    movie_ids = {str(movie_id) for movie_id in movie_ids}
+    if not movie_ids:
+        return
+    _bump_movie_versions(movie_ids)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump_movie_versions(movie_ids))
+
+
+def record_lookup(endpoint, outcome, count=1):
+    with _stats_lock:
+        _stats[(endpoint, outcome)] += count
+
+
+def get_cache_stats():
+    with _stats_lock:
+        stats = {}
+        for (endpoint, outcome), count in _stats.items():
+            counts = stats.setdefault(endpoint, {"hits": 0, "misses": 0, "coalesced": 0})
+            counts[outcome] = count
+    return stats
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def get_request_signature(request):
+    # Parameter order does not change the response, so it does not split keys
+    signature = f"{request.get_host()}{request.path}?{get_shared_params(request)}"
+    return hashlib.sha1(signature.encode()).hexdigest()
+
+
+def single_flight(key, compute):
+    """
+    Runs ``compute`` once for concurrent callers with the same key in this
+    worker and returns ``(result, shared)``. Followers block on the leader
+    and get its result, or its exception re-raised.
+    """
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = Flight()
+
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result, True
+
+    try:
+        flight.result = compute()
+        return flight.result, False
+    except Exception as error:
+        flight.error = error
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+
+
+def wait_for_other_worker(lock_key, key):
+    """
+    Takes the cross-worker recompute lock, or waits for its holder to cache
+    the response. Returns ``(locked, cached)``.
+    """
+    timeout = settings.MOVIE_RESPONSE_LOCK_SECONDS
+    if cache.add(lock_key, 1, timeout):
+        return True, None
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(0.01)
+        cached = cache.get(key)
+        if cached is not None:
+            return False, cached
+    # The holder died or is slow, recompute rather than fail the request
+    return False, None
+
+
+def build_response(status, data, headers, cache_status):
+    if status == 304:
+        response = HttpResponseNotModified()
+    else:
+        response = Response(data, status)
+    for header, value in headers.items():
+        response[header] = value
+    response["X-Cache"] = cache_status
+    return response
+
+
+def revalidate(request, response):
+    # Turns a stored response into a 304 when the client already has it
+    return get_conditional_response(
+        request,
+        etag=response.get("ETag"),
+        last_modified=parse_http_date_safe(response.get("Last-Modified")),
+        response=response,
+    )
+
+
+def get_movie_versions(movie_ids):
+    keys = {movie_id: movie_version_key(movie_id) for movie_id in movie_ids}
+    versions = cache.get_many(keys.values())
+    return {
+        movie_id: versions[key] if key in versions else get_version(key)
+        for movie_id, key in keys.items()
+    }
+
+
+def cached_movies(endpoint, movie_ids, variant, load):
+    """
+    Returns ``{movie_id: data}`` for the movies that exist, each cached under
+    its own movie version so a write to one movie leaves the others cached.
+    Misses are loaded together through ``load(movie_ids)``, which returns the
+    same mapping. ``variant`` separates representations of the same movie.
+    """
+    versions = get_movie_versions(movie_ids)
+    keys = {
+        movie_id: f"movie-response:{endpoint}:{movie_id}:{version}:{variant}"
+        for movie_id, version in versions.items()
+    }
+    cached = cache.get_many(keys.values())
+    movies = {
+        movie_id: cached[key] for movie_id, key in keys.items() if key in cached
+    }
+    missing = [movie_id for movie_id in movie_ids if movie_id not in movies]
+    record_lookup(endpoint, "hits", len(movies))
+    record_lookup(endpoint, "misses", len(missing))
+    if missing:
+        loaded = load(missing)
+        cache.set_many(
+            {keys[movie_id]: data for movie_id, data in loaded.items()},
+            settings.MOVIE_RESPONSE_CACHE_SECONDS,
+        )
+        movies.update(loaded)
+    return movies
+
+
+def cache_movie_response(view_method):
+    """
+    Caches successful responses of a movie read action. Actions routed with
+    a movie ``id`` are keyed by that movie's version, all others by the
+    catalog version, so any write to a movie or its ratings retires them.
+    Cached ETag and Last-Modified headers answer conditional requests.
+
+    On a miss, identical concurrent requests in the worker share one
+    computation. With MOVIE_RESPONSE_LOCK_SECONDS set, workers also take a
+    lock in the cache so only one of them recomputes.
+    """
+    endpoint = view_method.__name__
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if "id" in kwargs:
+            version = get_version(movie_version_key(kwargs["id"]))
+        else:
+            version = get_version(CATALOG_VERSION_KEY)
+        key = f"movie-response:{endpoint}:{version}:{get_request_signature(request)}"
+
+        cached = cache.get(key)
+        if cached is not None:
+            record_lookup(endpoint, "hits")
+            response = build_response(*cached, "HIT")
+            return revalidate(request, response)
+
+        def compute():
+            locked = False
+            if settings.MOVIE_RESPONSE_LOCK_SECONDS:
+                locked, cached = wait_for_other_worker(f"{key}:lock", key)
+                if cached is not None:
+                    return cached, True
+            try:
+                response = view_method(self, request, *args, **kwargs)
+                headers = {
+                    header: response[header]
+                    for header in VALIDATOR_HEADERS
+                    if response.has_header(header)
+                }
+                result = (response.status_code, getattr(response, "data", None), headers)
+                if response.status_code == 200:
+                    cache.set(key, result, settings.MOVIE_RESPONSE_CACHE_SECONDS)
+                return result, False
+            finally:
+                if locked:
+                    cache.delete(f"{key}:lock")
+
+        # Requests revalidating different versions may not share a 304
+        flight = "{}:{}:{}".format(
+            key, request.headers.get("If-None-Match"), request.headers.get("If-Modified-Since")
+        )
+        if settings.MOVIE_RESPONSE_COALESCING:
+            (result, from_cache), shared = single_flight(flight, compute)
+        else:
+            (result, from_cache), shared = compute(), False
+
+        if shared or from_cache:
+            record_lookup(endpoint, "coalesced")
+            response = build_response(*result, "COALESCED")
+        else:
+            record_lookup(endpoint, "misses")
+            response = build_response(*result, "MISS")
+        if from_cache:
+            # Computed by another worker, which saw none of this request's headers
+            return revalidate(request, response)
+        return response
+
+    return wrapper
@@ -0,0 +1,85 @@
+import re
+from collections import Counter
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection, transaction
+from django.db.models import Count, F, FloatField, Sum
+from django.db.models.functions import Cast
+
+SEARCH_CONFIG = "english"
+
+# Name matches outrank description matches, like tsvector weights A and B
+NAME_WEIGHT = 4
+DESCRIPTION_WEIGHT = 1
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is",
+    "it", "of", "on", "or", "that", "the", "to", "was", "with",
+}
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def uses_search_vector():
+    return connection.vendor == "postgresql"
+
+
+def tokenize(text):
+    return [
+        token
+        for token in TOKEN_PATTERN.findall((text or "").lower())
+        if len(token) > 1 and token not in STOP_WORDS
+    ]
+
+
+def get_search_terms(name, description):
+    weights = Counter()
+    for token in tokenize(name):
+        weights[token[:50]] += NAME_WEIGHT
+    for token in tokenize(description):
+        weights[token[:50]] += DESCRIPTION_WEIGHT
+    return weights
+
+
+def index_movies(movies):
+    """
+    Rebuilds the inverted index rows of the given movies. Only used where the
+    database has no tsvector column, PostgreSQL keeps it current with a trigger.
+    """
+    from .models import MovieSearchTerm
+
+    movies = list(movies)
+    with transaction.atomic():
+        MovieSearchTerm.objects.filter(movie__in=[movie.pk for movie in movies]).delete()
+        MovieSearchTerm.objects.bulk_create(
+            [
+                MovieSearchTerm(movie_id=movie.pk, term=term, weight=weight)
+                for movie in movies
+                for term, weight in get_search_terms(movie.name, movie.description).items()
+            ],
+            batch_size=1000,
+        )
+
+
+def search_movies(queryset, query):
+    """
+    Filters the queryset to movies matching every word of ``query`` and
+    annotates a ``rank`` to order them by relevance.
+    """
+    if uses_search_vector():
+        search_query = SearchQuery(query, config=SEARCH_CONFIG, search_type="websearch")
+        # ts_rank is a real; widening it keeps cursor positions exact
+        return queryset.filter(search_vector=search_query).annotate(
+            rank=Cast(SearchRank(F("search_vector"), search_query), FloatField())
+        )
+
+    terms = {term[:50] for term in tokenize(query)}
+    if not terms:
+        return queryset.none()
+    return (
+        queryset.filter(search_terms__term__in=terms)
+        .annotate(
+            rank=Sum("search_terms__weight"),
+            matched_terms=Count("search_terms__term", distinct=True),
+        )
+        .filter(matched_terms=len(terms))
+    )
@@ -1,5 +1,11 @@
+from decimal import Decimal
 from rest_framework import serializers
+from apps.user.serializers.serializers_v1 import UserSummarySerializer
+from external.projection import ProjectionListSerializer
+from external.sparse_fields import SparseFieldsMixin
 from ..models import *
+from ..autocomplete import index_title
+from ..facets import FACETS
 
 
 class MovieCreateSerializer(serializers.ModelSerializer):
@@ -14,6 +20,20 @@ class MovieCreateSerializer(serializers.ModelSerializer):
             "language",
             "created_by",
         ]
+        # Relations are only validated and stored, never read
+        extra_kwargs = {"created_by": {"queryset": User.objects.only("id")}}
+
+    def create(self, validated_data):
+        instance = super().create(validated_data)
+        index_title(instance)
+        return instance
+
+
+class MovieImportSerializer(MovieCreateSerializer):
+    # Imported rows share one creator, so validating a row never queries
+    class Meta(MovieCreateSerializer.Meta):
+        fields = [field for field in MovieCreateSerializer.Meta.fields if field != "created_by"]
+        extra_kwargs = {}
 
 
 class MovieUpdateSerializer(serializers.ModelSerializer):
@@ -21,14 +41,87 @@ class MovieUpdateSerializer(serializers.ModelSerializer):
         model = Movie
         fields = ["name", "description", "released_at", "duration", "genre", "language", "updated_at"]
 
+    def update(self, instance, validated_data):
+        renamed = "name" in validated_data and validated_data["name"] != instance.name
+        instance = super().update(instance, validated_data)
+        if renamed:
+            index_title(instance)
+        return instance
 
-class MovieListSerializer(serializers.ModelSerializer):
+
+class MovieListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Movie
         fields = ["id", "name", "description", "genre", "avg_rating", "total_rating"]
-
-
-class MovieRetrieveSerializer(serializers.ModelSerializer):
+        list_serializer_class = ProjectionListSerializer
+
+
+class FacetSelectionSerializer(serializers.Serializer):
+    facets = serializers.CharField(
+        required=False,
+        help_text=f"Comma separated facets to count: {', '.join(FACETS)}",
+    )
+
+    def validate_facets(self, value):
+        facets = [facet.strip() for facet in value.split(",") if facet.strip()]
+        unknown = [facet for facet in facets if facet not in FACETS]
+        if unknown:
+            raise serializers.ValidationError(f"Unknown facets: {', '.join(unknown)}")
+        return list(dict.fromkeys(facets))
+
+
+class MovieFilterSerializer(FacetSelectionSerializer):
+    genre = serializers.CharField(max_length=50, required=False)
+    language = serializers.CharField(max_length=50, required=False)
+    released_from = serializers.DateField(required=False)
+    released_to = serializers.DateField(required=False)
+    min_rating = serializers.DecimalField(
+        max_digits=3,
+        decimal_places=2,
+        min_value=Decimal("0"),
+        max_value=Decimal("5"),
+        required=False,
+    )
+    ordering = serializers.ChoiceField(
+        choices=[
+            prefix + field
+            for field in Movie.LIST_ORDERING_FIELDS
+            for prefix in ["", "-"]
+        ],
+        default="-created_at",
+    )
+
+    def validate(self, attrs):
+        released_from = attrs.get("released_from")
+        released_to = attrs.get("released_to")
+        if released_from and released_to and released_from > released_to:
+            raise serializers.ValidationError(
+                {"released_to": "Must not be earlier than released_from."}
+            )
+        return attrs
+
+    def get_filters(self):
+        data = self.validated_data
+        filters = {}
+        for field in ["genre", "language"]:
+            if field in data:
+                filters[field] = data[field]
+        if "released_from" in data:
+            filters["released_at__gte"] = data["released_from"]
+        if "released_to" in data:
+            filters["released_at__lte"] = data["released_to"]
+        if "min_rating" in data:
+            filters["avg_rating__gte"] = data["min_rating"]
+        return filters
+
+    def filter_queryset(self, queryset):
+        # id follows the ordering column so every page reads one index in order
+        ordering = self.validated_data["ordering"]
+        tie_breaker = "-id" if ordering.startswith("-") else "id"
+        return queryset.filter(**self.get_filters()).order_by(ordering, tie_breaker)
+
+
+class MovieRetrieveSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     created_by = serializers.CharField(source="created_by.get_full_name")
 
     class Meta:
@@ -45,12 +138,27 @@ class MovieRetrieveSerializer(serializers.ModelSerializer):
             "language",
             "updated_at",
         ]
+        field_columns = {"created_by": ["created_by__first_name", "created_by__last_name"]}
+
+
+class MovieBatchSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.UUIDField(), allow_empty=False, max_length=100
+    )
 
 
 class SubmitRatingSerializer(serializers.ModelSerializer):
     class Meta:
         model = Rating
-        fields = ["user", "movie", "rating"]
+        fields = ["movie", "rating"]
+        extra_kwargs = {"movie": {"queryset": Movie.objects.only("id")}}
+        # Re-rating a movie replaces the earlier rating, see Rating.upsert
+        validators = []
+
+
+class BulkRatingItemSerializer(serializers.Serializer):
+    movie = serializers.UUIDField()
+    rating = serializers.IntegerField(min_value=1, max_value=5)
 
 
 class UpdateRatingSerializer(serializers.ModelSerializer):
@@ -59,19 +167,25 @@ class UpdateRatingSerializer(serializers.ModelSerializer):
         fields = ["rating"]
 
 
-class RatedMovieListSerializer(serializers.ModelSerializer):
+class RatedMovieListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Rating
         fields = ["id", "movie", "rating", "updated_at"]
+        list_serializer_class = ProjectionListSerializer
+        expandable = {"movie": MovieListSerializer}
 
 
 class ReportMovieSerializer(serializers.ModelSerializer):
     class Meta:
         model = ReportedMovie
         fields = ["id", "movie", "reported_by", "reason", "created_at"]
+        extra_kwargs = {
+            "movie": {"queryset": Movie.objects.only("id")},
+            "reported_by": {"queryset": User.objects.only("id")},
+        }
 
 
-class ReportedMovieListSerializer(serializers.ModelSerializer):
+class ReportedMovieListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ReportedMovie
         fields = [
@@ -83,9 +197,17 @@ class ReportedMovieListSerializer(serializers.ModelSerializer):
             "acknowledged",
             "admin_approval"
         ]
+        list_serializer_class = ProjectionListSerializer
+        expandable = {"movie": MovieListSerializer, "reported_by": UserSummarySerializer}
 
 
 class ReportReviewSerializer(serializers.ModelSerializer):
     class Meta:
         model = ReportedMovie
         fields = ["acknowledged", "admin_approval"]
+
+
+class ExportFilterSerializer(serializers.Serializer):
+    updated_since = serializers.DateTimeField(
+        required=False, help_text="Only rows updated at or after this time"
+    )
@@ -1,3 +1,1792 @@
-from django.test import TestCase
+import base64
+import csv
+import datetime
+import io
+import itertools
+import json
+import random
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from decimal import Decimal
+from io import BytesIO
+from pathlib import Path
+from unittest import skipUnless
+from unittest.mock import patch
+import msgpack
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.user.models import User
+from external.enum import UserRole
+from external.metrics import CONTENT_TYPE, MetricsStore, RequestStats
+from external.pagination import CustomPagination
+from external.parsers import FastJSONParser
+from external.projection import project
+from external.renderers import FastJSONRenderer
+from .autocomplete import (
+    TITLE_VERSION_KEY,
+    TitleIndex,
+    _rebuild_title_index,
+    refresh_title_index,
+    reset_title_index,
+)
+from .management.commands.bench_http import find_regressions, summarize
+from .models import *
+from .response_cache import (
+    bump_version,
+    check_shared_cache,
+    get_cache_stats,
+    movie_version_key,
+    reset_cache_stats,
+    single_flight,
+    wait_for_other_worker,
+)
+from .serializers.serializers_v1 import (
+    MovieFilterSerializer,
+    MovieListSerializer,
+    RatedMovieListSerializer,
+    ReportedMovieListSerializer,
+)
+from .views.views_v1 import ExportViewSet
 
-# Create your tests here.
+
+def create_user(username, role=UserRole.USER.value):
+    return User.objects.create(
+        username=username,
+        email=f"{username}@example.com",
+        first_name=username.capitalize(),
+        last_name="Tester",
+        role=role,
+    )
+
+
+def create_movie(user, name="Movie", **kwargs):
+    values = {
+        "name": name,
+        "description": f"{name} description",
+        "released_at": datetime.date(2024, 1, 15),
+        "duration": 120,
+        "genre": "Drama",
+        "language": "English",
+        "created_by": user,
+    }
+    values.update(kwargs)
+    return Movie.objects.create(**values)
+
+
+class CursorPaginationTest(TestCase):
+    def setUp(self):
+        self.user = create_user("alice")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.movies = [create_movie(self.user, f"Movie {i}") for i in range(7)]
+
+    def walk(self, url, direction="next"):
+        names = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            names.extend(movie["name"] for movie in response.data["data"])
+            url = response.data[direction]
+        return names, response
+
+    def test_cursor_pages_cover_list_in_order_without_count(self):
+        url = reverse("movies_list") + "?cursor=&page_size=3"
+        names, response = self.walk(url)
+        expected = [movie.name for movie in Movie.objects.order_by("-created_at", "-id")]
+        self.assertEqual(names, expected)
+        self.assertIsNone(response.data["count"])
+        self.assertIsNone(response.data["total_pages"])
+
+    def test_previous_link_walks_back(self):
+        first = self.client.get(reverse("movies_list") + "?cursor=&page_size=3")
+        second = self.client.get(first.data["next"])
+        back = self.client.get(second.data["previous"])
+        self.assertEqual(back.data["data"], first.data["data"])
+        self.assertIsNone(back.data["previous"])
+
+    def test_page_number_mode_is_unchanged(self):
+        response = self.client.get(reverse("movies_list") + "?page_size=3")
+        self.assertEqual(response.data["count"], 7)
+        self.assertEqual(response.data["total_pages"], 3)
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get(reverse("movies_list") + "?cursor=garbage")
+        self.assertEqual(response.status_code, 404)
+
+    def test_reported_movie_list_only_paginates_with_cursor(self):
+        for movie in self.movies[:3]:
+            ReportedMovie.objects.create(movie=movie, reported_by=self.user, reason="Spam")
+        response = self.client.get(reverse("reported_movie_list"))
+        self.assertIsInstance(response.data, list)
+        response = self.client.get(reverse("reported_movie_list") + "?cursor=&page_size=2")
+        self.assertEqual(len(response.data["data"]), 2)
+        self.assertIsNotNone(response.data["next"])
+
+
+class RatingAggregateTest(TestCase):
+    def setUp(self):
+        self.user = create_user("alice")
+        self.other = create_user("bob")
+        self.movie = create_movie(self.user)
+
+    def assertAggregates(self, movie, rating_sum, total_rating, avg_rating):
+        movie.refresh_from_db()
+        self.assertEqual(movie.rating_sum, rating_sum)
+        self.assertEqual(movie.total_rating, total_rating)
+        self.assertEqual(movie.avg_rating, Decimal(avg_rating))
+
+    def test_insert_update_and_delete_apply_deltas(self):
+        first = Rating.objects.create(user=self.user, movie=self.movie, rating=4)
+        Rating.objects.create(user=self.other, movie=self.movie, rating=1)
+        self.assertAggregates(self.movie, 5, 2, "2.50")
+
+        first = Rating.objects.get(pk=first.pk)
+        first.rating = 5
+        first.save()
+        self.assertAggregates(self.movie, 6, 2, "3.00")
+
+        first.delete()
+        self.assertAggregates(self.movie, 1, 1, "1.00")
+
+    def test_update_submitted_through_api(self):
+        rating = Rating.objects.create(user=self.user, movie=self.movie, rating=2)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.put(
+            reverse("update_rating", kwargs={"id": rating.id}), {"rating": 3}, format="json"
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertAggregates(self.movie, 3, 1, "3.00")
+
+    def test_reconcile_repairs_drift(self):
+        Rating.objects.create(user=self.user, movie=self.movie, rating=4)
+        Rating.objects.create(user=self.other, movie=self.movie, rating=3)
+        untouched = create_movie(self.user, "Untouched")
+        Movie.objects.filter(pk=self.movie.pk).update(
+            rating_sum=0, total_rating=9, avg_rating=Decimal("1.00")
+        )
+        self.assertEqual(Movie.reconcile_rating_aggregates(batch_size=1), 1)
+        self.assertAggregates(self.movie, 7, 2, "3.50")
+        self.assertAggregates(untouched, 0, 0, "0.00")
+
+    def test_queryset_delete_applies_one_delta_per_movie(self):
+        other_movie = create_movie(self.user, "Other")
+        for user, movie, rating in [
+            (self.user, self.movie, 4),
+            (self.other, self.movie, 2),
+            (self.user, other_movie, 5),
+            (self.other, other_movie, 3),
+        ]:
+            Rating.objects.create(user=user, movie=movie, rating=rating)
+        with CaptureQueriesContext(connection) as queries:
+            Rating.objects.filter(user=self.other).delete()
+        self.assertEqual(
+            len([query for query in queries if query["sql"].startswith("UPDATE")]), 2
+        )
+        self.assertAggregates(self.movie, 4, 1, "4.00")
+        self.assertAggregates(other_movie, 5, 1, "5.00")
+
+    def test_user_delete_removes_their_ratings_from_movies(self):
+        Rating.objects.create(user=self.user, movie=self.movie, rating=4)
+        Rating.objects.create(user=self.other, movie=self.movie, rating=2)
+        self.other.delete()
+        self.assertAggregates(self.movie, 4, 1, "4.00")
+
+    def test_movie_delete_does_not_touch_each_rating(self):
+        def delete_queries(count):
+            movie = create_movie(self.user, f"Rated {count}")
+            users = [create_user(f"rater{count}_{index}") for index in range(count)]
+            for user in users:
+                Rating.objects.create(user=user, movie=movie, rating=3)
+            with CaptureQueriesContext(connection) as queries:
+                movie.delete()
+            return len(queries)
+
+        self.assertEqual(delete_queries(2), delete_queries(20))
+        self.assertFalse(Rating.objects.exists())
+
+    def test_movie_with_drifted_aggregates_can_be_deleted(self):
+        Rating.objects.create(user=self.user, movie=self.movie, rating=4)
+        Rating.objects.create(user=self.other, movie=self.movie, rating=2)
+        Movie.objects.filter(pk=self.movie.pk).update(rating_sum=0, total_rating=0)
+        self.movie.delete()
+        self.assertFalse(Movie.objects.filter(pk=self.movie.pk).exists())
+        self.assertFalse(Rating.objects.exists())
+
+    @override_settings(MOVIE_RATING_SHARDS=4)
+    def test_movie_with_rating_shards_can_be_deleted(self):
+        Rating.objects.create(user=self.user, movie=self.movie, rating=4)
+        Rating.objects.create(user=self.other, movie=self.movie, rating=2)
+        self.assertTrue(MovieRatingShard.objects.filter(movie=self.movie).exists())
+        self.movie.delete()
+        self.assertFalse(Movie.objects.filter(pk=self.movie.pk).exists())
+        self.assertFalse(MovieRatingShard.objects.exists())
+
+
+class RatingConcurrencyTest(TransactionTestCase):
+    """
+    Stress test firing submit_rating from parallel threads. Each mode must end
+    with exact aggregates, `manage.py bench_ratings` compares their throughput.
+    The in-memory SQLite test database locks whole tables for a writer, so
+    there the requests take turns while still running on separate threads.
+    """
+
+    threads = 8
+    ratings_per_thread = 15
+
+    def setUp(self):
+        self.owner = create_user("owner")
+        total = self.threads * self.ratings_per_thread
+        self.raters = User.objects.bulk_create(
+            [
+                User(username=f"rater{i}", email=f"rater{i}@example.com")
+                for i in range(total)
+            ]
+        )
+
+    def submit_ratings(self, movie):
+        rng = random.Random(7)
+        jobs = [(rater, rng.randint(1, 5)) for rater in self.raters]
+        chunks = [jobs[i :: self.threads] for i in range(self.threads)]
+        errors = []
+        turn = threading.Lock() if connection.vendor == "sqlite" else nullcontext()
+
+        def worker(chunk):
+            client = APIClient()
+            try:
+                for rater, value in chunk:
+                    client.force_authenticate(rater)
+                    with turn:
+                        response = client.post(
+                            reverse("submit_rating"),
+                            {"movie": str(movie.id), "rating": value},
+                            format="json",
+                        )
+                    if response.status_code != 201:
+                        errors.append(response.status_code)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(self.threads) as pool:
+            list(pool.map(worker, chunks))
+        self.assertEqual(errors, [])
+        return sum(value for _, value in jobs), len(jobs)
+
+    def assertExact(self, movie, rating_sum, total_rating):
+        movie.refresh_from_db()
+        self.assertEqual(movie.rating_sum, rating_sum)
+        self.assertEqual(movie.total_rating, total_rating)
+        self.assertEqual(
+            movie.avg_rating, Movie.calculate_average_rating(rating_sum, total_rating)
+        )
+
+    def test_parallel_submissions_keep_exact_aggregates(self):
+        for shards in (0, 8):
+            with self.subTest(shards=shards), override_settings(MOVIE_RATING_SHARDS=shards):
+                movie = create_movie(self.owner, f"Blockbuster {shards}")
+                rating_sum, total_rating = self.submit_ratings(movie)
+                Movie.fold_rating_shards()
+                self.assertExact(movie, rating_sum, total_rating)
+
+
+class RatingUpsertTest(TestCase):
+    def setUp(self):
+        self.user = create_user("alice")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.movie = create_movie(self.user)
+
+    def submit(self, rating):
+        return self.client.post(
+            reverse("submit_rating"), {"movie": str(self.movie.id), "rating": rating}, format="json"
+        )
+
+    def test_resubmitting_replaces_the_rating(self):
+        self.assertEqual(self.submit(2).status_code, 201)
+        self.assertEqual(self.submit(5).status_code, 202)
+        self.assertEqual(self.submit(5).status_code, 202)
+        self.assertEqual(Rating.objects.get(user=self.user, movie=self.movie).rating, 5)
+        self.movie.refresh_from_db()
+        self.assertEqual(
+            (self.movie.rating_sum, self.movie.total_rating, self.movie.avg_rating),
+            (5, 1, Decimal("5.00")),
+        )
+
+    def test_duplicate_rows_are_rejected(self):
+        Rating.objects.create(user=self.user, movie=self.movie, rating=3)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Rating.objects.create(user=self.user, movie=self.movie, rating=4)
+
+    @skipUnless(connection.vendor == "postgresql", "INSERT ... ON CONFLICT ... RETURNING xmax")
+    def test_upsert_returning_previous(self):
+        rating_id, created, previous = Rating._upsert_returning_previous(
+            self.user.id, self.movie.id, 2
+        )
+        self.assertEqual((created, previous), (True, None))
+        self.assertEqual(
+            Rating._upsert_returning_previous(self.user.id, self.movie.id, 5),
+            (rating_id, False, 2),
+        )
+        self.assertEqual(Rating.objects.get(pk=rating_id).rating, 5)
+
+
+class BulkRatingTest(TestCase):
+    def setUp(self):
+        self.user = create_user("alice")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.first = create_movie(self.user, "First")
+        self.second = create_movie(self.user, "Second")
+
+    def test_bulk_submit_reports_per_item_results(self):
+        missing = "6b1f1c1e-0000-4000-8000-000000000000"
+        payload = [
+            {"movie": str(self.first.id), "rating": 5},
+            {"movie": str(self.first.id), "rating": 2},
+            {"movie": str(self.second.id), "rating": 9},
+            {"movie": missing, "rating": 3},
+            {"movie": str(self.second.id), "rating": 4},
+        ]
+        response = self.client.post(reverse("submit_ratings_bulk"), payload, format="json")
+        self.assertEqual(response.status_code, 201)
+        statuses = [result["status"] for result in response.data["results"]]
+        self.assertEqual(statuses, [201, 202, 400, 400, 201])
+        self.assertIn("rating", response.data["results"][2]["errors"])
+        self.assertIn("movie", response.data["results"][3]["errors"])
+
+        self.first.refresh_from_db()
+        self.second.refresh_from_db()
+        self.assertEqual((self.first.total_rating, self.first.avg_rating), (1, Decimal("2.00")))
+        self.assertEqual((self.second.total_rating, self.second.avg_rating), (1, Decimal("4.00")))
+
+    def test_bulk_submit_replaces_earlier_ratings(self):
+        Rating.objects.create(user=self.user, movie=self.first, rating=1)
+        payload = [
+            {"movie": str(self.first.id), "rating": 4},
+            {"movie": str(self.second.id), "rating": 3},
+        ]
+        response = self.client.post(reverse("submit_ratings_bulk"), payload, format="json")
+        statuses = [result["status"] for result in response.data["results"]]
+        self.assertEqual(statuses, [202, 201])
+        self.assertEqual(Rating.objects.filter(user=self.user).count(), 2)
+        self.first.refresh_from_db()
+        self.assertEqual((self.first.rating_sum, self.first.total_rating), (4, 1))
+
+    def test_bulk_upsert_losing_an_insert_race(self):
+        earlier = Rating.objects.create(user=self.user, movie=self.first, rating=1)
+        # The earlier rating is committed after the batch looked for it
+        with patch.object(RatingQuerySet, "select_for_update", lambda queryset: queryset.none()):
+            results = Rating.bulk_upsert(self.user.id, {self.first.id: 4, self.second.id: 3})
+        self.assertEqual(results[self.first.id], (earlier.id, False))
+        self.assertTrue(results[self.second.id][1])
+        self.assertEqual(Rating.objects.get(pk=results[self.second.id][0]).rating, 3)
+        self.first.refresh_from_db()
+        self.assertEqual((self.first.rating_sum, self.first.total_rating), (4, 1))
+
+    def test_bulk_submit_requires_a_bounded_list(self):
+        response = self.client.post(reverse("submit_ratings_bulk"), {"movie": "x"}, format="json")
+        self.assertEqual(response.status_code, 400)
+        payload = [{"movie": str(self.first.id), "rating": 1}] * 501
+        response = self.client.post(reverse("submit_ratings_bulk"), payload, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+class MovieSearchTest(TestCase):
+    def setUp(self):
+        self.user = create_user("alice")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        create_movie(self.user, "Space Pirates", description="A heist among the stars")
+        create_movie(self.user, "Harbour Lights", description="Pirates raid a quiet harbour")
+        create_movie(self.user, "Quiet Evening", description="Nothing happens")
+        self.renamed = create_movie(self.user, "Working Title", description="Untitled")
+
+    def search(self, query, **params):
+        return self.client.get(reverse("search_movies"), {"q": query, **params})
+
+    def test_ranks_name_matches_first(self):
+        response = self.search("pirates")
+        self.assertEqual(response.status_code, 200)
+        names = [movie["name"] for movie in response.data["data"]]
+        self.assertEqual(names, ["Space Pirates", "Harbour Lights"])
+        self.assertEqual(
+            set(response.data["data"][0]),
+            {"id", "name", "description", "genre", "avg_rating", "total_rating"},
+        )
+
+    def test_every_word_must_match(self):
+        names = [movie["name"] for movie in self.search("quiet pirates").data["data"]]
+        self.assertEqual(names, ["Harbour Lights"])
+
+    def test_index_follows_updates(self):
+        self.renamed.name = "Dragon Harbour"
+        self.renamed.save()
+        names = [movie["name"] for movie in self.search("dragon").data["data"]]
+        self.assertEqual(names, ["Dragon Harbour"])
+        self.assertEqual(self.search("working").data["data"], [])
+
+    def test_pages_by_cursor(self):
+        first = self.search("quiet", page_size=1)
+        second = self.client.get(first.data["next"])
+        self.assertEqual(first.data["data"][0]["name"], "Quiet Evening")
+        self.assertEqual(second.data["data"][0]["name"], "Harbour Lights")
+        self.assertIsNone(second.data["next"])
+        self.assertIsNone(first.data["count"])
+
+    def test_query_is_required(self):
+        self.assertEqual(self.search(" ").status_code, 400)
+
+
+@override_settings(AUTOCOMPLETE_REFRESH_SECONDS=3600)
+class AutocompleteTest(TestCase):
+    def setUp(self):
+        self.addCleanup(reset_title_index)
+        self.user = create_user("alice")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        create_movie(self.user, "Iron Man", total_rating=50)
+        create_movie(self.user, "Iron Giant", total_rating=80)
+        create_movie(self.user, "Irma la Douce", total_rating=5)
+        refresh_title_index(background=False)
+
+    def suggest(self, prefix):
+        response = self.client.get(reverse("autocomplete_movies"), {"q": prefix})
+        return [movie["name"] for movie in response.data]
+
+    def test_prefix_matches_are_weighted_by_ratings(self):
+        self.assertEqual(self.suggest("ir"), ["Iron Giant", "Iron Man", "Irma la Douce"])
+        self.assertEqual(self.suggest("IRON  m"), ["Iron Man"])
+        self.assertEqual(self.suggest("x"), [])
+
+    def test_created_and_renamed_movies_are_indexed(self):
+        self.suggest("ir")
+        self.client.post(
+            reverse("create_movie"),
+            {
+                "name": "Irréversible",
+                "description": "Drama",
+                "released_at": "2002-05-22",
+                "duration": 97,
+                "genre": "Drama",
+                "language": "French",
+            },
+            format="json",
+        )
+        self.assertIn("Irréversible", self.suggest("irre"))
+
+        movie = Movie.objects.get(name="Irma la Douce")
+        self.client.put(
+            reverse("update_movie", kwargs={"id": movie.id}),
+            {
+                "name": "Sweet Irma",
+                "description": movie.description,
+                "released_at": "1963-06-05",
+                "duration": 147,
+                "genre": "Comedy",
+                "language": "English",
+            },
+            format="json",
+        )
+        self.assertEqual(self.suggest("irma"), [])
+        self.assertEqual(self.suggest("sweet"), ["Sweet Irma"])
+
+    def test_lookups_never_build_the_index(self):
+        reset_title_index()
+        with patch("apps.movie.autocomplete.threading.Thread") as thread:
+            with self.assertNumQueries(0):
+                self.assertEqual(self.suggest("ir"), [])
+        thread.assert_called_once_with(target=_rebuild_title_index, daemon=True)
+        thread.return_value.start.assert_called_once_with()
+
+    def test_writes_of_other_workers_trigger_a_background_rebuild(self):
+        # Another worker renames a movie, this worker's index only learns of
+        # it through the title version
+        Movie.objects.filter(name="Irma la Douce").update(name="Sweet Irma")
+        bump_version(TITLE_VERSION_KEY)
+        with patch("apps.movie.autocomplete.threading.Thread") as thread:
+            self.assertEqual(self.suggest("sweet"), [])
+            thread.assert_not_called()
+            with override_settings(AUTOCOMPLETE_REFRESH_SECONDS=0):
+                self.assertEqual(self.suggest("sweet"), [])
+                self.assertEqual(self.suggest("sweet"), [])
+        # Started once, the first rebuild is still running for the second lookup
+        thread.assert_called_once_with(target=_rebuild_title_index, daemon=True)
+
+        refresh_title_index(background=False)
+        self.assertEqual(self.suggest("sweet"), ["Sweet Irma"])
+
+    def test_rating_writes_wait_for_the_scheduled_rebuild(self):
+        movie = Movie.objects.get(name="Irma la Douce")
+        Rating.objects.create(user=self.user, movie=movie, rating=4)
+        with patch("apps.movie.autocomplete.threading.Thread") as thread:
+            with override_settings(AUTOCOMPLETE_REFRESH_SECONDS=0):
+                self.suggest("ir")
+            thread.assert_not_called()
+            with override_settings(AUTOCOMPLETE_REBUILD_SECONDS=0):
+                self.suggest("ir")
+        thread.assert_called_once_with(target=_rebuild_title_index, daemon=True)
+
+    def test_memory_budget_keeps_most_rated_titles(self):
+        size = TitleIndex.entry_size("title 00", "00", "Title 00")
+        index = TitleIndex(memory_budget=size * 2)
+        index.load([("01", "Title 01", 9), ("02", "Title 02", 5), ("03", "Title 03", 1)])
+        self.assertEqual(len(index), 2)
+        self.assertFalse(index.add("04", "Title 04", 0))
+        self.assertTrue(index.add("05", "Title 05", 7))
+        self.assertEqual(
+            [entry["id"] for entry in index.lookup("title")], ["01", "05"]
+        )
+        # Re-weighted entries are evicted by their current weight
+        self.assertTrue(index.add("01", "Title 01", 2))
+        self.assertTrue(index.add("06", "Title 06", 3))
+        self.assertEqual(
+            [entry["id"] for entry in index.lookup("title")], ["05", "06"]
+        )
+
+
+class MovieListFilterTest(TestCase):
+    def setUp(self):
+        self.user = create_user("alice")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        create_movie(
+            self.user,
+            "Old Drama",
+            released_at=datetime.date(1995, 3, 1),
+            avg_rating=Decimal("4.50"),
+            total_rating=10,
+        )
+        create_movie(
+            self.user,
+            "New Drama",
+            released_at=datetime.date(2021, 6, 1),
+            avg_rating=Decimal("3.20"),
+            total_rating=40,
+        )
+        create_movie(
+            self.user,
+            "Comedy",
+            genre="Comedy",
+            language="French",
+            released_at=datetime.date(2010, 1, 1),
+            avg_rating=Decimal("4.90"),
+            total_rating=5,
+        )
+
+    def names(self, **params):
+        response = self.client.get(reverse("movies_list"), params)
+        self.assertEqual(response.status_code, 200)
+        return [movie["name"] for movie in response.data["data"]]
+
+    def test_filters_and_ordering(self):
+        self.assertEqual(
+            self.names(genre="Drama", ordering="released_at"), ["Old Drama", "New Drama"]
+        )
+        self.assertEqual(self.names(language="French"), ["Comedy"])
+        self.assertEqual(
+            self.names(min_rating="4.5", ordering="-avg_rating"), ["Comedy", "Old Drama"]
+        )
+        self.assertEqual(
+            self.names(released_from="2000-01-01", released_to="2015-12-31"), ["Comedy"]
+        )
+        self.assertEqual(
+            self.names(ordering="-total_rating", cursor=""),
+            ["New Drama", "Old Drama", "Comedy"],
+        )
+
+    def test_invalid_filters_are_rejected(self):
+        for params in [
+            {"ordering": "name"},
+            {"min_rating": "6"},
+            {"released_from": "2020-01-01", "released_to": "2019-01-01"},
+        ]:
+            response = self.client.get(reverse("movies_list"), params)
+            self.assertEqual(response.status_code, 400, params)
+
+    def assertIndexedPlan(self, queryset, label):
+        plan = queryset.explain()
+        if connection.vendor == "postgresql":
+            self.assertNotIn("Seq Scan", plan, label)
+            self.assertNotIn("Sort", plan, label)
+        elif connection.vendor == "sqlite":
+            # Without ANALYZE statistics SQLite may still sort an index range
+            self.assertNotRegex(plan, r"SCAN movie_movie\s*($|\n)", label)
+
+    def test_every_supported_combination_reads_an_index(self):
+        if connection.vendor == "postgresql":
+            # Tiny tables would always be seq scanned, so make that a last resort
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute("SET LOCAL enable_sort = off")
+
+        filter_values = {
+            "genre": "Drama",
+            "language": "English",
+            "released_from": "2000-01-01",
+            "released_to": "2020-01-01",
+            "min_rating": "3.5",
+        }
+        groups = [["genre"], ["language"], ["released_from", "released_to"], ["min_rating"]]
+        paginator = CustomPagination()
+        for size in range(len(groups) + 1):
+            for combination in itertools.combinations(groups, size):
+                for ordering in MovieFilterSerializer().fields["ordering"].choices:
+                    params = {name: filter_values[name] for group in combination for name in group}
+                    params["ordering"] = ordering
+                    serializer = MovieFilterSerializer(data=params)
+                    self.assertTrue(serializer.is_valid(), serializer.errors)
+                    queryset = serializer.filter_queryset(Movie.objects.all())
+                    self.assertIndexedPlan(queryset[:31], params)
+
+                    # The seek predicate of a later cursor page as well
+                    movie = Movie.objects.first()
+                    paginator.model = Movie
+                    paginator.annotations = {}
+                    paginator.ordering = paginator.get_keyset_ordering(queryset)
+                    position = [getattr(movie, name) for name, _ in paginator.ordering]
+                    seek = paginator.get_seek_filter(paginator.ordering, position)
+                    self.assertIndexedPlan(queryset.filter(seek)[:31], params)
+
+
+class MovieFacetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user("alice")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        create_movie(
+            self.user,
+            "Old Pirates",
+            released_at=datetime.date(1995, 3, 1),
+            avg_rating=Decimal("5.00"),
+        )
+        create_movie(
+            self.user,
+            "New Pirates",
+            released_at=datetime.date(1999, 6, 1),
+            avg_rating=Decimal("3.20"),
+        )
+        create_movie(
+            self.user,
+            "Comedy",
+            genre="Comedy",
+            language="French",
+            released_at=datetime.date(2010, 1, 1),
+            avg_rating=Decimal("4.10"),
+        )
+
+    def facets(self, name="movies_list", **params):
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data["facets"]
+
+    def test_counts_every_facet_of_the_filter_set(self):
+        facets = self.facets(facets="genre,language,rating,decade")
+        self.assertEqual(
+            facets["genre"],
+            [{"value": "Drama", "count": 2}, {"value": "Comedy", "count": 1}],
+        )
+        self.assertEqual(facets["rating"], [{"value": 4, "count": 2}, {"value": 3, "count": 1}])
+        self.assertEqual(
+            facets["decade"], [{"value": 1990, "count": 2}, {"value": 2010, "count": 1}]
+        )
+        self.assertEqual(
+            self.facets(facets="language", genre="Drama")["language"],
+            [{"value": "English", "count": 2}],
+        )
+        self.assertNotIn("facets", self.client.get(reverse("movies_list")).data)
+
+    def test_search_facets(self):
+        facets = self.facets("search_movies", q="pirates", facets="genre")
+        self.assertEqual(facets["genre"], [{"value": "Drama", "count": 2}])
+
+    def test_counts_are_cached_until_a_movie_is_written(self):
+        self.facets(facets="genre,decade")
+        with self.assertNumQueries(2):
+            # Another page of the same filter set runs only the page and its count
+            facets = self.facets(facets="genre,decade", page=1)
+        self.assertEqual(facets["genre"][0], {"value": "Drama", "count": 2})
+
+        create_movie(self.user, "Another Comedy", genre="Comedy")
+        facets = self.facets(facets="genre,decade")
+        self.assertEqual(
+            facets["genre"],
+            [{"value": "Comedy", "count": 2}, {"value": "Drama", "count": 2}],
+        )
+
+    def test_unknown_facets_are_rejected(self):
+        response = self.client.get(reverse("movies_list"), {"facets": "genre,director"})
+        self.assertEqual(response.status_code, 400)
+
+
+class MovieResponseCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        reset_cache_stats()
+        self.user = create_user("alice")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.movie = create_movie(self.user, "Cached")
+
+    def get(self, name, *args):
+        return self.client.get(reverse(name, args=args))
+
+    def assertWritesRetireResponses(self):
+        retrieve = ("retrieve_movie", self.movie.id)
+        self.assertEqual(self.get("movies_list")["X-Cache"], "MISS")
+        self.assertEqual(self.get(*retrieve)["X-Cache"], "MISS")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get("movies_list")["X-Cache"], "HIT")
+            self.assertEqual(self.get(*retrieve)["X-Cache"], "HIT")
+
+        Rating.objects.create(user=self.user, movie=self.movie, rating=4)
+        response = self.get(*retrieve)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["avg_rating"], "4.00")
+        self.assertEqual(self.get("movies_list").data["data"][0]["total_rating"], 1)
+
+        self.movie.name = "Renamed"
+        self.movie.save()
+        self.assertEqual(self.get("movies_list").data["data"][0]["name"], "Renamed")
+
+    def test_movie_and_rating_writes_retire_cached_responses(self):
+        self.assertWritesRetireResponses()
+        self.assertEqual(
+            get_cache_stats(),
+            {
+                "movies_list": {"hits": 1, "misses": 3, "coalesced": 0},
+                "retrieve_movie": {"hits": 1, "misses": 2, "coalesced": 0},
+            },
+        )
+
+    def test_file_based_backend(self):
+        with tempfile.TemporaryDirectory() as location:
+            backend = "django.core.cache.backends.filebased.FileBasedCache"
+            with override_settings(CACHES={"default": {"BACKEND": backend, "LOCATION": location}}):
+                self.assertWritesRetireResponses()
+
+    def test_stats_are_admin_only(self):
+        self.assertEqual(self.get("movie_cache_stats").status_code, 406)
+        self.client.force_authenticate(create_user("root", UserRole.ADMIN.value))
+        self.get("movies_list")
+        response = self.get("movie_cache_stats")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.data["movies_list"], {"hits": 0, "misses": 1, "coalesced": 0}
+        )
+
+    def test_workers_need_a_shared_cache(self):
+        check_shared_cache()
+        with override_settings(WEB_CONCURRENCY=2):
+            with self.assertRaisesMessage(ImproperlyConfigured, "LocMemCache"):
+                check_shared_cache()
+            shared = {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": tempfile.gettempdir(),
+            }
+            with override_settings(CACHES={"default": shared}):
+                check_shared_cache()
+
+
+class SingleFlightTest(TestCase):
+    def test_concurrent_callers_share_one_computation(self):
+        calls = []
+        release = threading.Event()
+
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return {"name": "Blockbuster"}
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(single_flight, "movie", compute) for _ in range(8)]
+            # Let every caller join the flight before the leader finishes
+            time.sleep(0.2)
+            release.set()
+            results = [future.result() for future in futures]
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([shared for _, shared in results].count(False), 1)
+        self.assertTrue(all(result == {"name": "Blockbuster"} for result, _ in results))
+
+    def test_followers_see_the_leaders_error(self):
+        release = threading.Event()
+
+        def compute():
+            release.wait(5)
+            raise ValueError("database went away")
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = [executor.submit(single_flight, "failing", compute) for _ in range(4)]
+            time.sleep(0.2)
+            release.set()
+            for future in futures:
+                with self.assertRaises(ValueError):
+                    future.result()
+
+    @override_settings(MOVIE_RESPONSE_LOCK_SECONDS=2)
+    def test_other_workers_wait_for_the_lock_holder(self):
+        cache.clear()
+        self.assertEqual(wait_for_other_worker("key:lock", "key"), (True, None))
+        threading.Timer(0.1, cache.set, ["key", (200, {"name": "Blockbuster"})]).start()
+        self.assertEqual(
+            wait_for_other_worker("key:lock", "key"), (False, (200, {"name": "Blockbuster"}))
+        )
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user("alice")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.movie = create_movie(self.user, "Cached")
+        self.other = create_movie(self.user, "Other")
+
+    def get(self, name, *args, **headers):
+        return self.client.get(reverse(name, args=args), {"ordering": "created_at"}, headers=headers)
+
+    def test_unchanged_movie_reads_revalidate(self):
+        for name, args in [("movies_list", []), ("retrieve_movie", [self.movie.id])]:
+            response = self.get(name, *args)
+            etag = response["ETag"]
+            self.assertEqual(self.get(name, *args, if_none_match=etag).status_code, 304)
+
+            # Revalidating past the response cache only reads the version counters
+            last_modified = response["Last-Modified"]
+            with override_settings(MOVIE_RESPONSE_CACHE_SECONDS=0), self.assertNumQueries(0):
+                response = self.get(name, *args, if_none_match=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response["ETag"], etag)
+                self.assertEqual(response["Last-Modified"], last_modified)
+                response = self.get(name, *args, if_modified_since=last_modified)
+                self.assertEqual(response.status_code, 304)
+
+    def test_writes_change_the_validators(self):
+        list_response = self.get("movies_list")
+        movie_response = self.get("retrieve_movie", self.movie.id)
+        # Last-Modified counts whole seconds
+        with patch("apps.movie.response_cache.time.time", return_value=time.time() + 2):
+            Rating.objects.create(user=self.user, movie=self.movie, rating=5)
+
+        for name, args, previous in [
+            ("movies_list", [], list_response),
+            ("retrieve_movie", [self.movie.id], movie_response),
+        ]:
+            response = self.get(name, *args, if_none_match=previous["ETag"])
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response["ETag"], previous["ETag"])
+            response = self.get(name, *args, if_modified_since=previous["Last-Modified"])
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response["Last-Modified"], previous["Last-Modified"])
+
+        # Deleting a movie that is not the newest still changes the list
+        list_etag = self.get("movies_list")["ETag"]
+        Movie.objects.filter(pk=self.other.pk).delete()
+        cache.clear()
+        self.assertEqual(self.get("movies_list", if_none_match=list_etag).status_code, 200)
+
+    @override_settings(MOVIE_RATING_SHARDS=4)
+    def test_retrieve_folds_shards_before_validating(self):
+        for name in ["retrieve_movie", "retrieve_movie_async"]:
+            Rating.upsert(self.user.id, self.movie.id, 4 if name == "retrieve_movie" else 2)
+            response = self.get(name, self.movie.id)
+            self.assertEqual(response.data["total_rating"], 1)
+            response = self.get(name, self.movie.id, if_none_match=response["ETag"])
+            self.assertEqual(response.status_code, 304)
+
+    def test_rated_movie_list(self):
+        Rating.objects.create(user=self.user, movie=self.movie, rating=5)
+        etag = self.get("rated_movie_list")["ETag"]
+        self.assertEqual(self.get("rated_movie_list", if_none_match=etag).status_code, 304)
+
+        Rating.upsert(self.user.id, self.other.id, 3)
+        self.assertEqual(self.get("rated_movie_list", if_none_match=etag).status_code, 200)
+
+    def test_rated_movie_list_expanding_movies(self):
+        Rating.objects.create(user=self.user, movie=self.movie, rating=5)
+        for name in ["rated_movie_list", "rated_movie_list_async"]:
+            url = reverse(name)
+            etag = self.client.get(url, {"expand": "movie"})["ETag"]
+            response = self.client.get(url, {"expand": "movie"}, headers={"if-none-match": etag})
+            self.assertEqual(response.status_code, 304)
+
+            # Editing an expanded movie leaves the ratings alone
+            self.movie.description = f"Edited for {name}"
+            self.movie.save()
+            response = self.client.get(url, {"expand": "movie"}, headers={"if-none-match": etag})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data["data"][0]["movie"]["description"], self.movie.description)
+
+
+class MyRatingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = create_user("alice")
+        self.bob = create_user("bob")
+        self.movie = create_movie(self.alice, "Rated")
+        self.other = create_movie(self.alice, "Unrated")
+        Rating.objects.create(user=self.alice, movie=self.movie, rating=4)
+        Rating.objects.create(user=self.bob, movie=self.movie, rating=2)
+
+    def get(self, user, name, *args, params=None, **headers):
+        client = APIClient()
+        client.force_authenticate(user)
+        params = {"ordering": "created_at", "my_rating": "true", **(params or {})}
+        return client.get(reverse(name, args=args), params, headers=headers)
+
+    def test_lists_carry_each_users_rating(self):
+        for name in ["movies_list", "my_movies"]:
+            response = self.get(self.alice, name)
+            self.assertEqual(
+                {movie["name"]: movie["my_rating"] for movie in response.data["data"]},
+                {"Rated": 4, "Unrated": None},
+            )
+
+        # Bob is served the page Alice cached, plus one query for his ratings
+        with self.assertNumQueries(1):
+            response = self.get(self.bob, "movies_list")
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(response.data["data"][0]["my_rating"], 2)
+
+        response = self.get(self.bob, "movies_list", params={"my_rating": ""})
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertNotIn("my_rating", response.data["data"][0])
+
+    def test_retrieve_etag_is_personal(self):
+        alice = self.get(self.alice, "retrieve_movie", self.movie.id)
+        bob = self.get(self.bob, "retrieve_movie", self.movie.id)
+        self.assertEqual((alice.data["my_rating"], bob.data["my_rating"]), (4, 2))
+        self.assertNotEqual(alice["ETag"], bob["ETag"])
+
+        response = self.get(self.alice, "retrieve_movie", self.movie.id, if_none_match=alice["ETag"])
+        self.assertEqual(response.status_code, 304)
+        response = self.get(self.bob, "retrieve_movie", self.movie.id, if_none_match=alice["ETag"])
+        self.assertEqual(response.status_code, 200)
+
+    def test_needs_movie_ids(self):
+        response = self.get(self.alice, "movies_list", params={"fields": "name"})
+        self.assertEqual(response.status_code, 400)
+
+
+class ProjectionSerializerTest(TestCase):
+    def setUp(self):
+        self.user = create_user("alice")
+        for i in range(3):
+            movie = create_movie(
+                self.user, f"Movie {i}", avg_rating=Decimal("4.5"), total_rating=i
+            )
+            Rating.objects.create(user=self.user, movie=movie, rating=i + 1)
+            ReportedMovie.objects.create(movie=movie, reported_by=self.user, reason="Spoilers")
+
+    def test_values_rows_render_like_instances(self):
+        render = JSONRenderer().render
+        for serializer_class in [
+            MovieListSerializer,
+            RatedMovieListSerializer,
+            ReportedMovieListSerializer,
+        ]:
+            queryset = serializer_class.Meta.model.objects.all()
+            rows = list(project(queryset, serializer_class))
+            self.assertIsInstance(rows[0], dict)
+            self.assertEqual(
+                render(serializer_class(rows, many=True).data),
+                render(serializer_class(queryset, many=True).data),
+                serializer_class.__name__,
+            )
+
+    def test_cursor_pages_over_values_rows(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse("movies_list") + "?cursor=&page_size=2&ordering=-avg_rating"
+        names = []
+        while url:
+            response = client.get(url)
+            names.extend(movie["name"] for movie in response.data["data"])
+            url = response.data["next"]
+        self.assertEqual(sorted(names), ["Movie 0", "Movie 1", "Movie 2"])
+
+
+class SparseFieldsTest(TestCase):
+    def setUp(self):
+        self.user = create_user("alice")
+        self.movie = create_movie(self.user, "Movie", avg_rating=Decimal("4.5"))
+        Rating.objects.create(user=self.user, movie=self.movie, rating=4)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, name, query, *args):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(name, args=args) + query)
+        sql = " ".join(query["sql"] for query in queries.captured_queries)
+        return response, sql
+
+    def test_fields_trim_output_and_columns(self):
+        response, sql = self.get("movies_list", "?fields=id,name,avg_rating")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.data["data"][0]), ["id", "name", "avg_rating"])
+        self.assertNotIn('"description"', sql)
+        self.assertNotIn('"genre"', sql)
+
+    def test_exclude_drops_fields(self):
+        response, sql = self.get("retrieve_movie", "?exclude=description,created_by", self.movie.pk)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("description", response.data)
+        self.assertNotIn("created_by", response.data)
+        self.assertIn("genre", response.data)
+        self.assertNotIn('"description"', sql)
+        self.assertNotIn("user_user", sql)
+
+    def test_method_field_loads_its_columns(self):
+        response, sql = self.get("retrieve_movie", "?fields=genre,created_by", self.movie.pk)
+        self.assertEqual(list(response.data), ["genre", "created_by"])
+        self.assertEqual(response.data["created_by"], "Alice Tester")
+
+    def test_rated_movie_list_fields(self):
+        response, sql = self.get("rated_movie_list", "?fields=rating")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["data"], [{"rating": 4}])
+
+    def test_unknown_fields_are_rejected(self):
+        response, _ = self.get("movies_list", "?fields=name,password")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {"fields": ["Unknown fields: password"]})
+        response, _ = self.get("movies_list", "?fields=name&exclude=name")
+        self.assertEqual(response.status_code, 400)
+
+
+class ExpandRelationsTest(TestCase):
+    def setUp(self):
+        self.user = create_user("alice")
+        for i in range(3):
+            movie = create_movie(self.user, f"Movie {i}")
+            Rating.objects.create(user=self.user, movie=movie, rating=i + 1)
+            ReportedMovie.objects.create(movie=movie, reported_by=self.user, reason="Spoilers")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_rated_movies_embed_movie(self):
+        url = reverse("rated_movie_list") + "?expand=movie&page_size=2&cursor="
+        names = []
+        while url:
+            # Validators, the page and its count, all with the movies joined in
+            with self.assertNumQueries(2):
+                response = self.client.get(url)
+            for rating in response.data["data"]:
+                self.assertEqual(
+                    set(rating["movie"]), set(MovieListSerializer.Meta.fields)
+                )
+                names.append(rating["movie"]["name"])
+            url = response.data["next"]
+        self.assertEqual(sorted(names), ["Movie 0", "Movie 1", "Movie 2"])
+
+    def test_reports_embed_movie_and_reporter(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse("reported_movie_list") + "?expand=movie,reported_by&fields=movie,reported_by"
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"reason"', queries[0]["sql"])
+        report = response.data[0]
+        self.assertEqual(
+            report["reported_by"],
+            {"id": str(self.user.id), "username": "alice", "name": "Alice Tester"},
+        )
+        self.assertIn(report["movie"]["name"], ["Movie 0", "Movie 1", "Movie 2"])
+
+    def test_unknown_expansion_is_rejected(self):
+        response = self.client.get(reverse("rated_movie_list") + "?expand=user")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data, {"expand": ["Unknown expansions: user"]})
+
+
+class BatchRetrieveTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user("alice")
+        self.movies = [create_movie(self.user, f"Movie {i}") for i in range(3)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = reverse("retrieve_movies")
+
+    def test_keeps_input_order_and_reports_missing(self):
+        missing = "00000000-0000-0000-0000-000000000000"
+        ids = [str(self.movies[2].id), missing, str(self.movies[0].id), str(self.movies[2].id)]
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {"ids": ",".join(ids)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [movie["id"] for movie in response.data["data"]],
+            [str(self.movies[2].id), str(self.movies[0].id)],
+        )
+        self.assertEqual(response.data["missing"], [missing])
+        self.assertEqual(response.data["data"][0]["created_by"], "Alice Tester")
+
+    def test_reads_through_per_movie_cache(self):
+        ids = [str(movie.id) for movie in self.movies]
+        self.client.post(self.url, {"ids": ids}, format="json")
+        with self.assertNumQueries(0):
+            response = self.client.post(self.url, {"ids": ids[:2]}, format="json")
+        self.assertEqual(len(response.data["data"]), 2)
+
+        self.movies[1].description = "Changed"
+        self.movies[1].save()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {"ids": ids}, format="json")
+        self.assertEqual(len(queries), 1)
+        sql = queries[0]["sql"].replace("-", "")
+        self.assertIn(self.movies[1].id.hex, sql)
+        self.assertNotIn(self.movies[0].id.hex, sql)
+        self.assertEqual(response.data["data"][1]["description"], "Changed")
+
+    def test_movies_with_equal_versions_are_cached_apart(self):
+        first, second = (str(movie.id) for movie in self.movies[:2])
+        for movie_id in [first, second]:
+            cache.set(movie_version_key(movie_id), 1, None)
+        self.client.get(self.url, {"ids": first})
+        response = self.client.get(self.url, {"ids": second})
+        self.assertEqual([movie["id"] for movie in response.data["data"]], [second])
+
+    def test_fields_are_cached_apart(self):
+        ids = str(self.movies[0].id)
+        self.client.get(self.url, {"ids": ids})
+        response = self.client.get(self.url, {"ids": ids, "fields": "id,genre"})
+        self.assertEqual(response.data["data"], [{"id": ids, "genre": "Drama"}])
+
+    def test_rejects_bad_and_oversized_batches(self):
+        self.assertEqual(self.client.get(self.url, {"ids": "nope"}).status_code, 400)
+        self.assertEqual(self.client.post(self.url, {"ids": []}, format="json").status_code, 400)
+        ids = [str(uuid.uuid4()) for _ in range(101)]
+        response = self.client.post(self.url, {"ids": ids}, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("ids", response.data)
+
+
+class AsyncReadTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user("alice")
+        self.user.set_password("secret")
+        self.user.save()
+        for i in range(3):
+            movie = create_movie(self.user, f"Movie {i}", avg_rating=Decimal("4.5"))
+            Rating.objects.create(user=self.user, movie=movie, rating=i + 1)
+        self.movie = movie
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(self.user).access_token}"
+        )
+
+    def assertSameAsSync(self, name, args=(), params=None):
+        sync = self.client.get(reverse(name, args=args), params)
+        response = self.client.get(reverse(f"{name}_async", args=args), params)
+        self.assertEqual(response.status_code, sync.status_code)
+        # Page links differ by the async/ prefix only
+        content = response.content.replace(b"/async/", b"/")
+        self.assertEqual(json.loads(content), json.loads(sync.content))
+        return response
+
+    def test_matches_sync_views(self):
+        self.assertSameAsSync("movies_list", params={"fields": "id,name", "my_rating": "true"})
+        self.assertSameAsSync("movies_list", params={"cursor": "", "page_size": 2, "facets": "genre"})
+        self.assertSameAsSync("movies_list", params={"min_rating": "9"})
+        self.assertSameAsSync("my_movies", params={"page_size": 2, "page": 2})
+        self.assertSameAsSync("retrieve_movie", args=[self.movie.id], params={"my_rating": "1"})
+        self.assertSameAsSync("rated_movie_list", params={"expand": "movie", "cursor": ""})
+        self.assertSameAsSync("movies_list", params={"exclude": "nope"})
+
+    def test_conditional_get(self):
+        url = reverse("retrieve_movie_async", args=[self.movie.id])
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, headers={"if-none-match": etag}).status_code, 304)
+
+    def test_authentication(self):
+        url = reverse("movies_list_async")
+        self.assertEqual(APIClient().get(url).status_code, 401)
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION="Basic " + base64.b64encode(b"alice:secret").decode()
+        )
+        self.assertEqual(client.get(url).status_code, 200)
+        client.credentials(HTTP_AUTHORIZATION="Bearer nope")
+        self.assertEqual(client.get(url).status_code, 401)
+        self.assertEqual(self.client.post(url).status_code, 405)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get(url).status_code, 200)
+
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+    def test_renders_msgpack(self):
+        response = self.client.get(
+            reverse("movies_list_async"), headers={"accept": "application/msgpack"}
+        )
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(len(msgpack.unpackb(response.content)["data"]), 3)
+
+
+class ExportTest(TestCase):
+    def setUp(self):
+        self.admin = create_user("root", UserRole.ADMIN.value)
+        self.user = create_user("alice")
+        for i in range(5):
+            movie = create_movie(self.user, f"Movie {i}", avg_rating=Decimal("4.5"))
+            Rating.objects.create(user=self.user, movie=movie, rating=i % 5 + 1)
+            ReportedMovie.objects.create(movie=movie, reported_by=self.user, reason="Line\nbreak")
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def export(self, name, **params):
+        response = self.client.get(reverse(name), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, list(response.streaming_content)
+
+    def test_ndjson(self):
+        response, chunks = self.export("export_movies")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = [json.loads(line) for line in b"".join(chunks).splitlines()]
+        self.assertEqual(len(rows), 5)
+        movie = Movie.objects.get(id=rows[0]["id"])
+        # Decimals are strings, as in the API responses
+        self.assertEqual(rows[0]["avg_rating"], MovieListSerializer(movie).data["avg_rating"])
+        self.assertEqual(rows[0]["created_by"], str(self.user.id))
+        self.assertEqual(rows[0]["released_at"], "2024-01-15")
+
+    def test_csv(self):
+        response, chunks = self.export("export_reports", format="csv")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="reported_movies.csv"')
+        rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+        self.assertEqual(rows[0], ExportViewSet.report_columns)
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[1][3], "Line\nbreak")
+
+        _, chunks = self.export("export_movies", format="csv")
+        rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+        movie = Movie.objects.get(id=rows[0]["id"])
+        self.assertEqual(rows[0]["avg_rating"], MovieListSerializer(movie).data["avg_rating"])
+
+    def test_streams_in_chunks(self):
+        with patch.object(ExportViewSet, "export_chunk_size", 2):
+            _, chunks = self.export("export_ratings")
+        self.assertEqual([chunk.count(b"\n") for chunk in chunks], [2, 2, 1])
+
+    def test_updated_since(self):
+        cutoff = timezone.now()
+        rating = Rating.objects.first()
+        rating.rating = 5
+        rating.save()
+        _, chunks = self.export("export_ratings", updated_since=cutoff.isoformat())
+        self.assertEqual([json.loads(line)["id"] for line in chunks], [str(rating.id)])
+        response = self.client.get(reverse("export_ratings"), {"updated_since": "yesterday"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_admin_only(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get(reverse("export_movies")).status_code, 406)
+
+
+class ImportMoviesTest(TestCase):
+    columns = ["name", "description", "released_at", "duration", "genre", "language"]
+
+    def setUp(self):
+        self.user = create_user("alice")
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = f"{self.directory.name}/{name}"
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        return path
+
+    def write_csv(self, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self.columns)
+        writer.writerows(rows)
+        return self.write("movies.csv", buffer.getvalue())
+
+    def import_movies(self, path, *args):
+        output = io.StringIO()
+        call_command("import_movies", path, "--created-by", "alice", *args, stdout=output)
+        return output.getvalue()
+
+    def read_errors(self, path):
+        with open(f"{path}.errors.jsonl", encoding="utf-8") as file:
+            return [json.loads(line) for line in file]
+
+    def test_csv(self):
+        path = self.write_csv(
+            [
+                ["Alien", "Tab\there", "1979-05-25", "117", "Horror", "English"],
+                ["Broken", "Bad", "someday", "-5", "Drama", "English"],
+                ["Heat", "Back\\slash", "1995-12-15", "170", "Crime", "English"],
+            ]
+        )
+        output = self.import_movies(path, "--chunk-size", "2")
+        self.assertIn("Imported 2 movie(s) and rejected 1", output)
+        alien = Movie.objects.get(name="Alien")
+        self.assertEqual(alien.description, "Tab\there")
+        self.assertEqual(alien.created_by, self.user)
+        self.assertEqual(alien.released_at, datetime.date(1979, 5, 25))
+        self.assertEqual(Movie.objects.get(name="Heat").description, "Back\\slash")
+
+        errors = self.read_errors(path)
+        self.assertEqual([error["offset"] for error in errors], [1])
+        self.assertEqual(errors[0]["row"]["name"], "Broken")
+        self.assertEqual(set(errors[0]["errors"]), {"released_at", "duration"})
+
+    def test_committed_chunks_invalidate_caches(self):
+        path = self.write_csv(
+            [
+                ["Alien", "Space", "1979-05-25", "117", "Horror", "English"],
+                ["Heat", "Crime", "1995-12-15", "170", "Crime", "English"],
+            ]
+        )
+        insert = patch(
+            "apps.movie.management.commands.import_movies.Command.insert",
+            side_effect=[None, RuntimeError("interrupted")],
+        )
+        with insert, self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(RuntimeError):
+                self.import_movies(path, "--chunk-size", "1")
+        self.assertEqual(len(callbacks), 1)
+
+    def test_jsonl(self):
+        row = dict(zip(self.columns, ["Alien", "Space", "1979-05-25", 117, "Horror", "English"]))
+        path = self.write("movies.jsonl", "\n".join([json.dumps(row), "{not json", "[1]", ""]))
+        output = self.import_movies(path)
+        self.assertIn("Imported 1 movie(s) and rejected 2", output)
+        self.assertEqual(Movie.objects.get().duration, 117)
+        self.assertEqual([error["offset"] for error in self.read_errors(path)], [1, 2])
+
+    def test_ragged_csv_rows(self):
+        path = self.write_csv(
+            [
+                ["Alien", "Space", "1979-05-25", "117", "Horror", "English", "surplus"],
+                ["Heat", "Crime", "1995-12-15", "170"],
+                ["Ran", "War", "1985-06-01", "162", "Drama", "Japanese"],
+            ]
+        )
+        output = self.import_movies(path)
+        self.assertIn("Imported 1 movie(s) and rejected 2", output)
+        self.assertEqual(Movie.objects.get().name, "Ran")
+        errors = self.read_errors(path)
+        self.assertEqual([error["offset"] for error in errors], [0, 1])
+        self.assertEqual(errors[0]["errors"], ["More values than header columns"])
+        self.assertEqual(errors[0]["row"]["_extra"], ["surplus"])
+        self.assertEqual(set(errors[1]["errors"]), {"genre", "language"})
+
+    def test_resume_from_offset(self):
+        path = self.write_csv(
+            [[f"Movie {i}", "Drama", "2024-01-15", "90", "Drama", "English"] for i in range(5)]
+        )
+        output = self.import_movies(path, "--offset", "3", "--method", "bulk_create")
+        self.assertIn("Imported 2 movie(s)", output)
+        self.assertEqual(
+            sorted(Movie.objects.values_list("name", flat=True)), ["Movie 3", "Movie 4"]
+        )
+
+    def test_imported_movies_are_searchable(self):
+        path = self.write_csv([["Alien", "A crew meets a creature", "1979-05-25", "117", "Horror", "English"]])
+        self.import_movies(path)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(reverse("search_movies"), {"q": "creature"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([movie["name"] for movie in response.data["data"]], ["Alien"])
+
+    def test_unknown_user(self):
+        path = self.write_csv([])
+        with self.assertRaisesMessage(CommandError, "User bob does not exist"):
+            call_command("import_movies", path, "--created-by", "bob")
+
+
+class SeedScaleTest(TestCase):
+    def seed(self, **options):
+        call_command("seed_scale", users=300, movies=200, ratings=2000, stdout=io.StringIO(), **options)
+
+    def snapshot(self):
+        return list(
+            Rating.objects.order_by("id").values_list("id", "user__username", "movie__name", "rating")
+        )
+
+    def test_counts_and_aggregates(self):
+        self.seed(reports=30)
+        self.assertEqual(User.objects.count(), 300)
+        self.assertEqual(Movie.objects.count(), 200)
+        self.assertEqual(Rating.objects.count(), 2000)
+        self.assertEqual(ReportedMovie.objects.count(), 30)
+        self.assertTrue(User.objects.first().check_password("password"))
+        self.assertEqual(Movie.reconcile_rating_aggregates(), 0)
+        self.assertEqual(Movie.objects.aggregate(total=Sum("total_rating"))["total"], 2000)
+
+    def test_popularity_is_skewed(self):
+        self.seed()
+        totals = sorted(Movie.objects.values_list("total_rating", flat=True), reverse=True)
+        self.assertGreater(totals[0], 5 * totals[len(totals) // 2])
+        ratings = sorted(
+            Rating.objects.values("user").annotate(count=Count("id")).values_list("count", flat=True)
+        )
+        self.assertGreater(ratings[-1], 5 * ratings[len(ratings) // 2])
+
+    def test_deterministic_under_seed(self):
+        self.seed(seed=7)
+        snapshot = self.snapshot()
+        Movie.objects.all().delete()
+        User.objects.all().delete()
+        self.seed(seed=7)
+        self.assertEqual(self.snapshot(), snapshot)
+        self.seed(seed=7, prefix="other")
+        self.assertEqual(Rating.objects.count(), 4000)
+
+    def test_prefix_in_use(self):
+        self.seed()
+        with self.assertRaisesMessage(CommandError, "Users prefixed seed_ exist"):
+            self.seed()
+
+
+class BenchHttpTest(TestCase):
+    baseline = {
+        "client": {
+            "read_mix": {
+                "movies_list": {"errors": 0, "rps": 100.0, "p50_ms": 10.0, "p95_ms": 20.0, "queries": 1.0},
+            }
+        }
+    }
+    thresholds = {"rps": 0.2, "p50_ms": 0.3, "p95_ms": 0.3, "queries": 0.0}
+
+    def compare(self, **metrics):
+        current = {"errors": 0, "rps": 100.0, "p50_ms": 10.0, "p95_ms": 20.0, "queries": 1.0, **metrics}
+        results = {"client": {"read_mix": {"movies_list": current}}}
+        return find_regressions(self.baseline, results, self.thresholds)
+
+    def test_within_thresholds(self):
+        self.assertEqual(self.compare(rps=81.0, p50_ms=12.9, p95_ms=5.0), [])
+
+    def test_regressions(self):
+        regressions = self.compare(rps=79.0, p95_ms=26.1, queries=2.0, errors=1)
+        self.assertEqual(
+            [line.split(":")[0] for line in regressions],
+            [
+                "client read_mix movies_list errors",
+                "client read_mix movies_list rps",
+                "client read_mix movies_list p95_ms",
+                "client read_mix movies_list queries",
+            ],
+        )
+
+    def test_untracked_metrics_are_skipped(self):
+        results = {
+            "wsgi": {"read_mix": {"movies_list": {"errors": 0, "rps": 1.0}}},
+            "client": {"read_mix": {"my_movies": {"errors": 5, "rps": 1.0}}},
+        }
+        self.assertEqual(find_regressions(self.baseline, results, self.thresholds), [])
+        self.assertEqual(self.compare(queries=None), [])
+
+    def test_summarize(self):
+        samples = [(float(latency), True, 2) for latency in range(1, 101)] + [(500.0, False, None)]
+        metrics = summarize(samples, elapsed=2.0)
+        self.assertEqual(metrics["requests"], 101)
+        self.assertEqual(metrics["errors"], 1)
+        self.assertEqual(metrics["rps"], 50.0)
+        self.assertEqual((metrics["p50_ms"], metrics["p95_ms"], metrics["p99_ms"]), (51.0, 96.0, 100.0))
+        self.assertEqual(metrics["queries"], 2.0)
+
+
+@override_settings(METRICS_TOKEN="secret")
+class MetricsTest(TestCase):
+    def setUp(self):
+        self.user = create_user("alice")
+        self.movie = create_movie(self.user, "Alien")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        cache.clear()
+
+    def scrape(self):
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], CONTENT_TYPE)
+        samples = {}
+        for line in response.content.decode().splitlines():
+            if not line.startswith("#"):
+                series, value = line.rsplit(" ", 1)
+                samples[series] = float(value)
+        return samples
+
+    def delta(self, before, after, series):
+        return after.get(series, 0) - before.get(series, 0)
+
+    def test_records_requests_per_url_name(self):
+        before = self.scrape()
+        self.client.get(reverse("movies_list"), {"cursor": ""})
+        self.client.get(reverse("retrieve_movie_async", args=[self.movie.id]))
+        self.client.get(reverse("retrieve_movie", args=[uuid.uuid4()]))
+        self.client.get("/no-such-page/")
+        after = self.scrape()
+
+        endpoint = '{endpoint="movies_list"}'
+        self.assertEqual(
+            self.delta(before, after, 'http_requests_total{endpoint="movies_list",method="GET",status="2xx"}'), 1
+        )
+        self.assertEqual(self.delta(before, after, f"http_request_duration_seconds_count{endpoint}"), 1)
+        self.assertEqual(
+            self.delta(before, after, 'http_request_duration_seconds_bucket{endpoint="movies_list",le="+Inf"}'), 1
+        )
+        self.assertGreater(self.delta(before, after, f"http_request_db_queries_total{endpoint}"), 0)
+        self.assertGreater(self.delta(before, after, f"http_request_db_seconds_total{endpoint}"), 0)
+        self.assertGreater(self.delta(before, after, f"http_request_render_seconds_total{endpoint}"), 0)
+        self.assertGreater(self.delta(before, after, f"http_response_bytes_total{endpoint}"), 0)
+        self.assertGreater(
+            self.delta(before, after, 'http_request_db_queries_total{endpoint="retrieve_movie_async"}'), 0
+        )
+        self.assertEqual(
+            self.delta(before, after, 'http_requests_total{endpoint="retrieve_movie",method="GET",status="4xx"}'), 1
+        )
+        self.assertEqual(
+            self.delta(before, after, 'http_requests_total{endpoint="unmatched",method="GET",status="4xx"}'), 1
+        )
+        self.assertFalse(any('endpoint="metrics"' in series for series in after))
+
+    def test_streamed_responses(self):
+        admin = create_user("root", UserRole.ADMIN.value)
+        self.client.force_authenticate(admin)
+        before = self.scrape()
+        response = self.client.get(reverse("export_movies"))
+        body = b"".join(response.streaming_content)
+        after = self.scrape()
+        endpoint = '{endpoint="export_movies"}'
+        self.assertEqual(self.delta(before, after, f"http_response_bytes_total{endpoint}"), len(body))
+        self.assertGreater(self.delta(before, after, f"http_request_db_queries_total{endpoint}"), 0)
+
+    def test_workers_are_added_up(self):
+        with tempfile.TemporaryDirectory() as directory:
+            workers = [MetricsStore(directory, flush_seconds=60) for _ in range(2)]
+            stats = RequestStats()
+            stats.queries = 2
+            for store in workers:
+                store.observe("movies_list", "GET", 200, 0.02, stats, 100)
+            # Not flushed yet
+            self.assertEqual(workers[0].collect()["http_response_bytes_total"], {'{endpoint="movies_list"}': 100})
+            workers[1].flush(force=True)
+            collected = workers[0].collect()
+            self.assertEqual(collected["http_request_db_queries_total"], {'{endpoint="movies_list"}': 4})
+            buckets = collected["http_request_duration_seconds"]
+            self.assertEqual(buckets['_bucket{endpoint="movies_list",le="0.01"}'], 0)
+            self.assertEqual(buckets['_bucket{endpoint="movies_list",le="0.025"}'], 2)
+            self.assertIn("# TYPE http_request_duration_seconds histogram", workers[0].render())
+
+    def test_exited_workers_are_folded_into_one_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            worker = MetricsStore()
+            worker.observe("movies_list", "GET", 200, 0.02, RequestStats(), 100)
+            for _ in range(2):
+                process = subprocess.Popen(["true"])
+                process.wait()
+                # Left behind by a worker whose pid no process has any more
+                path = Path(directory) / f"{process.pid}-{uuid.uuid4().hex[:8]}.json"
+                path.write_text(json.dumps(worker.families))
+            running = MetricsStore(directory)
+            running.observe("movies_list", "GET", 200, 0.02, RequestStats(), 100)
+            running.flush(force=True)
+
+            scraper = MetricsStore(directory)
+            for _ in range(2):
+                collected = scraper.collect()["http_response_bytes_total"]
+                self.assertEqual(collected, {'{endpoint="movies_list"}': 300})
+            files = sorted(path.name for path in Path(directory).glob("*.json"))
+            self.assertEqual(files, sorted(["exited.json", running.path.name]))
+
+    def test_token(self):
+        self.scrape()
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        for authorization in ["Bearer wrong", "Bearer sécret"]:
+            response = self.client.get("/metrics", HTTP_AUTHORIZATION=authorization)
+            self.assertEqual(response.status_code, 403)
+        with override_settings(METRICS_TOKEN=""):
+            self.assertEqual(self.client.get("/metrics").status_code, 403)
+
+
+class RendererTest(TestCase):
+    def setUp(self):
+        self.user = create_user("alice")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.movie = create_movie(self.user, "Am\u00e9lie \u2028 \U0001f3ac", avg_rating=Decimal("4.5"))
+
+    def test_fast_json_matches_json_renderer(self):
+        page = self.client.get(reverse("movies_list")).data
+        extra = {
+            "raw": [Decimal("4.50"), self.movie.id, self.movie.created_at, datetime.date(2024, 1, 1)],
+            "big": 2**70,
+        }
+        for data in [page, extra, {"message": "Movie not found"}, []]:
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_msgpack_is_negotiated(self):
+        json_body = json.loads(self.client.get(reverse("movies_list")).content)
+        cache.clear()
+        response = self.client.get(reverse("movies_list"), HTTP_ACCEPT="application/msgpack")
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(response.content), json_body)
+
+        body = msgpack.packb({"movie": str(self.movie.id), "rating": 4})
+        response = self.client.post(
+            reverse("submit_rating"), body, content_type="application/msgpack"
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_fast_json_parser(self):
+        parser = FastJSONParser()
+        self.assertEqual(parser.parse(BytesIO(b'{"id": 18446744073709551616}')), {"id": 2**64})
+        for body in [b'{"rating": NaN}', b'{"rating": 4']:
+            with self.assertRaises(ParseError):
+                parser.parse(BytesIO(body))
+
+
+class QueryBudgetTest(TestCase):
+    """
+    Upper bounds on the queries one request may run, on every test backend.
+    Reads are also checked to cost the same with more rows, so an N+1 fails
+    here before it reaches production. New routes need a budget too.
+    """
+
+    budgets = {
+        "create_movie": 6,
+        "my_movies": 2,
+        "movies_list": 2,
+        "search_movies": 1,
+        "autocomplete_movies": 0,
+        "retrieve_movie": 2,
+        "retrieve_movies": 1,
+        "update_movie": 6,
+        "movie_cache_stats": 0,
+        "submit_rating": 6,
+        "submit_ratings_bulk": 11,
+        "update_rating": 5,
+        "rated_movie_list": 3,
+        "report_movie": 3,
+        "reported_movie_list": 1,
+        "review_report": 2,
+        "export_movies": 1,
+        "export_ratings": 1,
+        "export_reports": 1,
+        "my_movies_async": 2,
+        "movies_list_async": 2,
+        "retrieve_movie_async": 2,
+        "rated_movie_list_async": 3,
+    }
+
+    def setUp(self):
+        self.admin = create_user("root", UserRole.ADMIN.value)
+        self.user = create_user("alice")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.add_rows(3)
+        self.addCleanup(reset_title_index)
+
+    def add_rows(self, count):
+        for i in range(count):
+            movie = create_movie(self.user, f"Movie {Movie.objects.count()}")
+            self.rating = Rating.objects.create(user=self.user, movie=movie, rating=1 + i % 5)
+            self.report = ReportedMovie.objects.create(
+                movie=movie, reported_by=self.user, reason="Spoilers"
+            )
+        self.movie = movie
+
+    def count_queries(self, name, method="get", args=(), data=None, user=None):
+        cache.clear()
+        refresh_title_index(background=False)
+        self.client.force_authenticate(user or self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(
+                reverse(name, args=args), data, format="json" if method != "get" else None
+            )
+            if response.streaming:
+                b"".join(response.streaming_content)
+        self.assertLess(response.status_code, 300, (name, getattr(response, "data", None)))
+        sql = "\n".join(query["sql"] for query in queries)
+        self.assertLessEqual(len(queries), self.budgets[name], f"{name}:\n{sql}")
+        return len(queries)
+
+    def reads(self):
+        return {
+            "my_movies": self.count_queries("my_movies"),
+            "movies_list": self.count_queries("movies_list", data={"cursor": ""}),
+            "search_movies": self.count_queries("search_movies", data={"q": "movie"}),
+            "autocomplete_movies": self.count_queries("autocomplete_movies", data={"q": "mo"}),
+            "retrieve_movie": self.count_queries("retrieve_movie", args=[self.movie.id]),
+            "retrieve_movies": self.count_queries(
+                "retrieve_movies",
+                data={"ids": ",".join(str(id) for id in Movie.objects.values_list("id", flat=True)[:3])},
+            ),
+            "rated_movie_list": self.count_queries("rated_movie_list"),
+            "reported_movie_list": self.count_queries("reported_movie_list", user=self.admin),
+            "movie_cache_stats": self.count_queries("movie_cache_stats", user=self.admin),
+            "export_movies": self.count_queries("export_movies", user=self.admin),
+            "export_ratings": self.count_queries("export_ratings", user=self.admin),
+            "export_reports": self.count_queries("export_reports", user=self.admin),
+            "my_movies_async": self.count_queries("my_movies_async"),
+            "movies_list_async": self.count_queries("movies_list_async", data={"cursor": ""}),
+            "retrieve_movie_async": self.count_queries("retrieve_movie_async", args=[self.movie.id]),
+            "rated_movie_list_async": self.count_queries("rated_movie_list_async"),
+        }
+
+    def test_reads_do_not_grow_with_rows(self):
+        before = self.reads()
+        self.add_rows(20)
+        self.assertEqual(self.reads(), before)
+
+    def test_writes_stay_within_budget(self):
+        movie = {
+            "name": "Budget",
+            "description": "Counted",
+            "released_at": "2024-01-15",
+            "duration": 100,
+            "genre": "Drama",
+            "language": "English",
+        }
+        self.count_queries("create_movie", "post", data=movie)
+        self.count_queries("update_movie", "put", args=[self.movie.id], data=movie)
+        self.count_queries("submit_rating", "post", data={"movie": str(self.movie.id), "rating": 2})
+        ratings = [
+            {"movie": str(movie_id), "rating": 4}
+            for movie_id in Movie.objects.values_list("id", flat=True)
+        ]
+        self.count_queries("submit_ratings_bulk", "post", data=ratings)
+        self.count_queries("update_rating", "put", args=[self.rating.id], data={"rating": 5})
+        self.count_queries("report_movie", "post", data={"movie": str(self.movie.id), "reason": "x"})
+        self.count_queries(
+            "review_report",
+            "put",
+            args=[self.report.id],
+            data={"admin_approval": "approved"},
+            user=self.admin,
+        )
+
+    def test_every_route_has_a_budget(self):
+        from .urls.urls_v1 import urlpatterns
+
+        self.assertEqual({pattern.name for pattern in urlpatterns}, set(self.budgets))
@@ -1,5 +1,6 @@
 from django.urls import path
 from ..views.views_v1 import *
+from ..views import async_views_v1
 
 urlpatterns = [
 
@@ -7,17 +8,33 @@ urlpatterns = [
     path('create-movie/', MovieViewSet. as_view({'post': 'create_movie'}), name='create_movie'),
     path('my-movies/', MovieViewSet.as_view({'get': 'my_movies'}), name='my_movies'),
     path('movies_list/', MovieViewSet.as_view({'get': 'movies_list'}), name='movies_list'),
+    path('search/', MovieViewSet.as_view({'get': 'search_movies'}), name='search_movies'),
+    path('autocomplete/', MovieViewSet.as_view({'get': 'autocomplete_movies'}), name='autocomplete_movies'),
     path('retrieve-movie/<str:id>/', MovieViewSet.as_view({'get': 'retrieve_movie'}), name='retrieve_movie'),
+    path('retrieve-movies/', MovieViewSet.as_view({'get': 'retrieve_movies', 'post': 'retrieve_movies'}), name='retrieve_movies'),
     path('update-movie/<str:id>/', MovieViewSet.as_view({'put': 'update_movie'}), name='update_movie'),
+    path('cache-stats/', MovieViewSet.as_view({'get': 'cache_stats'}), name='movie_cache_stats'),
 
     # ------------------------------ Rating API ----------------------------- #
     path('submit-rating/', RatingViewSet.as_view({'post': 'submit_rating'}), name='submit_rating'),
+    path('submit-ratings-bulk/', RatingViewSet.as_view({'post': 'submit_ratings_bulk'}), name='submit_ratings_bulk'),
     path('update-rating/<str:id>/', RatingViewSet.as_view({'put': 'update_rating'}), name='update_rating'),
     path('rated-movie-list/', RatingViewSet.as_view({'get': 'rated_movie_list'}), name='rated_movie_list'),
 
     # ------------------------------ Report API ----------------------------- #
     path('report-movie/', ReportedMovieViewSet.as_view({'post': 'report_movie'}), name='report_movie'),
     path('reported-movie-list/', ReportedMovieViewSet.as_view({'get': 'reported_movie_list'}), name='reported_movie_list'),
-    path('review-report/<str:id>/', ReportedMovieViewSet.as_view({'put': 'review_report'}), name='review_report')
+    path('review-report/<str:id>/', ReportedMovieViewSet.as_view({'put': 'review_report'}), name='review_report'),
+
+    # ------------------------------ Export API ----------------------------- #
+    path('export-movies/', ExportViewSet.as_view({'get': 'export_movies'}), name='export_movies'),
+    path('export-ratings/', ExportViewSet.as_view({'get': 'export_ratings'}), name='export_ratings'),
+    path('export-reports/', ExportViewSet.as_view({'get': 'export_reports'}), name='export_reports'),
+
+    # ---------------------------- Async read API --------------------------- #
+    path('async/my-movies/', async_views_v1.my_movies, name='my_movies_async'),
+    path('async/movies_list/', async_views_v1.movies_list, name='movies_list_async'),
+    path('async/retrieve-movie/<str:id>/', async_views_v1.retrieve_movie, name='retrieve_movie_async'),
+    path('async/rated-movie-list/', async_views_v1.rated_movie_list, name='rated_movie_list_async'),
 
 ]
\ No newline at end of file
@@ -0,0 +1,117 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.response import Response
+from external.async_views import async_api_view
+from external.conditional import aconditional_get, aversioned_get
+from external.enum import UserRole
+from external.pagination import CustomPagination
+from external.projection import project
+from external.sparse_fields import get_expansions, get_sparse_fields, select_columns
+from ..facets import get_facet_counts
+from ..models import Movie, Rating
+from ..personal import awith_my_rating
+from ..response_cache import CATALOG_VERSION_KEY, get_version_state, movie_version_key
+from ..serializers.serializers_v1 import (
+    MovieFilterSerializer,
+    MovieListSerializer,
+    MovieRetrieveSerializer,
+    RatedMovieListSerializer,
+)
+
+# Async counterparts of the movie read actions of views_v1, reading through
+# the async ORM so an ASGI worker serves other requests while they wait on the
+# database. They skip the shared response cache of the sync views.
+
+
+def list_movies(request):
+    fields = get_sparse_fields(request, MovieListSerializer)
+    return select_columns(
+        Movie.objects.all(), MovieListSerializer, fields, extra=Movie.LIST_ORDERING_FIELDS
+    )
+
+
+def catalog_version(request):
+    return get_version_state(CATALOG_VERSION_KEY)
+
+
+def requested_movie_version(request, id):
+    # Pending shard deltas are folded first so the version covers them
+    if settings.MOVIE_RATING_SHARDS:
+        Movie.fold_rating_shards(movie_ids=[id])
+    return get_version_state(movie_version_key(id))
+
+
+def requested_movie(request, id):
+    return Movie.objects.filter(id=id)
+
+
+def rated_movies(request):
+    queryset = Rating.objects.all()
+    if request.user.role == UserRole.ADMIN.value:
+        return queryset
+    return queryset.filter(user=request.user.id)
+
+
+async def get_page_response(request, queryset, serializer_class, **kwargs):
+    paginator = CustomPagination()
+    page = await paginator.apaginate_queryset(queryset, request)
+    serializer = serializer_class(page, many=True, context={"request": request}, **kwargs)
+    return paginator.get_paginated_response(serializer.data)
+
+
+@async_api_view
+@awith_my_rating
+async def my_movies(request):
+    fields = get_sparse_fields(request, MovieListSerializer)
+    queryset = list_movies(request).filter(created_by=request.user.id)
+    return await get_page_response(
+        request, project(queryset, MovieListSerializer, fields), MovieListSerializer, fields=fields
+    )
+
+
+@async_api_view
+@awith_my_rating
+@aversioned_get(catalog_version)
+async def movies_list(request):
+    filter_serializer = MovieFilterSerializer(data=request.query_params)
+    if not filter_serializer.is_valid():
+        return Response(filter_serializer.errors, 400)
+    queryset = filter_serializer.filter_queryset(list_movies(request))
+    fields = get_sparse_fields(request, MovieListSerializer)
+    response = await get_page_response(
+        request, project(queryset, MovieListSerializer, fields), MovieListSerializer, fields=fields
+    )
+
+    facets = filter_serializer.validated_data.get("facets")
+    if facets:
+        response.data["facets"] = await sync_to_async(get_facet_counts)(
+            queryset, facets, filter_serializer.get_filters()
+        )
+    return response
+
+
+@async_api_view
+@awith_my_rating
+@aversioned_get(requested_movie_version)
+async def retrieve_movie(request, id):
+    fields = get_sparse_fields(request, MovieRetrieveSerializer)
+    queryset = select_columns(requested_movie(request, id), MovieRetrieveSerializer, fields)
+    instance = await queryset.afirst()
+    if not instance:
+        return Response({"message": "Movie not found"}, 400)
+    return Response(MovieRetrieveSerializer(instance, fields=fields).data, 200)
+
+
+@async_api_view
+@aconditional_get(rated_movies, per_user=True, serializer_class=RatedMovieListSerializer)
+async def rated_movie_list(request):
+    fields = get_sparse_fields(request, RatedMovieListSerializer)
+    expand = get_expansions(request, RatedMovieListSerializer)
+    queryset = select_columns(
+        rated_movies(request), RatedMovieListSerializer, fields, extra=["created_at"], expand=expand
+    )
+    if not expand:
+        queryset = project(queryset, RatedMovieListSerializer, fields)
+    return await get_page_response(
+        request, queryset, RatedMovieListSerializer, fields=fields, expand=expand
+    )
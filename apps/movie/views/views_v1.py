@@ -1,12 +1,38 @@
 import datetime
+from django.conf import settings
 from rest_framework import viewsets
 from ..models import *
 from ..serializers.serializers_v1 import *
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from external.pagination import CustomPagination
+from external.conditional import conditional_get, versioned_get
+from external.exports import export_response
+from external.projection import project
+from external.sparse_fields import (
+    expand_params,
+    get_expansions,
+    get_sparse_fields,
+    select_columns,
+    sparse_field_params,
+)
+from external.pagination import CustomPagination, KeysetPagination, OptionalCursorPagination
 from external.enum import UserRole
+from external.renderers import CSVRenderer, NDJSONRenderer
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiExample
+from external.swagger_query_params import set_query_params
+from ..autocomplete import get_title_index
+from ..facets import get_facet_counts
+from ..personal import my_rating_params, with_my_rating
+from ..response_cache import (
+    CATALOG_VERSION_KEY,
+    cache_movie_response,
+    cached_movies,
+    get_cache_stats,
+    get_version_state,
+    movie_version_key,
+)
+from ..search import search_movies
 
 
 class MovieViewSet(viewsets.ModelViewSet):
@@ -16,17 +42,33 @@ class MovieViewSet(viewsets.ModelViewSet):
     pagination_class = CustomPagination
 
     def get_queryset(self):
-        return self.model_class.objects.all()
+        queryset = self.model_class.objects.all()
+        if self.action in ["my_movies", "movies_list", "search_movies"]:
+            # Ordering fields stay loaded for the cursor of the next page
+            return select_columns(
+                queryset,
+                MovieListSerializer,
+                self.get_sparse_fields(),
+                extra=Movie.LIST_ORDERING_FIELDS,
+            )
+        if self.action in ["retrieve_movie", "retrieve_movies"]:
+            return select_columns(
+                queryset, MovieRetrieveSerializer, self.get_sparse_fields()
+            )
+        return queryset
+
+    def get_sparse_fields(self):
+        return get_sparse_fields(self.request, self.get_serializer_class())
 
     def get_serializer_class(self):
 
         if self.action == "create_movie":
             return MovieCreateSerializer
-        if self.action in ["my_movies", "movies_list"]:
+        if self.action in ["my_movies", "movies_list", "search_movies"]:
             return MovieListSerializer
         if self.action == "update_movie":
             return MovieUpdateSerializer
-        if self.action == "retrieve_movie":
+        if self.action in ["retrieve_movie", "retrieve_movies"]:
             return MovieRetrieveSerializer
         else:
             return self.serializer_class
@@ -58,43 +100,190 @@ class MovieViewSet(viewsets.ModelViewSet):
         else:
             return Response(serializer.errors, 400)
 
-    @extend_schema(tags=["Movie"])
+    @extend_schema(tags=["Movie"], parameters=sparse_field_params + my_rating_params)
+    @with_my_rating
     def my_movies(self, request, *args, **kwargs):
-        queryset = self.get_queryset().filter(created_by=request.user.id)
-        page = self.paginate_queryset(queryset)
         serializer_class = (
             self.get_serializer_class()
             if self.serializer_class
             else self.serializer_class
         )
+        fields = self.get_sparse_fields()
+        queryset = project(
+            self.get_queryset().filter(created_by=request.user.id), serializer_class, fields
+        )
+        page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = serializer_class(page, many=True, context={"request": request})
+            serializer = serializer_class(
+                page, many=True, fields=fields, context={"request": request}
+            )
             return self.get_paginated_response(serializer.data)
-        return Response(serializer_class(queryset, many=True).data, 200)
+        return Response(serializer_class(queryset, many=True, fields=fields).data, 200)
 
-    @extend_schema(tags=["Movie"])
+    def catalog_version(self, request, *args, **kwargs):
+        return get_version_state(CATALOG_VERSION_KEY)
+
+    def requested_movie_version(self, request, *args, **kwargs):
+        # Pending shard deltas are folded first so the version covers them
+        if settings.MOVIE_RATING_SHARDS:
+            Movie.fold_rating_shards(movie_ids=[kwargs["id"]])
+        return get_version_state(movie_version_key(kwargs["id"]))
+
+    @extend_schema(
+        tags=["Movie"],
+        parameters=[MovieFilterSerializer, *sparse_field_params, *my_rating_params],
+    )
+    @with_my_rating
+    @cache_movie_response
+    @versioned_get("catalog_version")
     def movies_list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        page = self.paginate_queryset(queryset)
+        filter_serializer = MovieFilterSerializer(data=request.query_params)
+        if not filter_serializer.is_valid():
+            return Response(filter_serializer.errors, 400)
+        queryset = filter_serializer.filter_queryset(self.get_queryset())
         serializer_class = (
             self.get_serializer_class()
             if self.serializer_class
             else self.serializer_class
         )
+        fields = self.get_sparse_fields()
+        page = self.paginate_queryset(project(queryset, serializer_class, fields))
         if page is not None:
-            serializer = serializer_class(page, many=True, context={"request": request})
-            return self.get_paginated_response(serializer.data)
-        return Response(serializer_class(queryset, many=True).data, 200)
+            serializer = serializer_class(
+                page, many=True, fields=fields, context={"request": request}
+            )
+            response = self.get_paginated_response(serializer.data)
+        else:
+            response = Response(serializer_class(queryset, many=True, fields=fields).data, 200)
 
-    @extend_schema(tags=["Movie"])
+        facets = filter_serializer.validated_data.get("facets")
+        if facets and page is not None:
+            response.data["facets"] = get_facet_counts(
+                queryset, facets, filter_serializer.get_filters()
+            )
+        return response
+
+    @extend_schema(
+        tags=["Movie"],
+        parameters=set_query_params(
+            field_data=[
+                {"name": "q", "required": True, "description": "Words to search for"},
+                {"name": "cursor", "description": "Cursor from the previous page"},
+                {
+                    "name": "facets",
+                    "description": "Comma separated facets to count: genre, language, rating, decade",
+                },
+            ]
+        )
+        + sparse_field_params,
+    )
+    def search_movies(self, request, *args, **kwargs):
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            return Response({"message": "Search query is required"}, 400)
+        facet_serializer = FacetSelectionSerializer(data=request.query_params)
+        if not facet_serializer.is_valid():
+            return Response(facet_serializer.errors, 400)
+
+        matches = search_movies(self.get_queryset(), query)
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(matches.order_by("-rank"), request, view=self)
+        serializer_class = self.get_serializer_class()
+        serializer = serializer_class(
+            page, many=True, fields=self.get_sparse_fields(), context={"request": request}
+        )
+        response = paginator.get_paginated_response(serializer.data)
+
+        facets = facet_serializer.validated_data.get("facets")
+        if facets:
+            # Grouping over the ranked queryset would group by its annotations
+            queryset = self.get_queryset().filter(pk__in=matches.values("pk"))
+            response.data["facets"] = get_facet_counts(queryset, facets, {"q": query})
+        return response
+
+    @extend_schema(
+        tags=["Movie"],
+        parameters=set_query_params(
+            field_data=[
+                {"name": "q", "required": True, "description": "Beginning of a movie name"},
+                {"name": "limit", "type": "int", "description": "At most 20, defaults to 10"},
+            ]
+        ),
+    )
+    def autocomplete_movies(self, request, *args, **kwargs):
+        try:
+            limit = min(max(int(request.query_params.get("limit", 10)), 1), 20)
+        except ValueError:
+            return Response({"message": "limit must be a number"}, 400)
+        prefix = request.query_params.get("q", "")
+        return Response(get_title_index().lookup(prefix, limit), 200)
+
+    @extend_schema(tags=["Movie"], parameters=sparse_field_params + my_rating_params)
+    @with_my_rating
+    @cache_movie_response
+    @versioned_get("requested_movie_version")
     def retrieve_movie(self, request, *args, **kwargs):
         instance = self.get_queryset().filter(id=kwargs["id"]).first()
         if not instance:
             return Response({"message": "Movie not found"}, 400)
         serializer_class = self.get_serializer_class()
-        serializer = serializer_class(instance)
+        serializer = serializer_class(instance, fields=self.get_sparse_fields())
         return Response(serializer.data, 200)
 
+    @extend_schema(
+        tags=["Movie"],
+        methods=["GET"],
+        parameters=set_query_params(
+            field_data=[
+                {"name": "ids", "required": True, "description": "Comma separated movie ids"}
+            ]
+        )
+        + sparse_field_params,
+    )
+    @extend_schema(
+        tags=["Movie"],
+        methods=["POST"],
+        request=MovieBatchSerializer,
+        parameters=sparse_field_params,
+    )
+    def retrieve_movies(self, request, *args, **kwargs):
+        if request.method == "GET":
+            ids = [id for id in request.query_params.get("ids", "").split(",") if id.strip()]
+            serializer = MovieBatchSerializer(data={"ids": ids})
+        else:
+            serializer = MovieBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, 400)
+        movie_ids = [str(id) for id in dict.fromkeys(serializer.validated_data["ids"])]
+
+        fields = self.get_sparse_fields()
+        serializer_class = self.get_serializer_class()
+
+        def load(missing_ids):
+            if settings.MOVIE_RATING_SHARDS:
+                Movie.fold_rating_shards(movie_ids=missing_ids)
+            instances = self.get_queryset().filter(id__in=missing_ids)
+            return {
+                str(instance.id): serializer_class(instance, fields=fields).data
+                for instance in instances
+            }
+
+        variant = ",".join(fields or ["*"])
+        movies = cached_movies("retrieve_movies", movie_ids, variant, load)
+        return Response(
+            {
+                "data": [movies[movie_id] for movie_id in movie_ids if movie_id in movies],
+                "missing": [movie_id for movie_id in movie_ids if movie_id not in movies],
+            },
+            200,
+        )
+
+    @extend_schema(tags=["Movie"])
+    def cache_stats(self, request, *args, **kwargs):
+        if request.user.role != UserRole.ADMIN.value:
+            return Response({"message": "Cache stats are only available to an Admin"}, 406)
+        return Response(get_cache_stats(), 200)
+
     @extend_schema(
         tags=["Movie"],
         examples=[
@@ -117,7 +306,7 @@ class MovieViewSet(viewsets.ModelViewSet):
         if not instance:
             return Response({"message": "Movie not found"}, 400)
 
-        if str(instance.created_by) != str(request.user):
+        if instance.created_by_id != request.user.id:
             return Response(
                 {"message": "You are only permitted to update movies that you own"}, 406
             )
@@ -136,13 +325,25 @@ class RatingViewSet(viewsets.ModelViewSet):
     serializer_class = RatedMovieListSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = CustomPagination
+    bulk_rating_limit = 500
 
     def get_queryset(self):
-        return self.model_class.objects.all()
+        queryset = self.model_class.objects.all()
+        if self.action == "rated_movie_list":
+            return select_columns(
+                queryset,
+                RatedMovieListSerializer,
+                get_sparse_fields(self.request, RatedMovieListSerializer),
+                extra=["created_at"],
+                expand=get_expansions(self.request, RatedMovieListSerializer),
+            )
+        return queryset
 
     def get_serializer_class(self):
         if self.action == "submit_rating":
             return SubmitRatingSerializer
+        if self.action == "submit_ratings_bulk":
+            return BulkRatingItemSerializer
         if self.action == "update_rating":
             return UpdateRatingSerializer
         if self.action == "rated_movie_list":
@@ -161,15 +362,99 @@ class RatingViewSet(viewsets.ModelViewSet):
         ],
     )
     def submit_rating(self, request, *args, **kwargs):
-        request.data["user"] = request.user.id
         serializer_class = self.get_serializer_class()
         serializer = serializer_class(data=request.data)
         if serializer.is_valid():
-            serializer.save()
-            return Response({"message": "Rating submitted"}, 201)
+            _, created = Rating.upsert(
+                request.user.id,
+                serializer.validated_data["movie"].id,
+                serializer.validated_data["rating"],
+            )
+            if created:
+                return Response({"message": "Rating submitted"}, 201)
+            return Response({"message": "Rating updated"}, 202)
         else:
             return Response(serializer.errors, 400)
 
+    @extend_schema(
+        tags=["Rating Movie"],
+        request=BulkRatingItemSerializer(many=True),
+        examples=[
+            OpenApiExample(
+                "Submit Ratings Bulk",
+                value=[
+                    {"movie": "uuid", "rating": "int between 1 to 5"},
+                    {"movie": "uuid", "rating": "int between 1 to 5"},
+                ],
+                request_only=True,
+            )
+        ],
+    )
+    def submit_ratings_bulk(self, request, *args, **kwargs):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response({"message": "A list of ratings is required"}, 400)
+        if len(items) > self.bulk_rating_limit:
+            return Response(
+                {
+                    "message": f"At most {self.bulk_rating_limit} ratings can be "
+                    "submitted at once"
+                },
+                400,
+            )
+
+        serializer_class = self.get_serializer_class()
+        results = [None] * len(items)
+        valid_items = []
+        for index, item in enumerate(items):
+            serializer = serializer_class(data=item)
+            if serializer.is_valid():
+                valid_items.append((index, serializer.validated_data))
+            else:
+                results[index] = {
+                    "index": index,
+                    "status": 400,
+                    "errors": serializer.errors,
+                }
+
+        # Resolving every referenced movie with a single query
+        existing_movies = set(
+            Movie.objects.filter(
+                id__in={data["movie"] for _, data in valid_items}
+            ).values_list("id", flat=True)
+        )
+        # A later item for the same movie replaces the earlier one
+        ratings = {}
+        for index, data in valid_items:
+            if data["movie"] not in existing_movies:
+                error = f'Invalid pk "{data["movie"]}" - object does not exist.'
+                results[index] = {
+                    "index": index,
+                    "status": 400,
+                    "errors": {"movie": [error]},
+                }
+                continue
+            ratings[data["movie"]] = data["rating"]
+
+        submitted = Rating.bulk_upsert(request.user.id, ratings) if ratings else {}
+        created_movies = set()
+        for index, data in valid_items:
+            if data["movie"] not in submitted:
+                continue
+            rating_id, created = submitted[data["movie"]]
+            created = created and data["movie"] not in created_movies
+            if created:
+                created_movies.add(data["movie"])
+            results[index] = {
+                "index": index,
+                "status": 201 if created else 202,
+                "id": rating_id,
+            }
+
+        if not ratings:
+            return Response({"message": "No rating submitted", "results": results}, 400)
+        return Response({"message": "Ratings submitted", "results": results}, 201)
+
     @extend_schema(
         tags=["Rating Movie"],
         examples=[
@@ -185,7 +470,7 @@ class RatingViewSet(viewsets.ModelViewSet):
         if not instance:
             return Response({"message": "Movies rank not found"}, 400)
 
-        if str(instance.user) != str(request.user):
+        if instance.user_id != request.user.id:
             return Response(
                 {"message": "You are only permitted to update rank for the movies that you own"}, 406
             )
@@ -198,32 +483,57 @@ class RatingViewSet(viewsets.ModelViewSet):
         else:
             return Response(serializer.errors, 400)
 
-    @extend_schema(tags=["Rating Movie"])
-    def rated_movie_list(self, request, *args, **kwargs):
-        queryset = (
+    def rated_movies(self, request, *args, **kwargs):
+        return (
             self.get_queryset()
             if request.user.role == UserRole.ADMIN.value
             else self.get_queryset().filter(user=request.user.id)
         )
-        page = self.paginate_queryset(queryset)
+
+    @extend_schema(
+        tags=["Rating Movie"],
+        parameters=sparse_field_params + expand_params(RatedMovieListSerializer),
+    )
+    @conditional_get("rated_movies", per_user=True, serializer_class=RatedMovieListSerializer)
+    def rated_movie_list(self, request, *args, **kwargs):
         serializer_class = (
             self.get_serializer_class()
             if self.serializer_class
             else self.serializer_class
         )
+        fields = get_sparse_fields(request, serializer_class)
+        expand = get_expansions(request, serializer_class)
+        queryset = self.rated_movies(request)
+        if not expand:
+            queryset = project(queryset, serializer_class, fields)
+        page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = serializer_class(page, many=True, context={"request": request})
+            serializer = serializer_class(
+                page, many=True, fields=fields, expand=expand, context={"request": request}
+            )
             return self.get_paginated_response(serializer.data)
-        return Response(serializer_class(queryset, many=True).data, 200)
+        return Response(
+            serializer_class(queryset, many=True, fields=fields, expand=expand).data, 200
+        )
 
 
 class ReportedMovieViewSet(viewsets.ModelViewSet):
     model_class = ReportedMovie
     serializer_class = ReportedMovieListSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = OptionalCursorPagination
 
     def get_queryset(self):
-        return self.model_class.objects.all()
+        queryset = self.model_class.objects.all()
+        if self.action == "reported_movie_list":
+            return select_columns(
+                queryset,
+                ReportedMovieListSerializer,
+                get_sparse_fields(self.request, ReportedMovieListSerializer),
+                extra=["created_at"],
+                expand=get_expansions(self.request, ReportedMovieListSerializer),
+            )
+        return queryset
 
     def get_serializer_class(self):
         if self.action == "report_movie":
@@ -255,23 +565,34 @@ class ReportedMovieViewSet(viewsets.ModelViewSet):
         else:
             return Response(serializer.errors, 400)
 
-    @extend_schema(tags=["Report Movie"])
+    @extend_schema(
+        tags=["Report Movie"],
+        parameters=sparse_field_params + expand_params(ReportedMovieListSerializer),
+    )
     def reported_movie_list(self, request, *args, **kwargs):
         queryset = (
             self.get_queryset()
             if request.user.role == UserRole.ADMIN.value
             else self.get_queryset().filter(reported_by=request.user.id)
         )
-        page = self.paginate_queryset(queryset)
         serializer_class = (
             self.get_serializer_class()
             if self.serializer_class
             else self.serializer_class
         )
+        fields = get_sparse_fields(request, serializer_class)
+        expand = get_expansions(request, serializer_class)
+        if not expand:
+            queryset = project(queryset, serializer_class, fields)
+        page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = serializer_class(page, many=True, context={"request": request})
+            serializer = serializer_class(
+                page, many=True, fields=fields, expand=expand, context={"request": request}
+            )
             return self.get_paginated_response(serializer.data)
-        return Response(serializer_class(queryset, many=True).data, 200)
+        return Response(
+            serializer_class(queryset, many=True, fields=fields, expand=expand).data, 200
+        )
 
     @extend_schema(
         tags=["Report Movie"],
@@ -302,3 +623,61 @@ class ReportedMovieViewSet(viewsets.ModelViewSet):
             return Response({"message": "Report updated"}, 202)
         else:
             return Response(serializer.errors, 400)
+
+
+class ExportViewSet(viewsets.ViewSet):
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+    export_chunk_size = 2000
+    movie_columns = [
+        "id",
+        "name",
+        "description",
+        "released_at",
+        "duration",
+        "genre",
+        "language",
+        "avg_rating",
+        "total_rating",
+        "created_by",
+        "created_at",
+        "updated_at",
+    ]
+    rating_columns = ["id", "user", "movie", "rating", "created_at", "updated_at"]
+    report_columns = [
+        "id",
+        "movie",
+        "reported_by",
+        "reason",
+        "acknowledged",
+        "admin_approval",
+        "created_at",
+        "updated_at",
+    ]
+
+    def export(self, request, queryset, columns, name):
+        if request.user.role != UserRole.ADMIN.value:
+            return Response({"message": "Exports are only available to an Admin"}, 406)
+        serializer = ExportFilterSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, 400)
+        if "updated_since" in serializer.validated_data:
+            queryset = queryset.filter(updated_at__gte=serializer.validated_data["updated_since"])
+        # Table order streams without sorting the whole table first
+        return export_response(
+            request, queryset.order_by(), columns, name, self.export_chunk_size
+        )
+
+    @extend_schema(tags=["Export"], parameters=[ExportFilterSerializer], responses=OpenApiTypes.STR)
+    def export_movies(self, request, *args, **kwargs):
+        return self.export(request, Movie.objects.all(), self.movie_columns, "movies")
+
+    @extend_schema(tags=["Export"], parameters=[ExportFilterSerializer], responses=OpenApiTypes.STR)
+    def export_ratings(self, request, *args, **kwargs):
+        return self.export(request, Rating.objects.all(), self.rating_columns, "ratings")
+
+    @extend_schema(tags=["Export"], parameters=[ExportFilterSerializer], responses=OpenApiTypes.STR)
+    def export_reports(self, request, *args, **kwargs):
+        return self.export(
+            request, ReportedMovie.objects.all(), self.report_columns, "reported_movies"
+        )
@@ -47,6 +47,9 @@ class User(AbstractBaseUser, BaseModel, PermissionsMixin):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="user_created_at_id_idx"),
+        ]
 
     def __str__(self):
         return self.username
@@ -1,11 +1,12 @@
 from ..models import User
 from rest_framework import serializers
+from external.sparse_fields import SparseFieldsMixin
 
 
 excluded_list = ["is_active", "created_at", "updated_at"]
 
 
-class UserListSerializer(serializers.ModelSerializer):
+class UserListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     name = serializers.SerializerMethodField(read_only=True)
 
     @staticmethod
@@ -24,6 +25,14 @@ class UserListSerializer(serializers.ModelSerializer):
             "first_name",
             "last_name",
         ]
+        field_columns = {"name": ["first_name", "last_name"]}
+
+
+class UserSummarySerializer(UserListSerializer):
+    class Meta:
+        model = User
+        fields = ["id", "username", "name"]
+        field_columns = {"name": ["first_name", "last_name"]}
 
 
 class UserCreateSerializer(serializers.ModelSerializer):
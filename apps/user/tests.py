@@ -1,3 +1,72 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from .models import User
 
-# Create your tests here.
+
+class UserListCursorTest(TestCase):
+    def setUp(self):
+        for i in range(5):
+            User.objects.create(
+                username=f"user{i}",
+                email=f"user{i}@example.com",
+                first_name="User",
+                last_name=str(i),
+            )
+        self.client = APIClient()
+
+    def test_cursor_walks_every_user_once(self):
+        url = reverse("user_list") + "?cursor=&page_size=2"
+        usernames = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            usernames.extend(user["username"] for user in response.data["data"])
+            url = response.data["next"]
+        self.assertEqual(sorted(usernames), [f"user{i}" for i in range(5)])
+
+
+class UserQueryBudgetTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def create_users(self, count):
+        start = User.objects.count()
+        for i in range(start, start + count):
+            User.objects.create(
+                username=f"user{i}",
+                email=f"user{i}@example.com",
+                first_name="User",
+                last_name=str(i),
+            )
+
+    def test_reads_do_not_grow_with_rows(self):
+        for rows in [3, 20]:
+            self.create_users(rows)
+            user = User.objects.first()
+            self.client.force_authenticate(user)
+            with self.assertNumQueries(2):
+                self.client.get(reverse("user_list"))
+            with self.assertNumQueries(1):
+                self.client.get(reverse("user_retrieve", args=[user.id]))
+
+
+class UserSparseFieldsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            username="alice", email="alice@example.com", first_name="Alice", last_name="Tester"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_fields_select_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("user_retrieve", args=[self.user.id]) + "?fields=id,username")
+        self.assertEqual(response.data, {"id": str(self.user.id), "username": "alice"})
+        self.assertNotIn('"email"', queries.captured_queries[0]["sql"])
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get(reverse("user_list") + "?exclude=password")
+        self.assertEqual(response.status_code, 400)
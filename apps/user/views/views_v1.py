@@ -5,6 +5,7 @@ from ..serializers.serializers_v1 import *
 from ..models import User
 from external.enum import UserRole
 from external.pagination import CustomPagination
+from external.sparse_fields import get_sparse_fields, select_columns, sparse_field_params
 from django.contrib.auth.hashers import make_password
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
@@ -24,7 +25,15 @@ class UserViewSet(viewsets.ModelViewSet):
             return [IsAuthenticated()]
 
     def get_queryset(self):
-        return self.model_class.objects.all()
+        queryset = self.model_class.objects.all()
+        if self.action in ["user_list", "user_retrieve"]:
+            return select_columns(
+                queryset,
+                UserListSerializer,
+                get_sparse_fields(self.request, UserListSerializer),
+                extra=["created_at"],
+            )
+        return queryset
 
     def get_serializer_class(self):
         if self.action == "create_user":
@@ -205,7 +214,7 @@ class UserViewSet(viewsets.ModelViewSet):
         else:
             return Response(serializer.errors, 400)
 
-    @extend_schema(tags=["User"])
+    @extend_schema(tags=["User"], parameters=sparse_field_params)
     def user_list(self, request, *args, **kwargs):
         queryset = self.get_queryset()
         page = self.paginate_queryset(queryset)
@@ -214,19 +223,24 @@ class UserViewSet(viewsets.ModelViewSet):
             if self.serializer_class
             else self.serializer_class
         )
+        fields = get_sparse_fields(request, serializer_class)
         if page is not None:
-            serializer = serializer_class(page, many=True, context={"request": request})
+            serializer = serializer_class(
+                page, many=True, fields=fields, context={"request": request}
+            )
             return self.get_paginated_response(serializer.data)
-        return Response(serializer_class(queryset, many=True).data, 200)
+        return Response(serializer_class(queryset, many=True, fields=fields).data, 200)
 
-    @extend_schema(tags=["User"])
+    @extend_schema(tags=["User"], parameters=sparse_field_params)
     def user_retrieve(self, request, *args, **kwargs):
         queryset = self.get_queryset()
         serializer_class = self.get_serializer_class()
         instance = queryset.filter(id=kwargs["id"]).first()
         if instance:
+            fields = get_sparse_fields(request, serializer_class)
             return Response(
-                serializer_class(instance, context={"request": request}).data, 200
+                serializer_class(instance, fields=fields, context={"request": request}).data,
+                200,
             )
         else:
             return Response("Invalid id", 400)
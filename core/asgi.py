@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_asgi_application()
+
+# Starts building this worker's title autocomplete index in the background
+from apps.movie.autocomplete import refresh_title_index  # noqa: E402
+
+refresh_title_index()
@@ -80,6 +80,8 @@ ADDED_MIDDLEWARE = [
 ]
 
 MIDDLEWARE = [
+    # First, so its latency covers the other middleware too
+    "external.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -143,6 +145,17 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_RENDERER_CLASSES": (
+        "external.renderers.FastJSONRenderer",
+        "external.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "external.parsers.FastJSONParser",
+        "external.parsers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework.authentication.BasicAuthentication",
         "rest_framework_simplejwt.authentication.JWTAuthentication",
@@ -182,6 +195,60 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "user.User"
 
+# Number of counter shards per movie for rating aggregates, 0 writes straight
+# to the movie row. Shards are folded by `manage.py fold_rating_shards`.
+MOVIE_RATING_SHARDS = config("MOVIE_RATING_SHARDS", default=0, cast=int)
+
+# In-process title autocomplete index, per worker. A movie created, renamed
+# or deactivated in any worker bumps a title version in the shared cache,
+# the other workers then rebuild in the background, at most every
+# AUTOCOMPLETE_REFRESH_SECONDS. Rating writes do not bump it, the rating
+# weights are refreshed by a rebuild every AUTOCOMPLETE_REBUILD_SECONDS.
+AUTOCOMPLETE_MEMORY_BUDGET_MB = config("AUTOCOMPLETE_MEMORY_BUDGET_MB", default=256, cast=int)
+AUTOCOMPLETE_REFRESH_SECONDS = config("AUTOCOMPLETE_REFRESH_SECONDS", default=10, cast=int)
+AUTOCOMPLETE_REBUILD_SECONDS = config("AUTOCOMPLETE_REBUILD_SECONDS", default=3600, cast=int)
+
+# Number of worker processes gunicorn or uvicorn start, both read it from
+# the environment. The response cache, its version counters and the facet
+# counts have to be seen by every worker, so with more than one the cache
+# must be a shared backend such as
+# django.core.cache.backends.redis.RedisCache or .memcached.PyMemcacheCache.
+# Workers refuse to start on a process-local LocMemCache.
+WEB_CONCURRENCY = config("WEB_CONCURRENCY", default=1, cast=int)
+
+CACHES = {
+    "default": {
+        "BACKEND": config(
+            "CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": config("CACHE_LOCATION", default=""),
+    }
+}
+
+# Facet counts are cached per filter set until a movie is written, or for
+# this long at most since rating changes move movies between rating buckets
+MOVIE_FACET_CACHE_SECONDS = config("MOVIE_FACET_CACHE_SECONDS", default=60, cast=int)
+
+# Upper bound on how long a cached movie response is kept. Writes retire
+# responses through version counters, this only limits memory use.
+MOVIE_RESPONSE_CACHE_SECONDS = config("MOVIE_RESPONSE_CACHE_SECONDS", default=3600, cast=int)
+
+# Identical concurrent misses in a worker share one computation. A non-zero
+# lock time also makes workers take a lock in the cache before recomputing,
+# which needs a cache backend shared between them.
+MOVIE_RESPONSE_COALESCING = config("MOVIE_RESPONSE_COALESCING", default=True, cast=bool)
+MOVIE_RESPONSE_LOCK_SECONDS = config("MOVIE_RESPONSE_LOCK_SECONDS", default=0, cast=int)
+
+# Request metrics served at /metrics in Prometheus' text format. Every worker
+# writes its counters to its own file in METRICS_DIR at most every
+# METRICS_FLUSH_SECONDS, and a scrape adds up the files of all of them.
+# Without a directory each worker only reports its own requests.
+# Scrapes have to send METRICS_TOKEN as a bearer token, without a token
+# /metrics answers every request with 403.
+METRICS_DIR = config("METRICS_DIR", default="")
+METRICS_FLUSH_SECONDS = config("METRICS_FLUSH_SECONDS", default=5, cast=int)
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
+
 SPECTACULAR_SETTINGS = {
     "TITLE": "Swagger",
     "DESCRIPTION": "Movie Management System",
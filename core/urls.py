@@ -10,6 +10,7 @@ from django.urls import path, include
 from django.conf.urls.static import static
 
 from renderer.views import render_index_page
+from external.metrics import metrics_view
 
 swagger_urlpatterns = [
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
@@ -28,6 +29,7 @@ swagger_urlpatterns = [
 urlpatterns = [
     path("", render_index_page, name="home_page"),
     path("admin/", admin.site.urls),
+    path("metrics", metrics_view, name="metrics"),
     path("user/v1/", include("apps.user.urls.urls_v1")),
     path("authentication/v1/", include("authentication.urls.urls_v1")),
     path('movie/v1/', include('apps.movie.urls.urls_v1'))
@@ -0,0 +1,45 @@
+import io
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+
+
+def can_copy():
+    return connection.vendor == "postgresql"
+
+
+def copy_text(value):
+    # A value in COPY's text format
+    if value is None:
+        return "\\N"
+    if not isinstance(value, str):
+        return str(value)
+    return (
+        value.replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def copy_objects(model, objects):
+    """
+    Inserts unsaved model instances with PostgreSQL's ``COPY ... FROM STDIN``,
+    preparing every concrete field the way ``bulk_create`` would. Like
+    ``bulk_create`` it sends no signals.
+    """
+    # The connection proxy costs a thread local lookup per attribute
+    db = connections[DEFAULT_DB_ALIAS]
+    fields = model._meta.concrete_fields
+    buffer = io.StringIO()
+    for instance in objects:
+        values = [field.get_db_prep_save(field.pre_save(instance, True), db) for field in fields]
+        buffer.write("\t".join(copy_text(value) for value in values) + "\n")
+    quote = db.ops.quote_name
+    columns = ", ".join(quote(field.column) for field in fields)
+    sql = f"COPY {quote(model._meta.db_table)} ({columns}) FROM STDIN"
+    buffer.seek(0)
+    with db.cursor() as cursor:
+        if hasattr(cursor, "copy_expert"):
+            cursor.copy_expert(sql, buffer)
+        else:
+            with cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
@@ -0,0 +1,190 @@
+import hashlib
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from .sparse_fields import get_expansions
+
+# Parameters that only add the caller's own data on top of a shared response
+PERSONAL_PARAMS = {"my_rating"}
+
+
+def get_shared_params(request):
+    return sorted(
+        (name, values)
+        for name, values in request.query_params.lists()
+        if name not in PERSONAL_PARAMS
+    )
+
+
+def get_expanded_relations(request, serializer_class):
+    if serializer_class is None:
+        return []
+    return get_expansions(request, serializer_class) or []
+
+
+def get_aggregates(relations):
+    # Expanded relations are part of the response, so their newest
+    # ``updated_at`` is part of its state too
+    aggregates = {"last_modified": Max("updated_at"), "count": Count("pk")}
+    for relation in relations:
+        aggregates[f"{relation}_modified"] = Max(f"{relation}__updated_at")
+    return aggregates
+
+
+def get_validators(queryset, request, per_user=False, relations=()):
+    """
+    Returns ``(etag, last_modified)`` for the rows of ``queryset`` as seen
+    through ``request``, from one aggregate query instead of the page itself.
+    The row count catches deletes that leave the newest ``updated_at`` alone.
+    """
+    state = queryset.order_by().aggregate(**get_aggregates(relations))
+    return build_validators(state, request, per_user)
+
+
+async def aget_validators(queryset, request, per_user=False, relations=()):
+    state = await queryset.order_by().aaggregate(**get_aggregates(relations))
+    return build_validators(state, request, per_user)
+
+
+def build_validators(state, request, per_user):
+    last_modified = max(
+        (value for name, value in state.items() if name.endswith("modified") and value),
+        default=None,
+    )
+    signature = f"{request.path}?{get_shared_params(request)}:{sorted(state.items())}"
+    if per_user:
+        signature += f":{request.user.pk}"
+    etag = f'"{hashlib.sha1(signature.encode()).hexdigest()}"'
+    return etag, int(last_modified.timestamp()) if last_modified else None
+
+
+def build_version_validators(state, request, per_user):
+    version, modified = state
+    signature = f"{request.path}?{get_shared_params(request)}:{version}"
+    if per_user:
+        signature += f":{request.user.pk}"
+    return f'"{hashlib.sha1(signature.encode()).hexdigest()}"', int(modified)
+
+
+def set_validators(response, etag, last_modified):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+def respond(request, etag, last_modified, get_response):
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return set_validators(not_modified, etag, last_modified)
+
+    response = get_response()
+    if response.status_code == 200:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+async def arespond(request, etag, last_modified, get_response):
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return set_validators(not_modified, etag, last_modified)
+
+    response = await get_response()
+    if response.status_code == 200:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def conditional_get(validator_queryset, per_user=False, serializer_class=None):
+    """
+    Answers ``If-None-Match`` / ``If-Modified-Since`` with a 304 when the
+    rows behind a read action are unchanged, and adds ETag and Last-Modified
+    to its successful responses. ``validator_queryset`` names a view method
+    returning the queryset the action reads, or None to skip validation.
+    Relations the request expands on ``serializer_class`` are validated too.
+    """
+
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            queryset = getattr(self, validator_queryset)(request, *args, **kwargs)
+            if queryset is None:
+                return view_method(self, request, *args, **kwargs)
+
+            relations = get_expanded_relations(request, serializer_class)
+            etag, last_modified = get_validators(queryset, request, per_user, relations)
+            return respond(
+                request, etag, last_modified, lambda: view_method(self, request, *args, **kwargs)
+            )
+
+        return wrapper
+
+    return decorator
+
+
+def aconditional_get(validator_queryset, per_user=False, serializer_class=None):
+    """
+    ``conditional_get`` for async function views. ``validator_queryset`` is
+    called with the view arguments.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            queryset = validator_queryset(request, *args, **kwargs)
+            if queryset is None:
+                return await view(request, *args, **kwargs)
+
+            relations = get_expanded_relations(request, serializer_class)
+            etag, last_modified = await aget_validators(queryset, request, per_user, relations)
+            return await arespond(
+                request, etag, last_modified, lambda: view(request, *args, **kwargs)
+            )
+
+        return wrapper
+
+    return decorator
+
+
+def versioned_get(validator_version, per_user=False):
+    """
+    ``conditional_get`` for read actions whose data is covered by a version
+    counter that every write to it bumps. ``validator_version`` names a view
+    method returning ``(version, modified)`` of that counter, which become
+    the ETag and Last-Modified with no query of the rows.
+    """
+
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            state = getattr(self, validator_version)(request, *args, **kwargs)
+            etag, last_modified = build_version_validators(state, request, per_user)
+            return respond(
+                request, etag, last_modified, lambda: view_method(self, request, *args, **kwargs)
+            )
+
+        return wrapper
+
+    return decorator
+
+
+def aversioned_get(validator_version, per_user=False):
+    """
+    ``versioned_get`` for async function views. ``validator_version`` is
+    called with the view arguments in a thread.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            state = await sync_to_async(validator_version)(request, *args, **kwargs)
+            etag, last_modified = build_version_validators(state, request, per_user)
+            return await arespond(
+                request, etag, last_modified, lambda: view(request, *args, **kwargs)
+            )
+
+        return wrapper
+
+    return decorator
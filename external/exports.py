@@ -0,0 +1,31 @@
+from django.http import StreamingHttpResponse
+
+
+def batch_lines(lines, size):
+    # Hands the server a few large writes instead of one per row
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= size:
+            yield b"".join(chunk)
+            chunk = []
+    if chunk:
+        yield b"".join(chunk)
+
+
+def export_response(request, queryset, columns, name, chunk_size=2000):
+    """
+    Streams ``columns`` of every row of ``queryset`` in the format of the
+    negotiated renderer. Rows are read through a server-side cursor
+    ``chunk_size`` at a time, so memory does not grow with the table.
+    """
+    renderer = request.accepted_renderer
+    rows = queryset.values_list(*columns).iterator(chunk_size=chunk_size)
+    content_type = renderer.media_type
+    if renderer.charset:
+        content_type += f"; charset={renderer.charset}"
+    response = StreamingHttpResponse(
+        batch_lines(renderer.stream(columns, rows), chunk_size), content_type=content_type
+    )
+    response["Content-Disposition"] = f'attachment; filename="{name}.{renderer.format}"'
+    return response
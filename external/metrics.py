@@ -0,0 +1,358 @@
+import atexit
+import contextvars
+import fcntl
+import hmac
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from functools import partial, wraps
+from pathlib import Path
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+
+# Metric families with their type and help text
+METRICS = {
+    "http_requests_total": ("counter", "Requests by URL name, method and status class"),
+    "http_request_duration_seconds": ("histogram", "Time spent handling requests"),
+    "http_request_db_queries_total": ("counter", "Database queries run by requests"),
+    "http_request_db_seconds_total": ("counter", "Time requests spent in database queries"),
+    "http_request_render_seconds_total": ("counter", "Time requests spent rendering response data"),
+    "http_response_bytes_total": ("counter", "Bytes of response bodies"),
+}
+
+# Requests that resolve to no URL name share one label, keeping the number
+# of series bounded
+UNMATCHED = "unmatched"
+
+# Counts of exited workers, folded together so their files do not pile up
+EXITED_FILE = "exited.json"
+
+
+class RequestStats:
+    __slots__ = ["queries", "db_seconds", "render_seconds", "rendering"]
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.render_seconds = 0.0
+        self.rendering = False
+
+
+current_stats = contextvars.ContextVar("current_stats", default=None)
+
+
+def label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def labels(**values):
+    return "{" + ",".join(f'{name}="{label_value(value)}"' for name, value in values.items()) + "}"
+
+
+def add_counters(families, stored):
+    for name, counters in stored.items():
+        merged = families.setdefault(name, {})
+        for series, value in counters.items():
+            merged[series] = merged.get(series, 0) + value
+
+
+def read_counters(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def write_counters(path, families):
+    # Readers only ever see a complete file
+    temporary = path.with_name(f"{path.stem}.{threading.get_ident()}.tmp")
+    temporary.write_text(json.dumps(families))
+    os.replace(temporary, path)
+
+
+def is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class MetricsStore:
+    """
+    Counters of one process, keyed by metric family and series. With a
+    ``directory`` the counters are written to a file of their own there at
+    most every ``flush_seconds``, and ``collect()`` adds up the files of all
+    processes, so a scrape of any gunicorn worker reports them all.
+    Files of exited workers are folded into one file on collect, since their
+    counts stay part of the totals.
+    """
+
+    def __init__(self, directory=None, flush_seconds=5):
+        self.directory = Path(directory) if directory else None
+        self.flush_seconds = flush_seconds
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.families = {name: {} for name in METRICS}
+        self.pid = os.getpid()
+        self.path = self.directory / f"{self.pid}-{uuid.uuid4().hex[:8]}.json" if self.directory else None
+        self.flushed_at = time.monotonic()
+
+    def add(self, family, series, value):
+        counters = self.families[family]
+        counters[series] = counters.get(series, 0) + value
+
+    def observe(self, endpoint, method, status, duration, stats, response_bytes):
+        endpoint_label = labels(endpoint=endpoint)
+        with self.lock:
+            # Counts from before a fork belong to the parent
+            if self.pid != os.getpid():
+                self.reset()
+            self.add("http_requests_total", labels(endpoint=endpoint, method=method, status=f"{status // 100}xx"), 1)
+            # Every bucket is touched so series keep their order in the output
+            for bucket in LATENCY_BUCKETS:
+                series = "_bucket" + labels(endpoint=endpoint, le=bucket)
+                self.add("http_request_duration_seconds", series, int(duration <= bucket))
+            self.add("http_request_duration_seconds", "_bucket" + labels(endpoint=endpoint, le="+Inf"), 1)
+            self.add("http_request_duration_seconds", "_sum" + endpoint_label, duration)
+            self.add("http_request_duration_seconds", "_count" + endpoint_label, 1)
+            self.add("http_request_db_queries_total", endpoint_label, stats.queries)
+            self.add("http_request_db_seconds_total", endpoint_label, stats.db_seconds)
+            self.add("http_request_render_seconds_total", endpoint_label, stats.render_seconds)
+            self.add("http_response_bytes_total", endpoint_label, response_bytes)
+        self.flush()
+
+    def flush(self, force=False):
+        if not self.directory:
+            return
+        with self.lock:
+            if not force and time.monotonic() - self.flushed_at < self.flush_seconds:
+                return
+            self.flushed_at = time.monotonic()
+            families = {name: dict(counters) for name, counters in self.families.items()}
+            path = self.path
+        self.directory.mkdir(parents=True, exist_ok=True)
+        write_counters(path, families)
+
+    @contextmanager
+    def directory_lock(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            yield
+
+    def fold_exited(self):
+        exited = []
+        for path in self.directory.glob("*-*.json"):
+            pid = path.stem.split("-")[0]
+            if pid.isdigit() and not is_running(int(pid)):
+                exited.append(path)
+        if not exited:
+            return
+        exited_path = self.directory / EXITED_FILE
+        families = read_counters(exited_path) or {}
+        for path in exited:
+            add_counters(families, read_counters(path) or {})
+        write_counters(exited_path, families)
+        for path in exited:
+            path.unlink(missing_ok=True)
+
+    def collect(self):
+        with self.lock:
+            families = {name: dict(counters) for name, counters in self.families.items()}
+        if not self.directory:
+            return families
+        # Folding and reading under one lock, so no scrape sees a count twice
+        # or not at all
+        with self.directory_lock():
+            self.fold_exited()
+            for path in sorted(self.directory.glob("*.json")):
+                if path != self.path:
+                    add_counters(families, read_counters(path) or {})
+        return families
+
+    def render(self):
+        lines = []
+        for name, counters in self.collect().items():
+            if not counters or name not in METRICS:
+                continue
+            kind, help_text = METRICS[name]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for series, value in counters.items():
+                lines.append(f"{name}{series} {round(value, 6) if isinstance(value, float) else value}")
+        return "".join(line + "\n" for line in lines)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = MetricsStore(settings.METRICS_DIR, settings.METRICS_FLUSH_SECONDS)
+                atexit.register(_store.flush, force=True)
+    return _store
+
+
+def record_query(execute, sql, params, many, context):
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+def add_query_recorder(connection, **kwargs):
+    # First in line, so execute_wrapper() blocks entered earlier still pop their own
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+def timed_render(render):
+    """
+    Counts the time of a renderer's ``render`` as the request's render time.
+    Renderers calling other renderers are only counted once.
+    """
+
+    @wraps(render)
+    def wrapper(*args, **kwargs):
+        stats = current_stats.get()
+        if stats is None or stats.rendering:
+            return render(*args, **kwargs)
+        stats.rendering = True
+        started = time.perf_counter()
+        try:
+            return render(*args, **kwargs)
+        finally:
+            stats.render_seconds += time.perf_counter() - started
+            stats.rendering = False
+
+    return wrapper
+
+
+class MetricsMiddleware:
+    """
+    Records per URL name the request count by status class, a latency
+    histogram, database queries and time, render time and response
+    bytes. Streamed responses are counted once their body has been sent,
+    their latency covers the time to the first byte.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.store = get_store()
+        connection_created.connect(add_query_recorder, dispatch_uid="metrics_query_recorder")
+        for connection in connections.all(initialized_only=True):
+            add_query_recorder(connection)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        return self.record(request, response, stats, started)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        return self.record(request, response, stats, started)
+
+    def record(self, request, response, stats, started):
+        match = request.resolver_match
+        endpoint = match.url_name if match and match.url_name else UNMATCHED
+        if endpoint == "metrics":
+            return response
+
+        duration = time.perf_counter() - started
+        if not response.streaming:
+            self.store.observe(endpoint, request.method, response.status_code, duration, stats, len(response.content))
+            return response
+
+        observe = partial(self.store.observe, endpoint, request.method, response.status_code, duration, stats)
+        if response.is_async:
+            response.streaming_content = acounted(response.streaming_content, stats, observe)
+        else:
+            response.streaming_content = counted(response.streaming_content, stats, observe)
+        return response
+
+
+# Streamed bodies run their queries and serializers while they are iterated,
+# after the view has returned
+
+def counted(chunks, stats, observe):
+    chunks = iter(chunks)
+    sent = 0
+    while True:
+        token = current_stats.set(stats)
+        try:
+            chunk = next(chunks, None)
+        finally:
+            current_stats.reset(token)
+        if chunk is None:
+            break
+        sent += len(chunk)
+        yield chunk
+    observe(sent)
+
+
+async def acounted(chunks, stats, observe):
+    chunks = aiter(chunks)
+    sent = 0
+    while True:
+        token = current_stats.set(stats)
+        try:
+            chunk = await anext(chunks, None)
+        finally:
+            current_stats.reset(token)
+        if chunk is None:
+            break
+        sent += len(chunk)
+        yield chunk
+    observe(sent)
+
+
+def metrics_view(request):
+    # Closed unless a token is configured
+    token = settings.METRICS_TOKEN
+    # Compared as bytes in constant time, headers may carry any latin-1 text
+    authorization = request.headers.get("Authorization", "").encode("latin-1")
+    if not token or not hmac.compare_digest(authorization, f"Bearer {token}".encode()):
+        return HttpResponseForbidden()
+    return HttpResponse(get_store().render(), content_type=CONTENT_TYPE)
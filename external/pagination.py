@@ -1,13 +1,48 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class CustomPagination(PageNumberPagination):
+    """
+    Page number pagination with an opt-in keyset (cursor) mode.
+
+    Sending ``?cursor=`` (empty for the first page) switches the request to
+    keyset paging: the page is located with a seek predicate on the queryset
+    ordering plus ``id`` instead of ``COUNT(*)`` + ``OFFSET``, so every page
+    costs the same. The response envelope is unchanged, ``count`` and
+    ``total_pages`` are ``null`` in cursor mode.
+    """
+
     page_size = 30
     page_size_query_param = "page_size"
     max_page_size = 100
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+        return self.paginate_queryset_by_cursor(queryset, request)
 
     def get_paginated_response(self, data):
+        if self.cursor_mode:
+            return Response(
+                {
+                    "count": None,
+                    "total_pages": None,
+                    "next": self.get_next_cursor_link(),
+                    "previous": self.get_previous_cursor_link(),
+                    "data": data,
+                }
+            )
         return Response(
             {
                 "count": self.page.paginator.count,
@@ -17,3 +52,196 @@ class CustomPagination(PageNumberPagination):
                 "data": data,
             }
         )
+
+    # ------------------------------ Cursor mode ----------------------------- #
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        ``paginate_queryset`` reading the page with the async ORM. The page
+        number mode counts with ``acount()`` before Django's paginator runs.
+        """
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if self.cursor_mode:
+            queryset, page_size = self.get_cursor_queryset(queryset, request)
+            return self.set_cursor_page([row async for row in queryset[: page_size + 1]], page_size)
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(
+                self.invalid_page_message.format(page_number=page_number, message=str(exc))
+            )
+        self.page.object_list = [row async for row in self.page.object_list]
+        self.request = request
+        return list(self.page)
+
+    def paginate_queryset_by_cursor(self, queryset, request):
+        queryset, page_size = self.get_cursor_queryset(queryset, request)
+        # Fetching one extra row tells us whether another page follows
+        return self.set_cursor_page(list(queryset[: page_size + 1]), page_size)
+
+    def get_cursor_queryset(self, queryset, request):
+        self.request = request
+        self.base_url = remove_query_param(
+            request.build_absolute_uri(), self.page_query_param
+        )
+        self.model = queryset.model
+        self.annotations = queryset.query.annotations
+        self.ordering = self.get_keyset_ordering(queryset)
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [(name, not descending) for name, descending in ordering]
+        queryset = queryset.order_by(
+            *[f"-{name}" if descending else name for name, descending in ordering]
+        )
+        if position is not None:
+            queryset = queryset.filter(self.get_seek_filter(ordering, position))
+        self.position, self.reverse = position, reverse
+        return queryset, page_size
+
+    def set_cursor_page(self, results, page_size):
+        has_more = len(results) > page_size
+        results = results[:page_size]
+
+        if self.reverse:
+            results.reverse()
+            self.has_next = self.position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.position is not None
+
+        self.page_results = results
+        return results
+
+    def get_keyset_ordering(self, queryset):
+        """
+        Returns the queryset ordering as ``[(field_name, descending), ...]``
+        with the primary key appended as a unique tie breaker.
+        """
+        model = queryset.model
+        order_by = queryset.query.order_by or model._meta.ordering
+        ordering = []
+        for item in order_by:
+            if not isinstance(item, str) or "__" in item.lstrip("-"):
+                raise ValueError(
+                    "Cursor pagination only supports ordering on local model fields "
+                    "and annotations"
+                )
+            name = item.lstrip("-")
+            if name == "pk":
+                name = model._meta.pk.name
+            ordering.append((name, item.startswith("-")))
+
+        pk_name = model._meta.pk.name
+        if pk_name not in [name for name, _ in ordering]:
+            descending = ordering[-1][1] if ordering else False
+            ordering.append((pk_name, descending))
+        return ordering
+
+    @staticmethod
+    def get_seek_filter(ordering, position):
+        """
+        Builds ``(a, b, ...) < (x, y, ...)`` as nested Q objects. When every
+        column shares one direction the leading column also gets an inclusive
+        bound so the database can start an index range scan at the cursor.
+        """
+        seek_filter = Q()
+        equal_prefix = {}
+        for (name, descending), value in zip(ordering, position):
+            lookup = "lt" if descending else "gt"
+            seek_filter |= Q(**equal_prefix, **{f"{name}__{lookup}": value})
+            equal_prefix[name] = value
+
+        directions = {descending for _, descending in ordering}
+        if len(directions) == 1:
+            name, descending = ordering[0]
+            lookup = "lte" if descending else "gte"
+            seek_filter &= Q(**{f"{name}__{lookup}": position[0]})
+        return seek_filter
+
+    def get_ordering_field(self, name):
+        # Ordering may name a model field or an annotation such as a search rank
+        if name in self.annotations:
+            return self.annotations[name].output_field
+        return self.model._meta.get_field(name)
+
+    def get_position(self, instance):
+        position = []
+        for name, _ in self.ordering:
+            if isinstance(instance, dict):
+                # A values() row, formatted like Field.value_to_string does
+                value = instance[name]
+                position.append(value.isoformat() if hasattr(value, "isoformat") else str(value))
+            elif name in self.annotations:
+                position.append(str(getattr(instance, name)))
+            else:
+                field = instance._meta.get_field(name)
+                position.append(field.value_to_string(instance))
+        return position
+
+    def encode_cursor(self, position, reverse=False):
+        payload = json.dumps({"p": position, "r": int(reverse)}, separators=(",", ":"))
+        token = urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            payload = json.loads(urlsafe_b64decode(token.encode("ascii")).decode("utf-8"))
+            raw_position = payload["p"]
+            reverse = bool(payload.get("r", 0))
+            if len(raw_position) != len(self.ordering):
+                raise ValueError
+            position = [
+                self.get_ordering_field(name).to_python(value)
+                for (name, _), value in zip(self.ordering, raw_position)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def get_next_cursor_link(self):
+        if not self.has_next or not self.page_results:
+            return None
+        return self.encode_cursor(self.get_position(self.page_results[-1]))
+
+    def get_previous_cursor_link(self):
+        if not self.has_previous or not self.page_results:
+            return None
+        return self.encode_cursor(self.get_position(self.page_results[0]), reverse=True)
+
+
+class KeysetPagination(CustomPagination):
+    """
+    Always pages by cursor, for endpoints where a total count is never
+    worth computing.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = True
+        return self.paginate_queryset_by_cursor(queryset, request)
+
+
+class OptionalCursorPagination(CustomPagination):
+    """
+    Leaves the queryset unpaginated unless ``?cursor=`` is sent, for
+    endpoints that historically return a bare list.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            self.cursor_mode = False
+            return None
+        return super().paginate_queryset(queryset, request, view)
@@ -0,0 +1,43 @@
+import msgpack
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.utils import json
+from .renderers import FastJSONRenderer, MessagePackRenderer
+
+
+class FastJSONParser(JSONParser):
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if not self.strict:
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read() if stream is not None else b""
+        try:
+            if encoding.lower().replace("-", "") != "utf8":
+                body = body.decode(encoding)
+            return orjson.loads(body)
+        except orjson.JSONDecodeError:
+            # json also accepts what orjson refuses, e.g. integers beyond 64 bits
+            pass
+        except UnicodeDecodeError as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
+        try:
+            return json.loads(body, parse_constant=json.strict_constant)
+        except ValueError as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
+
+
+class MessagePackParser(BaseParser):
+    media_type = "application/msgpack"
+    renderer_class = MessagePackRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except Exception as exc:
+            raise ParseError("MessagePack parse error - %s" % str(exc))
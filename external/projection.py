@@ -0,0 +1,86 @@
+from functools import lru_cache
+from rest_framework import serializers
+
+
+# Fields whose representation of a database value is the value itself
+PASS_THROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+def none_safe(convert):
+    def converter(value):
+        return None if value is None else convert(value)
+
+    return converter
+
+
+def get_converter(field):
+    if isinstance(field, (serializers.SerializerMethodField, serializers.BaseSerializer)):
+        raise TypeError(f"{field.field_name} cannot be read from queryset.values()")
+    if isinstance(field, PASS_THROUGH_FIELDS):
+        return None
+    if isinstance(field, serializers.UUIDField) and field.uuid_format == "hex_verbose":
+        return none_safe(str)
+    return none_safe(field.to_representation)
+
+
+@lru_cache(maxsize=None)
+def get_columns(serializer_class):
+    """
+    Returns ``(field_name, column, converter)`` for every field of a
+    read-only ModelSerializer, compiled once per class.
+    """
+    columns = []
+    for name, field in serializer_class().fields.items():
+        if field.source == "*":
+            raise TypeError(f"{name} cannot be read from queryset.values()")
+        columns.append((name, field.source.replace(".", "__"), get_converter(field)))
+    return tuple(columns)
+
+
+def project(queryset, serializer_class, fields=None):
+    """
+    Turns ``queryset`` into ``values()`` rows holding the serializer's fields,
+    or the selected ``fields``, and the ordering columns cursor pagination
+    reads positions from.
+    """
+    columns = [
+        column
+        for name, column, _ in get_columns(serializer_class)
+        if fields is None or name in fields
+    ]
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    for item in [*ordering, queryset.model._meta.pk.name]:
+        column = item.lstrip("-") if isinstance(item, str) else None
+        if column and column != "pk" and column not in columns:
+            columns.append(column)
+    return queryset.values(*columns)
+
+
+class ProjectionListSerializer(serializers.ListSerializer):
+    """
+    Serializes ``project()`` rows without building model instances or going
+    through field-by-field ``to_representation``, producing the same output
+    as the child serializer would for the instances.
+    """
+
+    def to_representation(self, data):
+        rows = list(data.all() if hasattr(data, "all") else data)
+        if not rows or not isinstance(rows[0], dict):
+            return super().to_representation(rows)
+
+        columns = get_columns(type(self.child))
+        if len(columns) != len(self.child.fields):
+            columns = [column for column in columns if column[0] in self.child.fields]
+        return [
+            {
+                name: row[column] if convert is None else convert(row[column])
+                for name, column, convert in columns
+            }
+            for row in rows
+        ]
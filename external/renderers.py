@@ -0,0 +1,122 @@
+import csv
+from decimal import Decimal
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+from .metrics import timed_render
+
+# Types orjson and msgpack do not know natively (Decimal, lazy strings, ...)
+# are converted exactly like DRF's JSONEncoder would
+encode_default = JSONEncoder().default
+
+
+def encode_row_value(value):
+    # Exported rows come straight from the database, decimals are written the
+    # way DecimalField represents them to match the API responses
+    if isinstance(value, Decimal) and api_settings.COERCE_DECIMAL_TO_STRING:
+        return f"{value:f}"
+    return encode_default(value)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Renders with orjson the same bytes JSONRenderer renders with compact,
+    unicode and strict JSON. Pretty printing, other JSON settings and data
+    orjson rejects (e.g. integers beyond 64 bits) go through JSONRenderer.
+    """
+
+    @timed_render
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or self.ensure_ascii or not self.compact or not self.strict:
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            # Dates are left to the encoder for DRF's exact formatting
+            rendered = orjson.dumps(
+                data, default=encode_default, option=orjson.OPT_PASSTHROUGH_DATETIME
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return rendered.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    @timed_render
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
+
+
+class EchoBuffer:
+    # A file for csv.writer that hands each written line back
+    def write(self, value):
+        return value
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Renders a list as one JSON document per line. ``stream`` encodes rows
+    lazily for exports that never hold the whole table.
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+    charset = None
+
+    @timed_render
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        rows = data if isinstance(data, list) else [data]
+        return b"".join(self.encode(row) for row in rows)
+
+    def stream(self, columns, rows):
+        for row in rows:
+            yield self.encode(dict(zip(columns, row)))
+
+    @staticmethod
+    def encode(row):
+        return orjson.dumps(
+            row, default=encode_row_value, option=orjson.OPT_PASSTHROUGH_DATETIME
+        ) + b"\n"
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Renders a list of flat objects as CSV with a header line. ``stream``
+    encodes rows lazily for exports that never hold the whole table.
+    """
+
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    @timed_render
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        rows = data if isinstance(data, list) else [data]
+        columns = list(rows[0]) if rows else []
+        return b"".join(self.stream(columns, [list(row.values()) for row in rows]))
+
+    def stream(self, columns, rows):
+        writer = csv.writer(EchoBuffer())
+        yield writer.writerow(columns).encode()
+        for row in rows:
+            yield writer.writerow([self.format_value(value) for value in row]).encode()
+
+    @staticmethod
+    def format_value(value):
+        if value is None or isinstance(value, (str, int, float)):
+            return value
+        return encode_row_value(value)
@@ -0,0 +1,126 @@
+from functools import lru_cache
+from rest_framework import serializers
+from .swagger_query_params import set_query_params
+
+sparse_field_params = set_query_params(
+    field_data=[
+        {"name": "fields", "description": "Comma separated fields to return, defaults to all"},
+        {"name": "exclude", "description": "Comma separated fields to leave out"},
+    ]
+)
+
+
+def expand_params(serializer_class):
+    return set_query_params(
+        field_data=[
+            {
+                "name": "expand",
+                "description": "Comma separated relations to embed: "
+                + ", ".join(serializer_class.Meta.expandable),
+            }
+        ]
+    )
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin taking ``fields=[...]`` to return a subset of its
+    fields and ``expand=[...]`` to embed relations listed in
+    ``Meta.expandable`` with their serializer. Columns a field reads that are
+    not named by its source, such as those behind a method field, are listed
+    in ``Meta.field_columns``.
+    """
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in expand or []:
+            if name in self.fields:
+                self.fields[name] = self.Meta.expandable[name](read_only=True)
+
+
+@lru_cache(maxsize=None)
+def get_field_columns(serializer_class):
+    """Returns ``{field_name: [column, ...]}`` for a serializer class."""
+    field_columns = getattr(serializer_class.Meta, "field_columns", {})
+    return {
+        name: field_columns.get(name, [field.source.replace(".", "__")])
+        for name, field in serializer_class().fields.items()
+    }
+
+
+def split_names(value):
+    return [name.strip() for name in (value or "").split(",") if name.strip()]
+
+
+def get_sparse_fields(request, serializer_class):
+    """
+    Returns the field names selected by ``?fields=`` and ``?exclude=`` in
+    declaration order, or None when neither is given. Unknown names are a
+    validation error.
+    """
+    fields = split_names(request.query_params.get("fields"))
+    exclude = split_names(request.query_params.get("exclude"))
+    if not fields and not exclude:
+        return None
+
+    available = list(get_field_columns(serializer_class))
+    errors = {}
+    for param, names in [("fields", fields), ("exclude", exclude)]:
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            errors[param] = [f"Unknown fields: {', '.join(unknown)}"]
+    if errors:
+        raise serializers.ValidationError(errors)
+
+    selected = [
+        name
+        for name in available
+        if (not fields or name in fields) and name not in exclude
+    ]
+    if not selected:
+        raise serializers.ValidationError({"fields": ["At least one field must remain"]})
+    return selected
+
+
+def get_expansions(request, serializer_class):
+    """
+    Returns the relations named by ``?expand=``, or None when it is not
+    given. Relations the serializer cannot expand are a validation error.
+    """
+    expand = split_names(request.query_params.get("expand"))
+    if not expand:
+        return None
+
+    expandable = getattr(serializer_class.Meta, "expandable", {})
+    unknown = [name for name in expand if name not in expandable]
+    if unknown:
+        raise serializers.ValidationError(
+            {"expand": [f"Unknown expansions: {', '.join(unknown)}"]}
+        )
+    return list(dict.fromkeys(expand))
+
+
+def select_columns(queryset, serializer_class, fields=None, extra=(), expand=None):
+    """
+    Loads only the columns behind the selected fields, plus ``extra`` ones
+    such as ordering fields, joining the relations they traverse. Expanded
+    relations are joined in the same query and load their serializer's columns.
+    """
+    field_columns = get_field_columns(serializer_class)
+    columns = [*extra]
+    for name in fields or field_columns:
+        columns.extend(field_columns[name])
+        if name in (expand or []):
+            nested = serializer_class.Meta.expandable[name]
+            columns.extend(
+                f"{name}__{column}"
+                for nested_columns in get_field_columns(nested).values()
+                for column in nested_columns
+            )
+    relations = {column.rsplit("__", 1)[0] for column in columns if "__" in column}
+    if relations:
+        queryset = queryset.select_related(*relations)
+    return queryset.only(*columns)